@@ -1,14 +1,16 @@
 """Application factory and Flask app creation."""
 import logging
 import os
+import threading
 from pathlib import Path
 from urllib.parse import urlencode, urlparse, urlunparse, parse_qs
 
 from flask import Flask, redirect, request, session, url_for
 from flask_wtf.csrf import CSRFProtect
 
+from app.ai import ai_available, warm_up_connection
 from app.config import PARTS_RANGE
-from app.db import init_db, seed_db, _ensure_uoe_grammar_topic_column, _ensure_check_history_user_id, _ensure_users_password_column, _ensure_gamification_tables, _ensure_check_history_created_index, _ensure_spaced_repetition_table, _ensure_orphaned_stats_claimed, _ensure_vocab_notebook_table, _ensure_vocab_word_forms_column, _ensure_part3_word_repetition_table, _ensure_part2_word_repetition_tables, _ensure_user_settings_table, _ensure_listening_tables
+from app.db import close_db, init_db, seed_db
 from app.rag.store import ensure_rag_tables
 from app.views.home import bp as home_bp
 from app.views.use_of_english import bp as uoe_bp
@@ -29,6 +31,20 @@ if _debug_mode:
 _PROJECT_ROOT = Path(__file__).resolve().parent.parent
 
 
+def _configure_template_cache(app):
+    """Production: no template mtime checks, and compiled templates cached on disk across restarts."""
+    app.config["TEMPLATES_AUTO_RELOAD"] = False
+    cache_dir = _PROJECT_ROOT / ".jinja_cache"
+    try:
+        cache_dir.mkdir(exist_ok=True)
+    except OSError:
+        logger.warning("Template bytecode cache disabled: cannot create %s", cache_dir)
+        return
+    from jinja2 import FileSystemBytecodeCache
+
+    app.jinja_options = {**app.jinja_options, "bytecode_cache": FileSystemBytecodeCache(str(cache_dir))}
+
+
 def create_app(config=None):
     app = Flask(
         __name__,
@@ -36,6 +52,8 @@ def create_app(config=None):
         static_folder=str(_PROJECT_ROOT / "static"),
         static_url_path="",
     )
+    if not _debug_mode:
+        _configure_template_cache(app)
     _secret = (os.environ.get("SECRET_KEY") or "").strip()
     if not _secret:
         if os.environ.get("FLASK_ENV") == "production":
@@ -80,6 +98,9 @@ def create_app(config=None):
             part = 1
         return redirect(url_for("use_of_english.use_of_english", part=part, csrf_expired=1))
 
+    # One SQLite connection per app context / request, closed on teardown
+    app.teardown_appcontext(close_db)
+
     app.register_blueprint(home_bp)
     app.register_blueprint(uoe_bp)
     app.register_blueprint(writing_bp)
@@ -109,26 +130,16 @@ def create_app(config=None):
 
     with app.app_context():
         logger.debug("Initialising database and running migrations…")
-        init_db()
-        _ensure_uoe_grammar_topic_column()
-        _ensure_check_history_user_id()
-        _ensure_users_password_column()
-        _ensure_gamification_tables()
-        _ensure_check_history_created_index()
-        _ensure_spaced_repetition_table()
-        _ensure_orphaned_stats_claimed()
-        _ensure_vocab_notebook_table()
-        _ensure_vocab_word_forms_column()
-        _ensure_part3_word_repetition_table()
-        _ensure_part2_word_repetition_tables()
-        _ensure_user_settings_table()
-        _ensure_listening_tables()
+        init_db()  # also applies pending migrations
         ensure_rag_tables()
         seed_db()
         logger.debug("Database ready")
 
+    if ai_available and not app.testing:
+        threading.Thread(target=warm_up_connection, name="ai-warm-up", daemon=True).start()
+
     logger.info("FCE-Trainer starting (debug=%s, AI=%s)",
                 _debug_mode,
-                "enabled" if app.config.get("AI_ENABLED") else "disabled")
+                "enabled" if ai_available else "disabled")
 
     return app
@@ -8,23 +8,47 @@ Priority (first configured key wins, or set AI_PROVIDER to force one):
 """
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
 import os
+from collections.abc import Iterator
 from typing import Any
 
 import requests
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import before_sleep_log, retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+
+try:
+    import openai as _openai
+except ImportError:  # only needed for the OpenAI / Groq providers
+    _openai = None
 
 logger = logging.getLogger("fce_trainer")
 
+# Default request timeout in seconds for AI API calls
+AI_REQUEST_TIMEOUT = int(os.environ.get("AI_REQUEST_TIMEOUT", "60"))
+
+
+def _pooled_http_client():
+    """httpx client with an explicit keep-alive pool, shared by all calls of one OpenAI-compatible client."""
+    import httpx  # installed with openai
+
+    return httpx.Client(
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        timeout=httpx.Timeout(AI_REQUEST_TIMEOUT, connect=5.0),
+    )
+
+
+# requests.Session keeps connections alive between Gemini / Hugging Face calls
+_http_session = requests.Session()
+
 # ----- OpenAI -----
 openai_api_key = (os.environ.get("OPENAI_API_KEY") or "").strip()
 openai_client = None
 openai_model = (os.environ.get("OPENAI_MODEL") or "gpt-4o-mini").strip()
 if openai_api_key:
     from openai import OpenAI
-    openai_client = OpenAI(api_key=openai_api_key)
+    openai_client = OpenAI(api_key=openai_api_key, http_client=_pooled_http_client(), max_retries=0)
 
 # ----- Groq (OpenAI-compatible, free tier) -----
 groq_api_key = (os.environ.get("GROQ_API_KEY") or "").strip()
@@ -35,7 +59,12 @@ if groq_api_key:
     # Force Groq URL: ignore OPENAI_BASE_URL (e.g. local proxy) so we hit api.groq.com
     _saved_base = os.environ.pop("OPENAI_BASE_URL", None)
     try:
-        groq_client = _OAI(api_key=groq_api_key, base_url="https://api.groq.com/openai/v1")
+        groq_client = _OAI(
+            api_key=groq_api_key,
+            base_url="https://api.groq.com/openai/v1",
+            http_client=_pooled_http_client(),
+            max_retries=0,
+        )
     finally:
         if _saved_base is not None:
             os.environ["OPENAI_BASE_URL"] = _saved_base
@@ -75,6 +104,8 @@ else:
     _provider = None
 
 ai_available = _provider is not None
+# Only OpenAI returns several choices (n > 1) for one request; Groq rejects n != 1.
+multi_choice_available = _provider == "openai"
 
 logger.debug(
     "AI provider: %s | OpenAI: %s | Groq: %s | Google: %s | HF: %s",
@@ -86,8 +117,52 @@ logger.debug(
 )
 
 
-# Default request timeout in seconds for AI API calls
-AI_REQUEST_TIMEOUT = int(os.environ.get("AI_REQUEST_TIMEOUT", "60"))
+def warm_up_connection() -> None:
+    """Make one cheap request to the active provider so the TCP + TLS connection is already in
+    the keep-alive pool when the first generation or explanation call arrives.
+
+    The clients are built at import time, i.e. in each gunicorn worker after the fork (the app
+    is not preloaded), so every worker warms its own pool.
+    """
+    try:
+        if _provider == "openai":
+            openai_client.models.list()
+        elif _provider == "groq":
+            groq_client.models.list()
+        elif _provider == "google":
+            _http_session.head("https://generativelanguage.googleapis.com/", timeout=AI_REQUEST_TIMEOUT)
+        elif _provider == "huggingface":
+            _http_session.head(HF_INFERENCE_URL, timeout=AI_REQUEST_TIMEOUT)
+    except Exception:
+        logger.debug("AI connection warm-up failed", exc_info=True)
+
+
+class AIHTTPError(RuntimeError):
+    """Non-200 reply from a REST provider (Gemini, Hugging Face)."""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _is_transient(exc: BaseException) -> bool:
+    """Worth retrying: rate limits, 5xx, timeouts and dropped connections. 4xx errors are not."""
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if _openai is not None and isinstance(exc, _openai.APIConnectionError):  # includes APITimeoutError
+        return True
+    status = getattr(exc, "status_code", None)
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+
+# Retries live here only; the OpenAI-compatible clients are created with max_retries=0.
+_retry_transient = retry(
+    retry=retry_if_exception(_is_transient),
+    stop=stop_after_attempt(4),
+    wait=wait_exponential_jitter(initial=1, max=30),
+    before_sleep=before_sleep_log(logger, logging.WARNING),
+    reraise=True,
+)
 
 
 class _ChatResponse:
@@ -100,9 +175,17 @@ class _ChatResponse:
         self.choices = [choice]
 
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
+@_retry_transient
 def chat_create(messages: list[dict[str, str]], temperature: float = 0.7, model: str | None = None) -> Any:
-    """Call the configured AI provider. Returns object with .choices[0].message.content."""
+    """Call the configured AI provider. Returns object with .choices[0].message.content.
+
+    Transient failures (see _is_transient) are retried with jittered exponential backoff;
+    anything else, or the last transient error, is raised to the caller.
+    """
+    return _provider_create(messages, temperature, model)
+
+
+def _provider_create(messages, temperature, model):
     if _provider is None:
         raise ValueError(
             "No AI provider configured. "
@@ -117,6 +200,130 @@ def chat_create(messages: list[dict[str, str]], temperature: float = 0.7, model:
     return _hf_create(messages, temperature, model)
 
 
+def _model_name(model: str | None) -> str:
+    default = {"openai": openai_model, "groq": groq_model, "google": google_ai_model}.get(_provider, hf_model)
+    return model or default
+
+
+def chat_create_cached(messages: list[dict[str, str]], temperature: float = 0.3, model: str | None = None) -> Any:
+    """chat_create for calls whose answer only depends on the request (explanations, translations).
+
+    The reply text is stored in the ai_response_cache table under a sha256 of provider, model,
+    temperature and messages; an identical later request is answered from there without an API call.
+    Not meant for task generation, where repeated prompts should give new tasks.
+    """
+    from app.db import get_cached_ai_response, store_ai_response
+    from app.utils import json_dumps
+
+    model_name = _model_name(model)
+    request_hash = hashlib.sha256(json_dumps([_provider, model_name, temperature, messages]).encode()).hexdigest()
+    cached = get_cached_ai_response(request_hash)
+    if cached is not None:
+        return _ChatResponse(cached)
+    comp = chat_create(messages, temperature=temperature, model=model)
+    content = comp.choices[0].message.content or ""
+    if content.strip():
+        store_ai_response(request_hash, model_name, temperature, content)
+    return comp
+
+
+# Streamed generations give up if no JSON object has started after this many characters
+STREAM_PREAMBLE_LIMIT = 500
+
+
+@_retry_transient
+def chat_create_json(messages: list[dict[str, str]], temperature: float = 0.7, model: str | None = None) -> dict | None:
+    """Like chat_create, but returns the first JSON object of the reply (or None).
+
+    OpenAI and Groq responses are streamed: the stream is closed as soon as the top-level object
+    is complete, or once STREAM_PREAMBLE_LIMIT characters arrive without one starting.
+    """
+    from app.utils import JsonObjectScanner, extract_json_object, json_loads
+
+    stream = _open_stream(messages, temperature, model)
+    if stream is None:
+        comp = _provider_create(messages, temperature, model)
+        return extract_json_object((comp.choices[0].message.content or "").strip())
+
+    scanner = JsonObjectScanner()
+    try:
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            obj_text = scanner.feed(delta)
+            if obj_text is not None:
+                try:
+                    data = json_loads(obj_text)
+                except ValueError:
+                    return None
+                return data if isinstance(data, dict) else None
+            if not scanner.started and scanner.seen > STREAM_PREAMBLE_LIMIT:
+                logger.warning("AI reply has no JSON object after %d characters, aborting", scanner.seen)
+                return None
+    finally:
+        stream.close()
+    return None
+
+
+def chat_stream_json_items(
+    messages: list[dict[str, str]], temperature: float = 0.7, model: str | None = None, n: int = 1
+) -> Iterator[Any]:
+    """Yield the elements of the first JSON array in the reply, each as soon as it is complete.
+
+    OpenAI and Groq responses are streamed, so callers can validate and store the first items
+    while later ones are still being generated; closing the generator closes the stream. Other
+    providers are read in full first. Opening the request is retried like chat_create.
+    n > 1 asks for n alternative replies in the one request (see multi_choice_available); their
+    items are yielded in arrival order.
+    """
+    from app.utils import JsonArrayScanner, extract_json_array, json_loads
+
+    stream = _retry_transient(_open_stream)(messages, temperature, model, n)
+    if stream is None:
+        comp = chat_create(messages, temperature=temperature, model=model)
+        yield from extract_json_array((comp.choices[0].message.content or "").strip()) or []
+        return
+    scanners = [JsonArrayScanner() for _ in range(n)]
+    open_choices = set(range(n))
+    try:
+        for chunk in stream:
+            for choice in chunk.choices or ():
+                delta = choice.delta.content
+                if not delta or choice.index not in open_choices:
+                    continue
+                scanner = scanners[choice.index]
+                for item_text in scanner.feed(delta):
+                    try:
+                        yield json_loads(item_text)
+                    except ValueError:
+                        logger.debug("Skipping malformed streamed JSON item")
+                if not scanner.started and scanner.seen > STREAM_PREAMBLE_LIMIT:
+                    logger.warning("AI reply has no JSON array after %d characters, aborting", scanner.seen)
+                    open_choices.discard(choice.index)
+                elif scanner.done:
+                    open_choices.discard(choice.index)
+            if not open_choices:
+                return
+    finally:
+        stream.close()
+
+
+def _open_stream(messages, temperature, model, n=1):
+    """Streaming completion for OpenAI-compatible providers; None for the others."""
+    if _provider == "openai":
+        client, default_model = openai_client, openai_model
+    elif _provider == "groq":
+        client, default_model = groq_client, groq_model
+    else:
+        return None
+    extra = {"n": n} if n > 1 else {}
+    return client.chat.completions.create(
+        model=model or default_model, messages=messages, temperature=temperature,
+        timeout=AI_REQUEST_TIMEOUT, stream=True, **extra,
+    )
+
+
 def _openai_create(messages, temperature, model):
     return openai_client.chat.completions.create(
         model=model or openai_model,
@@ -167,7 +374,7 @@ def _hf_create(messages, temperature, model):
             "return_full_text": False,
         },
     }
-    resp = requests.post(
+    resp = _http_session.post(
         url,
         headers={"Authorization": f"Bearer {hf_api_key}", "Content-Type": "application/json"},
         json=payload,
@@ -178,10 +385,10 @@ def _hf_create(messages, temperature, model):
     except json.JSONDecodeError:
         data = {}
     if resp.status_code == 503 and isinstance(data, dict) and "error" in data:
-        raise RuntimeError(f"Hugging Face model loading: {data.get('error', 'try again in a minute')}")
+        raise AIHTTPError(f"Hugging Face model loading: {data.get('error', 'try again in a minute')}", 503)
     if resp.status_code != 200:
         err_msg = data.get("error", resp.text) if isinstance(data, dict) else resp.text
-        raise RuntimeError(f"Hugging Face {resp.status_code}: {str(err_msg)[:500]}")
+        raise AIHTTPError(f"Hugging Face {resp.status_code}: {str(err_msg)[:500]}", resp.status_code)
     text = ""
     if isinstance(data, list) and len(data) > 0 and isinstance(data[0], dict):
         text = (data[0].get("generated_text") or "").strip()
@@ -192,8 +399,11 @@ def _hf_create(messages, temperature, model):
 
 def _google_create(messages, temperature, model):
     prompt = ""
+    system = ""
     for m in messages:
-        if isinstance(m, dict) and m.get("role") == "user":
+        if isinstance(m, dict) and m.get("role") == "system":
+            system = m.get("content") or ""
+        elif isinstance(m, dict) and m.get("role") == "user":
             prompt = m.get("content") or ""
         elif isinstance(m, dict) and m.get("content"):
             prompt = m["content"]
@@ -202,7 +412,7 @@ def _google_create(messages, temperature, model):
     last_err = None
     for try_model in to_try:
         try:
-            return _gemini_rest(try_model, prompt, temperature)
+            return _gemini_rest(try_model, prompt, temperature, system)
         except Exception as e:
             last_err = e
             s = str(e).lower()
@@ -213,12 +423,15 @@ def _google_create(messages, temperature, model):
     raise last_err  # type: ignore[misc]
 
 
-def _gemini_rest(model_id: str, prompt: str, temperature: float) -> _ChatResponse:
+def _gemini_rest(model_id: str, prompt: str, temperature: float, system: str = "") -> _ChatResponse:
     url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_id}:generateContent"
-    resp = requests.post(
+    body = {"contents": [{"parts": [{"text": prompt}]}], "generationConfig": {"temperature": temperature}}
+    if system:
+        body["systemInstruction"] = {"parts": [{"text": system}]}
+    resp = _http_session.post(
         url,
         params={"key": google_ai_api_key},
-        json={"contents": [{"parts": [{"text": prompt}]}], "generationConfig": {"temperature": temperature}},
+        json=body,
         timeout=AI_REQUEST_TIMEOUT,
     )
     try:
@@ -226,7 +439,9 @@ def _gemini_rest(model_id: str, prompt: str, temperature: float) -> _ChatRespons
     except json.JSONDecodeError:
         data = {}
     if resp.status_code != 200:
-        raise RuntimeError(f"Gemini {resp.status_code}: {data.get('error', {}).get('message', resp.text)[:500]}")
+        raise AIHTTPError(
+            f"Gemini {resp.status_code}: {data.get('error', {}).get('message', resp.text)[:500]}", resp.status_code
+        )
     text = ""
     try:
         text = data["candidates"][0]["content"]["parts"][0]["text"].strip()
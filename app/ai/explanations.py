@@ -1,8 +1,9 @@
 """OpenAI-powered answer explanations per part."""
 import json
 import logging
+from collections.abc import Mapping
 
-from app.ai import chat_create, ai_available
+from app.ai import chat_create_cached, ai_available
 from app.ai.prompts import (
     get_explanation_prompt_part1,
     get_explanation_prompt_part2,
@@ -13,7 +14,7 @@ from app.ai.prompts import (
     get_explanation_prompt_part7,
     get_explanation_prompt_get_phrases,
 )
-from app.config import LETTERS, MAX_EXPLANATION_LEN, MAX_WORD_FAMILY_LEN
+from app.config import LETTERS, MAX_EXPLANATION_LEN, MAX_WORD_FAMILY_LEN, PART6_LETTERS
 from app.utils import extract_json_array
 
 logger = logging.getLogger("fce_trainer")
@@ -48,7 +49,7 @@ def fetch_explanations_part1(item, details):
         lines.append(f"Gap {i+1}: A) {opts[0]} B) {opts[1]} C) {opts[2]} D) {opts[3]}. Correct: {correct_letter}) {correct_word}. Student chose: {user_letter}) {user_word}.")
     prompt = get_explanation_prompt_part1(passage, "\n".join(lines))
     try:
-        comp = chat_create([{"role": "user", "content": prompt}], temperature=0.3)
+        comp = chat_create_cached([{"role": "user", "content": prompt}], temperature=0.3)
         content = (comp.choices[0].message.content or "").strip()
         arr = _extract_json_array(content)
         if isinstance(arr, list) and len(arr) >= 8:
@@ -72,7 +73,7 @@ def fetch_explanations_part2(item, details):
         lines.append(f"Gap {i+1}: Correct answer: '{correct}'. Student wrote: '{user_val or '(blank)'}'.")
     prompt = get_explanation_prompt_part2(passage, "\n".join(lines))
     try:
-        comp = chat_create([{"role": "user", "content": prompt}], temperature=0.3)
+        comp = chat_create_cached([{"role": "user", "content": prompt}], temperature=0.3)
         content = (comp.choices[0].message.content or "").strip()
         arr = _extract_json_array(content)
         if isinstance(arr, list) and len(arr) >= 8:
@@ -86,12 +87,12 @@ def fetch_explanations_part2(item, details):
 def fetch_explanations_part3(task, details):
     if not ai_available or not task or len(details) < 8:
         return []
-    if isinstance(task, dict) and "text" in task:
+    if isinstance(task, Mapping) and "text" in task:
         passage = (task.get("text") or "").strip()
         stems = task.get("stems") or []
         answers = task.get("answers") or []
     else:
-        items = task.get("items") if isinstance(task, dict) else (task if isinstance(task, list) else [])
+        items = task.get("items") if isinstance(task, Mapping) else (task if isinstance(task, list) else [])
         if not items or len(items) < 8:
             return []
         passage = " ".join((it.get("sentence") or "").strip() for it in items[:8])
@@ -107,7 +108,7 @@ def fetch_explanations_part3(task, details):
         lines.append(f"Gap {i+1}: Stem word: {stem}. Correct answer: '{correct}'. Student wrote: '{user_val or '(blank)'}'.")
     prompt = get_explanation_prompt_part3(passage[:4000], "\n".join(lines))
     try:
-        comp = chat_create([{"role": "user", "content": prompt}], temperature=0.3)
+        comp = chat_create_cached([{"role": "user", "content": prompt}], temperature=0.3)
         content = (comp.choices[0].message.content or "").strip()
         arr = _extract_json_array(content)
         if not isinstance(arr, list) or len(arr) < 8:
@@ -137,7 +138,7 @@ def fetch_explanations_part4(tasks, details):
         lines.append(f"Item {i+1}: First sentence: {t.get('sentence1')}. Key word: {t.get('keyword')}. Second sentence (gap): {t.get('sentence2')}. Correct answer: \"{correct_ans}\". Student wrote: \"{user_ans}\".")
     prompt = get_explanation_prompt_part4("\n".join(lines))
     try:
-        comp = chat_create([{"role": "user", "content": prompt}], temperature=0.3)
+        comp = chat_create_cached([{"role": "user", "content": prompt}], temperature=0.3)
         content = (comp.choices[0].message.content or "").strip()
         arr = _extract_json_array(content)
         if isinstance(arr, list) and len(arr) >= len(tasks):
@@ -164,7 +165,7 @@ def fetch_explanations_part5(item, details):
         lines.append(f"Q{i+1}: {q.get('q')}. Correct: {correct_letter}) {correct_text}. Student chose: {user_letter}) {user_text}.")
     prompt = get_explanation_prompt_part5(text_snippet, "\n".join(lines))
     try:
-        comp = chat_create([{"role": "user", "content": prompt}], temperature=0.3)
+        comp = chat_create_cached([{"role": "user", "content": prompt}], temperature=0.3)
         content = (comp.choices[0].message.content or "").strip()
         arr = _extract_json_array(content)
         if isinstance(arr, list) and len(arr) >= 6:
@@ -178,26 +179,25 @@ def fetch_explanations_part5(item, details):
 def fetch_explanations_part6(item, details):
     if not ai_available or not item or not item.get("answers") or len(details) < 6:
         return []
-    letters_g = ["A", "B", "C", "D", "E", "F", "G"]
     sentences = item.get("sentences", [])
     answers = item.get("answers", [])
     paragraphs_text = " ".join(p for p in item.get("paragraphs", []) if not p.startswith("GAP"))[:3000]
     lines = []
     for i in range(6):
         correct_idx = answers[i] if i < len(answers) else -1
-        correct_letter = letters_g[correct_idx] if 0 <= correct_idx < len(letters_g) else "?"
+        correct_letter = PART6_LETTERS[correct_idx] if 0 <= correct_idx < len(PART6_LETTERS) else "?"
         correct_sentence = sentences[correct_idx] if 0 <= correct_idx < len(sentences) else ""
         user_idx = details[i].get("user_val", -1)
         try:
             user_idx = int(user_idx)
         except (TypeError, ValueError):
             user_idx = -1
-        user_letter = letters_g[user_idx] if 0 <= user_idx < len(letters_g) else "—"
+        user_letter = PART6_LETTERS[user_idx] if 0 <= user_idx < len(PART6_LETTERS) else "—"
         user_sentence = sentences[user_idx] if 0 <= user_idx < len(sentences) else "(no answer)"
         lines.append(f"Gap {i+1}: Correct: {correct_letter}) {correct_sentence}. Student chose: {user_letter}) {user_sentence}.")
     prompt = get_explanation_prompt_part6(paragraphs_text, "\n".join(lines))
     try:
-        comp = chat_create([{"role": "user", "content": prompt}], temperature=0.3)
+        comp = chat_create_cached([{"role": "user", "content": prompt}], temperature=0.3)
         content = (comp.choices[0].message.content or "").strip()
         arr = _extract_json_array(content)
         if isinstance(arr, list) and len(arr) >= 6:
@@ -220,7 +220,7 @@ def fetch_explanations_part7(item, details):
         lines.append(f"Statement {i+1}: '{q.get('text')}'. Correct: {correct_section}. Student chose: {user_val}.")
     prompt = get_explanation_prompt_part7(sections_text, "\n".join(lines))
     try:
-        comp = chat_create([{"role": "user", "content": prompt}], temperature=0.3)
+        comp = chat_create_cached([{"role": "user", "content": prompt}], temperature=0.3)
         content = (comp.choices[0].message.content or "").strip()
         arr = _extract_json_array(content)
         if isinstance(arr, list) and len(arr) >= 10:
@@ -246,7 +246,7 @@ def fetch_explanations_get_phrases(task, details):
         lines.append(f"Gap {i+1}: Correct: '{correct}'. Student wrote: '{user_val or '(blank)'}'.")
     prompt = get_explanation_prompt_get_phrases(passage[:4000], "\n".join(lines))
     try:
-        comp = chat_create([{"role": "user", "content": prompt}], temperature=0.3)
+        comp = chat_create_cached([{"role": "user", "content": prompt}], temperature=0.3)
         content = (comp.choices[0].message.content or "").strip()
         arr = _extract_json_array(content)
         if isinstance(arr, list) and len(arr) >= 8:
@@ -1,6 +1,7 @@
 """AI prompts: task generation and chat (answer explanations). Kept in separate modules for clarity and accuracy."""
 
 from app.ai.prompts.task_generation import (
+    get_task_prompt_batch,
     get_task_prompt_part1,
     get_task_prompt_part2,
     get_task_prompt_part3,
@@ -9,6 +10,9 @@ from app.ai.prompts.task_generation import (
     get_task_prompt_part6,
     get_task_prompt_part7,
     get_task_prompt_get_phrases,
+    get_task_messages_part1,
+    get_task_messages_part2,
+    get_task_messages_part3,
 )
 from app.ai.prompts.chat_explanations import (
     get_explanation_prompt_part1,
@@ -22,6 +26,7 @@ from app.ai.prompts.chat_explanations import (
 )
 
 __all__ = [
+    "get_task_prompt_batch",
     "get_task_prompt_part1",
     "get_task_prompt_part2",
     "get_task_prompt_part3",
@@ -30,6 +35,9 @@ __all__ = [
     "get_task_prompt_part6",
     "get_task_prompt_part7",
     "get_task_prompt_get_phrases",
+    "get_task_messages_part1",
+    "get_task_messages_part2",
+    "get_task_messages_part3",
     "get_explanation_prompt_part1",
     "get_explanation_prompt_part2",
     "get_explanation_prompt_part3",
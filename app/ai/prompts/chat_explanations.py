@@ -1,14 +1,13 @@
 """Prompts used for chat-style answer explanations (why an answer is correct/wrong). Single source of truth for accuracy."""
 
 
-def get_explanation_prompt_part1(passage: str, gaps_lines: str) -> str:
-    return """You are an FCE (B2 First) English teacher. You will see a multiple-choice cloze passage and, for each gap, the four options (A–D), the correct answer, and what the student chose.
+_EXPLANATION_PROMPT_PART1 = """You are an FCE (B2 First) English teacher. You will see a multiple-choice cloze passage and, for each gap, the four options (A–D), the correct answer, and what the student chose.
 
 Use the PASSAGE as context so your explanations refer to the actual sentences (e.g. "In this sentence, X is needed because...").
 
 PASSAGE (gaps are marked as (1)_____, (2)_____, etc.):
 ---
-""" + passage + """
+{passage}
 
 ---
 For each gap, write ONE short explanation (1-2 sentences) in plain English:
@@ -18,17 +17,20 @@ For each gap, write ONE short explanation (1-2 sentences) in plain English:
 Keep each explanation clear and educational. Return ONLY a JSON array of exactly 8 strings (one per gap, in order). No other text.
 
 Gaps:
-""" + gaps_lines
+{gaps_lines}"""
 
 
-def get_explanation_prompt_part2(passage: str, gaps_lines: str) -> str:
-    return """You are an FCE (B2 First) English teacher. You will see an open-cloze passage and, for each gap, the correct answer and what the student wrote.
+def get_explanation_prompt_part1(passage: str, gaps_lines: str) -> str:
+    return _EXPLANATION_PROMPT_PART1.format(passage=passage, gaps_lines=gaps_lines)
+
+
+_EXPLANATION_PROMPT_PART2 = """You are an FCE (B2 First) English teacher. You will see an open-cloze passage and, for each gap, the correct answer and what the student wrote.
 
 Use the PASSAGE as context so your explanations refer to the actual sentences (e.g. "In this sentence, X is needed because...").
 
 PASSAGE (gaps are marked as (1)_____, (2)_____, etc.):
 ---
-""" + passage + """
+{passage}
 
 ---
 For each gap, write ONE short explanation (1-2 sentences) in plain English:
@@ -38,15 +40,18 @@ For each gap, write ONE short explanation (1-2 sentences) in plain English:
 Keep each explanation clear and educational. Return ONLY a JSON array of exactly 8 strings (one per gap, in order). No other text.
 
 Gaps:
-""" + gaps_lines
+{gaps_lines}"""
 
 
-def get_explanation_prompt_part3(passage: str, gaps_lines: str) -> str:
-    return """You are an FCE (B2 First) English teacher. For a Part 3 (word formation) task, you will see the passage and for each gap: the stem word in CAPITALS, the correct answer, and what the student wrote.
+def get_explanation_prompt_part2(passage: str, gaps_lines: str) -> str:
+    return _EXPLANATION_PROMPT_PART2.format(passage=passage, gaps_lines=gaps_lines)
+
+
+_EXPLANATION_PROMPT_PART3 = """You are an FCE (B2 First) English teacher. For a Part 3 (word formation) task, you will see the passage and for each gap: the stem word in CAPITALS, the correct answer, and what the student wrote.
 
 PASSAGE (for context):
 ---
-""" + passage[:4000] + """
+{passage}
 
 ---
 For each gap, provide TWO things:
@@ -59,11 +64,14 @@ For each gap, provide TWO things:
 Return ONLY a valid JSON array of exactly 8 objects. Each object has two keys: "explanation" (string) and "word_family" (string). No other text.
 
 Gaps:
-""" + gaps_lines
+{gaps_lines}"""
 
 
-def get_explanation_prompt_part4(items_lines: str) -> str:
-    return """You are an FCE (B2 First) English teacher. Below are key word transformation items with the correct answer and what the student wrote.
+def get_explanation_prompt_part3(passage: str, gaps_lines: str) -> str:
+    return _EXPLANATION_PROMPT_PART3.format(passage=passage[:4000], gaps_lines=gaps_lines)
+
+
+_EXPLANATION_PROMPT_PART4 = """You are an FCE (B2 First) English teacher. Below are key word transformation items with the correct answer and what the student wrote.
 
 For each item, write ONE short explanation (1-2 sentences) in plain English:
 1) Why the correct answer is right (same meaning, uses the key word correctly).
@@ -72,15 +80,18 @@ For each item, write ONE short explanation (1-2 sentences) in plain English:
 Keep each explanation clear and educational. Return ONLY a JSON array of strings (one per item). No other text.
 
 Items:
-""" + items_lines
+{items_lines}"""
 
 
-def get_explanation_prompt_part5(text_snippet: str, questions_lines: str) -> str:
-    return """You are an FCE (B2 First) English teacher. For a Part 5 (reading comprehension, multiple choice) task, you will see the passage and for each question: the question text, correct answer, and student's answer.
+def get_explanation_prompt_part4(items_lines: str) -> str:
+    return _EXPLANATION_PROMPT_PART4.format(items_lines=items_lines)
+
+
+_EXPLANATION_PROMPT_PART5 = """You are an FCE (B2 First) English teacher. For a Part 5 (reading comprehension, multiple choice) task, you will see the passage and for each question: the question text, correct answer, and student's answer.
 
 PASSAGE (for context):
 ---
-""" + text_snippet + """
+{text_snippet}
 
 ---
 For each question, write ONE short explanation (1-2 sentences):
@@ -90,15 +101,18 @@ For each question, write ONE short explanation (1-2 sentences):
 Return ONLY a JSON array of exactly 6 strings (one per question). No other text.
 
 Questions:
-""" + questions_lines
+{questions_lines}"""
 
 
-def get_explanation_prompt_part6(paragraphs_text: str, gaps_lines: str) -> str:
-    return """You are an FCE (B2 First) English teacher. For a Part 6 (gapped text) task, you will see the text and for each gap: which sentence correctly fills it and what the student chose.
+def get_explanation_prompt_part5(text_snippet: str, questions_lines: str) -> str:
+    return _EXPLANATION_PROMPT_PART5.format(text_snippet=text_snippet, questions_lines=questions_lines)
+
+
+_EXPLANATION_PROMPT_PART6 = """You are an FCE (B2 First) English teacher. For a Part 6 (gapped text) task, you will see the text and for each gap: which sentence correctly fills it and what the student chose.
 
 TEXT (for context):
 ---
-""" + paragraphs_text + """
+{paragraphs_text}
 
 ---
 For each gap, write ONE short explanation (1-2 sentences):
@@ -108,13 +122,16 @@ For each gap, write ONE short explanation (1-2 sentences):
 Return ONLY a JSON array of exactly 6 strings. No other text.
 
 Gaps:
-""" + gaps_lines
+{gaps_lines}"""
 
 
-def get_explanation_prompt_part7(sections_text: str, statements_lines: str) -> str:
-    return """You are an FCE (B2 First) English teacher. For a Part 7 (multiple matching) task, you will see the sections and for each statement: the correct section and what the student chose.
+def get_explanation_prompt_part6(paragraphs_text: str, gaps_lines: str) -> str:
+    return _EXPLANATION_PROMPT_PART6.format(paragraphs_text=paragraphs_text, gaps_lines=gaps_lines)
+
 
-Sections: """ + sections_text + """
+_EXPLANATION_PROMPT_PART7 = """You are an FCE (B2 First) English teacher. For a Part 7 (multiple matching) task, you will see the sections and for each statement: the correct section and what the student chose.
+
+Sections: {sections_text}
 
 For each statement, write ONE short explanation (1-2 sentences):
 1) Why the correct section matches (what in that section corresponds to the statement).
@@ -123,15 +140,18 @@ For each statement, write ONE short explanation (1-2 sentences):
 Return ONLY a JSON array of exactly 10 strings. No other text.
 
 Statements:
-""" + statements_lines
+{statements_lines}"""
 
 
-def get_explanation_prompt_get_phrases(passage: str, gaps_lines: str) -> str:
-    return """You are an English (B2) teacher. This is a "get phrases" cloze: a passage with 8 gaps, each filled with a collocation or phrasal verb using GET (e.g. get over, get rid of, get along with).
+def get_explanation_prompt_part7(sections_text: str, statements_lines: str) -> str:
+    return _EXPLANATION_PROMPT_PART7.format(sections_text=sections_text, statements_lines=statements_lines)
+
+
+_EXPLANATION_PROMPT_GET_PHRASES = """You are an English (B2) teacher. This is a "get phrases" cloze: a passage with 8 gaps, each filled with a collocation or phrasal verb using GET (e.g. get over, get rid of, get along with).
 
 PASSAGE (gaps are (1)_____, (2)_____, etc.):
 ---
-""" + passage + """
+{passage}
 
 ---
 For each gap, write ONE short explanation (1-2 sentences):
@@ -141,4 +161,8 @@ For each gap, write ONE short explanation (1-2 sentences):
 Return ONLY a JSON array of exactly 8 strings (one per gap, in order). No other text.
 
 Gaps:
-""" + gaps_lines
+{gaps_lines}"""
+
+
+def get_explanation_prompt_get_phrases(passage: str, gaps_lines: str) -> str:
+    return _EXPLANATION_PROMPT_GET_PHRASES.format(passage=passage, gaps_lines=gaps_lines)
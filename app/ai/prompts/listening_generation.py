@@ -179,7 +179,7 @@ No other text or markdown."""
 
 # ── Topic lists ──────────────────────────────────────────────────────────────
 
-LISTENING_PART1_TOPICS = [
+LISTENING_PART1_TOPICS = (
     "travel and holidays", "work and careers", "food and cooking",
     "health and fitness", "technology and gadgets", "education and learning",
     "entertainment and media", "shopping and money", "sports and hobbies",
@@ -190,9 +190,9 @@ LISTENING_PART1_TOPICS = [
     "celebrations and events", "city life vs country life", "childhood memories",
     "plans and ambitions", "cultural differences", "social media",
     "museums and exhibitions", "outdoor activities", "daily routines",
-]
+)
 
-LISTENING_PART2_TOPICS = [
+LISTENING_PART2_TOPICS = (
     "the history of chocolate", "life as a marine biologist",
     "how airports handle luggage", "the psychology of colour",
     "setting up a community garden", "training for a marathon",
@@ -208,9 +208,9 @@ LISTENING_PART2_TOPICS = [
     "the world of competitive puzzle-solving", "life on a houseboat",
     "the business of second-hand clothing", "how guide dogs are trained",
     "the science behind optical illusions", "running a bookshop",
-]
+)
 
-LISTENING_PART3_TOPICS = [
+LISTENING_PART3_TOPICS = (
     "learning a musical instrument", "experiences of moving to a new city",
     "memorable travel experiences", "learning to cook",
     "benefits of outdoor exercise", "changing careers",
@@ -226,9 +226,9 @@ LISTENING_PART3_TOPICS = [
     "opinions on modern architecture", "experiences of learning to drive",
     "favourite places to relax", "opinions on reality TV shows",
     "experiences of job interviews", "advice for staying healthy",
-]
+)
 
-LISTENING_PART4_TOPICS = [
+LISTENING_PART4_TOPICS = (
     "the future of education", "sustainable living in cities",
     "the impact of artificial intelligence on jobs",
     "the benefits and drawbacks of remote work",
@@ -245,4 +245,4 @@ LISTENING_PART4_TOPICS = [
     "the importance of financial literacy", "urban green spaces",
     "the psychology of decision-making", "online learning versus classroom learning",
     "the future of newspapers", "cultural identity in a globalised world",
-]
+)
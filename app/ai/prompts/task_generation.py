@@ -9,114 +9,156 @@ def _append_examples(prompt: str, ref_examples: str) -> str:
     return prompt
 
 
-def get_task_prompt_part1(topic: str, level: str = "b2", ref_examples: str = "") -> str:
-    level = (level or "b2").strip().lower()
-    if level != "b2plus":
-        level = "b2"
-    if level == "b2plus":
-        level_instruction = (
-            "The text must be at B2+ level: slightly more complex vocabulary and grammar "
-            "(e.g. less common collocations, more formal linkers, or subtle meaning differences between options). "
-            "Standard FCE Part 1 length (4-6 sentences, 8 gaps)."
-        )
-    else:
-        level_instruction = (
-            "The text must be at B2 level: clear vocabulary and grammar appropriate for FCE. "
-            "Standard Part 1 length (4-6 sentences, 8 gaps)."
-        )
-    prompt = f"""You are an FCE (B2 First) English exam expert. Generate exactly ONE "multiple-choice cloze" task.
-
-The text MUST be clearly about this topic: "{topic}". Write a short, coherent paragraph that is obviously on this theme (not work or offices unless the topic says so). Use a specific angle or situation so the text feels fresh and varied.
-
-{level_instruction}
+_LEVEL_INSTRUCTIONS_PART1 = {
+    "b2plus": (
+        "The text must be at B2+ level: slightly more complex vocabulary and grammar "
+        "(e.g. less common collocations, more formal linkers, or subtle meaning differences between options). "
+        "Standard FCE Part 1 length (4-6 sentences, 8 gaps)."
+    ),
+    "b2": (
+        "The text must be at B2 level: clear vocabulary and grammar appropriate for FCE. "
+        "Standard Part 1 length (4-6 sentences, 8 gaps)."
+    ),
+}
+
+# Parts 1-3 are sent as a fixed system prompt per level plus a short user message with the
+# topic (and anything else that changes per call), so providers can reuse the cached prefix.
+_SYSTEM_PROMPT_PART1 = {
+    level: """You are an FCE (B2 First) English exam expert. Generate exactly ONE "multiple-choice cloze" task.
+
+The text MUST be clearly about the topic given after these instructions. Write a short, coherent paragraph that is obviously on this theme (not work or offices unless the topic says so). Use a specific angle or situation so the text feels fresh and varied.
+
+"""
+    + level_instruction
+    + """
 
 The task must have:
 - text: A short paragraph with exactly 8 gaps. Each gap must be written as (1)_____, (2)_____, ... (8)_____ in order. The gaps should test vocabulary/grammar in context.
 - gaps: An array of exactly 8 objects. Each object has: "options" (array of exactly 4 words/phrases that could fit the gap), "correct" (integer 0, 1, 2, or 3 - the index of the correct option in "options").
 
 Return ONLY a valid JSON object with keys "text" and "gaps". No other text. Example shape:
-{{"text": "Some text with (1)_____ and (2)_____ ...", "gaps": [{{"options": ["a","b","c","d"], "correct": 0}}, ...]}}"""
-    return _append_examples(prompt, ref_examples)
+{"text": "Some text with (1)_____ and (2)_____ ...", "gaps": [{"options": ["a","b","c","d"], "correct": 0}, ...]}"""
+    for level, level_instruction in _LEVEL_INSTRUCTIONS_PART1.items()
+}
 
 
-def get_task_prompt_part2(topic: str, level: str = "b2", required_words: list[str] | None = None, ref_examples: str = "") -> str:
+def _normalize_level(level: str) -> str:
     level = (level or "b2").strip().lower()
-    if level != "b2plus":
-        level = "b2"
-    if level == "b2plus":
-        level_instruction = (
-            "- The text must be at B2+ level: slightly more complex grammar and vocabulary than standard B2. "
-            "Use a mix of sentence structures (e.g. participle clauses, inversion, or more formal linkers). "
-            "Include at least one or two gaps that could require phrasal verbs, complex prepositions, or linking words "
-            "(e.g. however, although, despite, whereas). Length about 180-220 words."
-        )
-    else:
-        level_instruction = (
-            "- A short text (about 150-200 words) at B2 level. Standard FCE open-cloze difficulty."
-        )
+    return level if level == "b2plus" else "b2"
 
-    required_instruction = ""
-    if required_words:
-        words_str = ", ".join(w.lower() for w in required_words)
-        required_instruction = (
-            f"\n- REQUIRED WORDS: You MUST use these words as correct answers for some of the 8 gaps: {words_str}. "
-            f"Weave them naturally into the text so each appears as the answer to one gap. "
-            f"The remaining gaps can test any appropriate words."
-        )
 
-    prompt = f"""You are an FCE (B2 First) Use of English exam expert. Generate exactly ONE Part 2 (Open cloze) task.
+def _task_messages(system_prompt: str, topic: str, level: str, extra: str = "", ref_examples: str = "") -> list[dict[str, str]]:
+    """System prompt (identical across calls) + user message holding only the per-call values."""
+    user = f"topic: {topic}\nlevel: {level}"
+    if extra:
+        user += "\n" + extra
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": _append_examples(user, ref_examples)},
+    ]
+
+
+def _join_messages(messages: list[dict[str, str]]) -> str:
+    """Single-prompt form of a system + user message pair."""
+    return "\n\n".join(m["content"] for m in messages)
+
+
+def get_task_messages_part1(topic: str, level: str = "b2", ref_examples: str = "") -> list[dict[str, str]]:
+    level = _normalize_level(level)
+    return _task_messages(_SYSTEM_PROMPT_PART1[level], topic, level, ref_examples=ref_examples)
+
+
+def get_task_prompt_part1(topic: str, level: str = "b2", ref_examples: str = "") -> str:
+    return _join_messages(get_task_messages_part1(topic, level, ref_examples))
+
+
+def get_task_prompt_batch(single_task_prompt: str, topics: list[str]) -> str:
+    """Wrap a one-task prompt (built with a placeholder topic) so one call returns len(topics) tasks."""
+    topic_lines = "\n".join(f"{i}. {t}" for i, t in enumerate(topics, 1))
+    return f"""{single_task_prompt}
+
+BATCH MODE: instead of ONE task, generate exactly {len(topics)} independent tasks that each follow the specification above. Ignore the topic given above; task N must be about topic N from this list:
+{topic_lines}
+
+Return ONLY a valid JSON array of exactly {len(topics)} objects, in the same order as the topics. Each object must have exactly the keys and format required above for a single task. No other text or markdown."""
+
 
-The text must be about this topic: {topic}. Use a different angle or situation (e.g. a personal story, a news-style piece, advice, or a description). Do NOT write about working from home or remote work unless the chosen topic is "work and careers" and you pick that angle.
+_LEVEL_INSTRUCTIONS_PART2 = {
+    "b2plus": (
+        "- The text must be at B2+ level: slightly more complex grammar and vocabulary than standard B2. "
+        "Use a mix of sentence structures (e.g. participle clauses, inversion, or more formal linkers). "
+        "Include at least one or two gaps that could require phrasal verbs, complex prepositions, or linking words "
+        "(e.g. however, although, despite, whereas). Length about 180-220 words."
+    ),
+    "b2": "- A short text (about 150-200 words) at B2 level. Standard FCE open-cloze difficulty.",
+}
+
+_SYSTEM_PROMPT_PART2 = {
+    level: """You are an FCE (B2 First) Use of English exam expert. Generate exactly ONE Part 2 (Open cloze) task.
+
+The text must be about the topic given after these instructions. Use a different angle or situation (e.g. a personal story, a news-style piece, advice, or a description). Do NOT write about working from home or remote work unless the chosen topic is "work and careers" and you pick that angle.
 
 Part 2 consists of:
-{level_instruction}
+"""
+    + level_instruction
+    + """
 - The text must contain exactly 8 gaps marked (1)_____, (2)_____, (3)_____, (4)_____, (5)_____, (6)_____, (7)_____, (8)_____ in order. Each gap needs ONE word (articles, prepositions, auxiliaries, pronouns, conjunctions, phrasal verb particles, linkers, etc.).
-- The 8 correct answers (one word per gap).{required_instruction}
+- The 8 correct answers (one word per gap).
+- If REQUIRED WORDS are listed after these instructions, each of them must be the correct answer to one gap.
 
 Return ONLY a valid JSON object with these exact keys:
 - "text": the full text with the exact placeholders (1)_____, (2)_____, ... (8)_____ where the gaps are. No other placeholder format.
 - "answers": an array of exactly 8 strings: the correct word for gap 1, then gap 2, ... gap 8. Use lowercase unless the word must be capitalised (e.g. start of sentence).
 
 No other text or markdown."""
-    return _append_examples(prompt, ref_examples)
+    for level, level_instruction in _LEVEL_INSTRUCTIONS_PART2.items()
+}
 
 
-def get_task_prompt_part3(topic: str, level: str = "b2", required_stems: list[str] | None = None, ref_examples: str = "") -> str:
-    level = (level or "b2").strip().lower()
-    if level != "b2plus":
-        level = "b2"
-    if level == "b2plus":
-        level_instruction = (
-            "Use B2+ vocabulary and grammar: slightly more complex word formation "
-            "(e.g. less common suffixes, negative prefixes, or abstract nouns)."
-        )
-    else:
-        level_instruction = (
-            "Use B2-level vocabulary and grammar. Test common suffixes (-tion, -ness, -ly, -ful, -less, -able), "
-            "prefixes (un-, in-, im-), and word class changes."
-        )
-
+def get_task_messages_part2(topic: str, level: str = "b2", required_words: list[str] | None = None, ref_examples: str = "") -> list[dict[str, str]]:
+    level = _normalize_level(level)
     required_instruction = ""
-    if required_stems:
-        stems_str = ", ".join(s.upper() for s in required_stems)
+    if required_words:
+        words_str = ", ".join(w.lower() for w in required_words)
         required_instruction = (
-            f"\n- REQUIRED STEMS: You MUST use these stem words among the 8 gaps: {stems_str}. "
-            f"Weave them naturally into the text. The remaining gaps can use any appropriate stems. "
-            f"Each required stem must appear as one of the 8 gaps with a different word form as the answer."
+            f"REQUIRED WORDS: You MUST use these words as correct answers for some of the 8 gaps: {words_str}. "
+            f"Weave them naturally into the text so each appears as the answer to one gap. "
+            f"The remaining gaps can test any appropriate words."
         )
+    return _task_messages(_SYSTEM_PROMPT_PART2[level], topic, level, required_instruction, ref_examples)
+
 
-    prompt = f"""You are an FCE (B2 First) Use of English exam expert. Generate exactly ONE Part 3 (Word formation) task.
+def get_task_prompt_part2(topic: str, level: str = "b2", required_words: list[str] | None = None, ref_examples: str = "") -> str:
+    return _join_messages(get_task_messages_part2(topic, level, required_words, ref_examples))
 
-The text MUST be clearly about this topic: "{topic}". Write one continuous passage (150-200 words) that is obviously on this theme.
 
-{level_instruction}
+_LEVEL_INSTRUCTIONS_PART3 = {
+    "b2plus": (
+        "Use B2+ vocabulary and grammar: slightly more complex word formation "
+        "(e.g. less common suffixes, negative prefixes, or abstract nouns)."
+    ),
+    "b2": (
+        "Use B2-level vocabulary and grammar. Test common suffixes (-tion, -ness, -ly, -ful, -less, -able), "
+        "prefixes (un-, in-, im-), and word class changes."
+    ),
+}
+
+_SYSTEM_PROMPT_PART3 = {
+    level: """You are an FCE (B2 First) Use of English exam expert. Generate exactly ONE Part 3 (Word formation) task.
+
+The text MUST be clearly about the topic given after these instructions. Write one continuous passage (150-200 words) that is obviously on this theme.
+
+"""
+    + level_instruction
+    + """
 
 Requirements:
 - One continuous text (150-200 words) with exactly 8 gaps.
 - Each gap must be written as (1)_____, (2)_____, (3)_____, (4)_____, (5)_____, (6)_____, (7)_____, (8)_____ in order.
 - At the end of the sentence or clause that contains each gap, put the STEM WORD in CAPITAL LETTERS (e.g. "...has been delayed. COMPLETE" or "...looked at him. SUSPECT"). So the reader sees the stem word in capitals after each gap.
 - The stem word is the base form; the student must change it (prefix, suffix, plural, etc.) to fit the gap.
-- IMPORTANT: In real FCE Part 3, the correct answer is almost always a DIFFERENT form from the stem (different word class or with prefix/suffix). Only very rarely (about 1 in 20 gaps) may the answer be the stem word unchanged (e.g. DANGER → danger). So for this task: at most ONE gap in the entire 8-gap passage may have the correct answer identical to the stem word (no transformation). All other gaps MUST require a clear word formation change (e.g. COMPLETE → completion, SUSPECT → suspiciously). Prefer having all 8 gaps require a transformation.{required_instruction}
+- IMPORTANT: In real FCE Part 3, the correct answer is almost always a DIFFERENT form from the stem (different word class or with prefix/suffix). Only very rarely (about 1 in 20 gaps) may the answer be the stem word unchanged (e.g. DANGER → danger). So for this task: at most ONE gap in the entire 8-gap passage may have the correct answer identical to the stem word (no transformation). All other gaps MUST require a clear word formation change (e.g. COMPLETE → completion, SUSPECT → suspiciously). Prefer having all 8 gaps require a transformation.
+- If REQUIRED STEMS are listed after these instructions, each of them must be the stem of one gap.
 
 Return ONLY a valid JSON object with these exact keys:
 - "text": the full passage (150-200 words) with (1)_____ through (8)_____ and each stem word in CAPITALS at the end of its sentence/clause. Example fragment: "The (1)_____ of the centre has been delayed. COMPLETE She looked at him (2)_____ when he told the joke. SUSPECT"
@@ -124,7 +166,25 @@ Return ONLY a valid JSON object with these exact keys:
 - "answers": array of exactly 8 strings — the correct formed word for each gap, lowercase unless capitalised (e.g. ["completion", "suspiciously", ...])
 
 No other text or markdown."""
-    return _append_examples(prompt, ref_examples)
+    for level, level_instruction in _LEVEL_INSTRUCTIONS_PART3.items()
+}
+
+
+def get_task_messages_part3(topic: str, level: str = "b2", required_stems: list[str] | None = None, ref_examples: str = "") -> list[dict[str, str]]:
+    level = _normalize_level(level)
+    required_instruction = ""
+    if required_stems:
+        stems_str = ", ".join(s.upper() for s in required_stems)
+        required_instruction = (
+            f"REQUIRED STEMS: You MUST use these stem words among the 8 gaps: {stems_str}. "
+            f"Weave them naturally into the text. The remaining gaps can use any appropriate stems. "
+            f"Each required stem must appear as one of the 8 gaps with a different word form as the answer."
+        )
+    return _task_messages(_SYSTEM_PROMPT_PART3[level], topic, level, required_instruction, ref_examples)
+
+
+def get_task_prompt_part3(topic: str, level: str = "b2", required_stems: list[str] | None = None, ref_examples: str = "") -> str:
+    return _join_messages(get_task_messages_part3(topic, level, required_stems, ref_examples))
 
 
 def get_task_prompt_part4(count: int, level: str = "b2plus", recent_avoid: str = "", ref_examples: str = "") -> str:
@@ -9,7 +9,9 @@ DB_PATH = APP_ROOT / "fce_trainer.db"
 LAST_N_SHOWS = 100
 TASKS_PER_SET = 5
 PART4_TASKS_PER_SET = 6
-LETTERS = ["A", "B", "C", "D"]
+LETTERS = ("A", "B", "C", "D")
+# Part 6 sentence letters (six gaps plus one extra sentence)
+PART6_LETTERS = ("A", "B", "C", "D", "E", "F", "G")
 MAX_EXPLANATION_LEN = 400
 MAX_WORD_FAMILY_LEN = 200
 PARTS_RANGE = range(1, 8)
@@ -23,8 +25,17 @@ LISTENING_QUESTION_COUNTS = {1: 8, 2: 10, 3: 5, 4: 7}
 # Part numbers used in check_history for listening (101-104)
 LISTENING_HISTORY_PARTS = {1: 101, 2: 102, 3: 103, 4: 104}
 
-# Check result cache (server-side, avoid session cookie overflow)
-CHECK_RESULT_CACHE_MAX = 20
+# Check result cache (server-side, avoid session cookie overflow): seconds a result waits for its GET
+CHECK_RESULT_CACHE_TTL = 300
+
+# Cached AI replies (explanations, translations) older than this are ignored and pruned
+AI_RESPONSE_CACHE_TTL_DAYS = 30
+
+# Background AI pre-generation: refill a part when fewer unseen tasks than this remain
+TASK_POOL_MIN_UNSEEN = 5
+TASK_POOL_REFILL = 3  # tasks generated per refill
+TASK_POOL_WORKERS = 2  # background generation threads per worker process
+PART4_STREAM_WORKERS = 4  # Part 4 AI reply streams open at once per worker process
 
 # Writing
 WRITING_MIN_WORDS = 140
@@ -1,68 +1,181 @@
-"""Database connection, schema, seed, and task/shows helpers. No Flask or OpenAI."""
+"""Database connection, schema, seed, and task/shows helpers. No OpenAI."""
 from __future__ import annotations
 
 import contextlib
-import json
+import functools
+import hashlib
 import logging
+import random
 import re
 import sqlite3
+import threading
+import time
+from collections import deque
+from collections.abc import Mapping
+from types import MappingProxyType
 from typing import Any
 
-from app.config import DB_PATH, LAST_N_SHOWS
+from app.config import AI_RESPONSE_CACHE_TTL_DAYS, DB_PATH, LAST_N_SHOWS
+from app.utils import json_dumps as _dumps, json_loads as _loads, norm, word_count
 
 logger = logging.getLogger("fce_trainer")
 
 # --- Connection ---
 
 
-def get_db() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
+# Per-connection tuning. journal_mode=WAL is persistent and is set once in init_db();
+# with WAL, synchronous=NORMAL keeps the DB consistent on power loss (only the last
+# commits may be rolled back) and avoids an fsync on every _record_show commit.
+_CONNECTION_PRAGMAS = """
+PRAGMA synchronous=NORMAL;
+PRAGMA temp_store=MEMORY;
+PRAGMA cache_size=-64000;
+PRAGMA mmap_size=268435456;
+"""
+
+
+# Prepared statements kept per connection. The per-table task/shows SQL alone is a few
+# statements for each of ~15 tables, more than sqlite3's default of 128 with everything else.
+_CACHED_STATEMENTS = 512
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(DB_PATH, detect_types=0, cached_statements=_CACHED_STATEMENTS)
     conn.row_factory = sqlite3.Row
+    conn.create_function("word_count", 1, word_count, deterministic=True)
+    conn.executescript(_CONNECTION_PRAGMAS)
+    return conn
+
+
+_local = threading.local()
+
+
+def get_db() -> sqlite3.Connection:
+    """Return this thread's connection, opened on first use and kept for the thread's lifetime.
+
+    Request threads, background pool workers and scripts all reuse one connection each, so
+    lookups skip the connect + PRAGMA setup.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = _connect()
     return conn
 
 
+def close_db(exc: BaseException | None = None) -> None:
+    """Teardown handler: roll back anything a failed request left uncommitted. The connection stays open."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and conn.in_transaction:
+        conn.rollback()
+
+
 @contextlib.contextmanager
 def db_connection():
+    """Yield this thread's connection; an uncommitted transaction is rolled back on error."""
     conn = get_db()
     try:
         yield conn
-    finally:
-        conn.close()
+    except BaseException:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+
+
+# SQL for the task/shows helpers is formatted once per table, so the statement text is identical
+# on every call and stays in sqlite3's prepared-statement cache.
+
+
+@functools.cache
+def _shows_sql(shows_table: str) -> dict[str, str]:
+    return {
+        "recent": f"SELECT task_id FROM {shows_table} ORDER BY id DESC LIMIT ?",
+        "insert": f"INSERT INTO {shows_table} (task_id, shown_at) VALUES (?, datetime('now'))",
+    }
+
+
+@functools.cache
+def _pick_sql(tasks_table: str, shows_table: str) -> dict[str, str]:
+    exclude = "id NOT IN (SELECT value FROM json_each(:recent)) AND id != COALESCE(:exclude, -1)"
+    return {
+        "max_id": f"SELECT max(id) FROM {tasks_table}",
+        "pick_from": f"SELECT id FROM {tasks_table} WHERE id >= :start AND {exclude} ORDER BY id LIMIT 1",
+        "pick_any_from": f"SELECT id FROM {tasks_table} WHERE id >= :start ORDER BY id LIMIT 2",
+        "count_unseen": f"SELECT count(*) FROM (SELECT id FROM {tasks_table} WHERE {exclude} LIMIT :limit)",
+    }
+
+
+# Last LAST_N_SHOWS task ids per shows table (oldest first), loaded from the DB on first use and
+# appended to by _record_show, so picks never re-read the shows tables. Per process: with several
+# worker processes each one only sees the shows it recorded itself after loading.
+_RECENT_SHOWS: dict[str, deque[int]] = {}
+_recent_shows_lock = threading.Lock()
+
+
+def _recent_shows(shows_table: str) -> deque[int]:
+    recent = _RECENT_SHOWS.get(shows_table)
+    if recent is None:
+        with _recent_shows_lock:
+            recent = _RECENT_SHOWS.get(shows_table)
+            if recent is None:
+                with db_connection() as conn:
+                    rows = conn.execute(_shows_sql(shows_table)["recent"], (LAST_N_SHOWS,)).fetchall()
+                recent = deque((r["task_id"] for r in reversed(rows)), maxlen=LAST_N_SHOWS)
+                _RECENT_SHOWS[shows_table] = recent
+    return recent
+
+
+def _recent_shows_json(shows_table: str) -> str:
+    """Recent task ids as a JSON array, bound to the json_each(:recent) exclusion in the pick queries."""
+    return _dumps(list(_recent_shows(shows_table)))
 
 
 def _get_excluded_ids(shows_table: str) -> list[int]:
-    with db_connection() as conn:
-        cur = conn.execute(
-            f"SELECT DISTINCT task_id FROM {shows_table} ORDER BY id DESC LIMIT ?",
-            (LAST_N_SHOWS,),
-        )
-        return [r["task_id"] for r in cur.fetchall()]
+    """Distinct recently shown task ids, most recent first."""
+    return list(dict.fromkeys(reversed(_recent_shows(shows_table))))
 
 
 def _pick_one_task_id(tasks_table: str, shows_table: str, exclude_current: int | None = None) -> int | None:
-    excluded = list(_get_excluded_ids(shows_table))
-    if exclude_current is not None and exclude_current not in excluded:
-        excluded.append(exclude_current)
+    """Random task id not among the last LAST_N_SHOWS shows (and not exclude_current).
+
+    Jumps to a random id and takes the next eligible row via the primary key, wrapping around
+    to the start of the table once, instead of sorting the whole table with ORDER BY RANDOM().
+    """
+    sql = _pick_sql(tasks_table, shows_table)
+    params = {"recent": _recent_shows_json(shows_table), "exclude": exclude_current}
     with db_connection() as conn:
-        if excluded:
-            ph = ",".join("?" * len(excluded))
-            cur = conn.execute(
-                f"SELECT id FROM {tasks_table} WHERE id NOT IN ({ph}) ORDER BY RANDOM() LIMIT 1",
-                excluded,
-            )
-        else:
-            cur = conn.execute(f"SELECT id FROM {tasks_table} ORDER BY RANDOM() LIMIT 1")
-        row = cur.fetchone()
+        max_id = conn.execute(sql["max_id"]).fetchone()[0]
+        if max_id is None:
+            return None
+        pivot = random.randint(1, max_id)
+        row = conn.execute(sql["pick_from"], {**params, "start": pivot}).fetchone()
+        if row is None and pivot > 1:
+            row = conn.execute(sql["pick_from"], {**params, "start": 1}).fetchone()
         return row["id"] if row else None
 
 
+def _pick_any_task_id(tasks_table: str, shows_table: str, exclude_current: int | None = None) -> int | None:
+    """Random task id ignoring show history (used once every task has been seen recently).
+
+    Reads two ids from a random pivot so exclude_current can be skipped without a != scan.
+    """
+    sql = _pick_sql(tasks_table, shows_table)
+    with db_connection() as conn:
+        max_id = conn.execute(sql["max_id"]).fetchone()[0]
+        if max_id is None:
+            return None
+        for start in (random.randint(1, max_id), 1):
+            for row in conn.execute(sql["pick_any_from"], {"start": start}):
+                if row["id"] != exclude_current:
+                    return row["id"]
+    return None
+
+
 def _record_show(shows_table: str, task_id: int) -> None:
+    recent = _recent_shows(shows_table)
     with db_connection() as conn:
-        conn.execute(
-            f"INSERT INTO {shows_table} (task_id, shown_at) VALUES (?, datetime('now'))",
-            (task_id,),
-        )
+        conn.execute(_shows_sql(shows_table)["insert"], (task_id,))
         conn.commit()
+    recent.append(task_id)
 
 
 # --- Schema & migrations ---
@@ -70,6 +183,7 @@ def _record_show(shows_table: str, task_id: int) -> None:
 
 def init_db() -> None:
     with db_connection() as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
         conn.executescript("""
         CREATE TABLE IF NOT EXISTS uoe_tasks (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -215,10 +329,16 @@ def init_db() -> None:
         CREATE INDEX IF NOT EXISTS idx_answer_explanations_part ON answer_explanations(part);
     """)
         conn.commit()
+    run_migrations()
+    _warm_task_tables()
 
 
 def _ensure_uoe_grammar_topic_column():
+    global _uoe_grammar_topic_column
+    if _uoe_grammar_topic_column:
+        return
     _run_migration("add_uoe_grammar_topic", _migrate_uoe_grammar_topic)
+    _uoe_grammar_topic_column = None
 
 
 def _ensure_check_history_user_id():
@@ -344,15 +464,17 @@ def _migrate_user_settings_table(conn):
 
 # --- Migration infrastructure ---
 
+_MIGRATIONS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS _migrations (
+        name TEXT PRIMARY KEY,
+        applied_at TEXT NOT NULL DEFAULT (datetime('now'))
+    )
+"""
+
 def _run_migration(name: str, fn):
     """Run a migration function only once. Tracks applied migrations in a table."""
     with db_connection() as conn:
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS _migrations (
-                name TEXT PRIMARY KEY,
-                applied_at TEXT NOT NULL DEFAULT (datetime('now'))
-            )
-        """)
+        conn.execute(_MIGRATIONS_TABLE_SQL)
         cur = conn.execute("SELECT 1 FROM _migrations WHERE name = ?", (name,))
         if cur.fetchone():
             return
@@ -530,6 +652,151 @@ def _migrate_part2_collocations_table(conn):
     """)
 
 
+def _migrate_shows_recent_indexes(conn):
+    """Covering (id DESC, task_id) index per shows table: the recent-shows exclusion subquery
+    then reads only the index."""
+    shows_tables = ["uoe_task_shows", "get_phrase_task_shows"]
+    shows_tables += [schema["shows"] for schema in _PART_DB_SCHEMA.values()]
+    shows_tables += [schema["shows"] for schema in _LISTENING_DB_SCHEMA.values()]
+    for table in shows_tables:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_recent ON {table}(id DESC, task_id)")
+
+
+def _migrate_task_text_hashes(conn):
+    """text_hash column (blake2b of the normalized task text) used to drop duplicate generations."""
+    for part, schema in _PART_DB_SCHEMA.items():
+        table = schema["table"]
+        cols = {r[1] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+        if "text_hash" not in cols:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN text_hash TEXT")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_text_hash ON {table}(text_hash)")
+        fill_task_hashes(conn, part)
+
+
+def _migrate_ai_batches_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ai_batches (
+            id          TEXT PRIMARY KEY,
+            status      TEXT NOT NULL,
+            created_at  TEXT NOT NULL DEFAULT (datetime('now')),
+            ingested_at TEXT
+        )
+    """)
+
+
+def _migrate_ai_response_cache_table(conn):
+    """Replies of deterministic-ish AI calls (explanations, translations), keyed by a hash of the request."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ai_response_cache (
+            request_hash TEXT PRIMARY KEY,
+            model        TEXT NOT NULL,
+            temperature  REAL NOT NULL,
+            content      TEXT NOT NULL,
+            created_at   TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+    """)
+
+
+def _migrate_ai_response_cache_created_index(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ai_response_cache_created ON ai_response_cache(created_at)")
+
+
+def _migrate_check_result_cache_table(conn):
+    """Check results between the POST and the redirected GET, shared by all worker processes."""
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS check_result_cache (
+            token      TEXT PRIMARY KEY,
+            payload    BLOB NOT NULL,
+            expires_at INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_check_result_cache_expires ON check_result_cache(expires_at);
+    """)
+
+
+def _migrate_check_history_stats_index(conn):
+    # Covers the per-part stats queries (user, part, date window, sums) without reading the table
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_check_history_user_part_totals "
+        "ON check_history(user_id, part, created_at, score, total)"
+    )
+
+
+# Applied in order by run_migrations(); names are recorded in _migrations.
+_MIGRATIONS = (
+    ("add_uoe_grammar_topic", _migrate_uoe_grammar_topic),
+    ("add_check_history_user_id", _migrate_check_history_user_id),
+    ("add_check_history_user_indexes", _migrate_check_history_user_indexes),
+    ("add_users_password_hash", _migrate_users_password_column),
+    ("add_gamification_tables", _migrate_gamification_tables),
+    ("add_check_history_user_created_index", _migrate_check_history_user_created_index),
+    ("add_spaced_repetition_table", _migrate_spaced_repetition_table),
+    ("claim_orphaned_check_history", _migrate_claim_orphaned_stats),
+    ("add_vocab_notebook_table", _migrate_vocab_notebook_table),
+    ("add_vocab_word_forms_column", _migrate_vocab_word_forms_column),
+    ("add_part3_word_repetition_table", _migrate_part3_word_repetition_table),
+    ("add_part2_word_repetition_table", _migrate_part2_word_repetition_table),
+    ("add_part2_collocations_table", _migrate_part2_collocations_table),
+    ("add_user_settings_table", _migrate_user_settings_table),
+    ("add_listening_tables", _migrate_listening_tables),
+    ("add_shows_recent_indexes", _migrate_shows_recent_indexes),
+    ("add_ai_batches_table", _migrate_ai_batches_table),
+    ("add_task_text_hashes", _migrate_task_text_hashes),
+    ("add_ai_response_cache_table", _migrate_ai_response_cache_table),
+    ("add_ai_response_cache_created_index", _migrate_ai_response_cache_created_index),
+    ("add_check_history_stats_index", _migrate_check_history_stats_index),
+    ("add_check_result_cache_table", _migrate_check_result_cache_table),
+)
+
+# Database paths already migrated by this process (skips the checks on repeated create_app calls)
+_MIGRATED_PATHS: set[str] = set()
+
+
+def run_migrations() -> None:
+    """Apply all pending migrations on one connection, reading _migrations once."""
+    if str(DB_PATH) in _MIGRATED_PATHS:
+        return
+    with db_connection() as conn:
+        conn.execute(_MIGRATIONS_TABLE_SQL)
+        applied = {r["name"] for r in conn.execute("SELECT name FROM _migrations")}
+        for name, fn in _MIGRATIONS:
+            if name in applied:
+                continue
+            fn(conn)
+            conn.execute("INSERT INTO _migrations (name) VALUES (?)", (name,))
+            conn.commit()
+            logger.info("Applied migration: %s", name)
+    _MIGRATED_PATHS.add(str(DB_PATH))
+
+
+def _warm_task_tables() -> None:
+    """Read every task and shows table once at startup so the first requests find their pages in the
+    OS cache / mmap rather than on disk. Task tables are scanned in full; shows tables via their index."""
+    with db_connection() as conn:
+        tables = [
+            r["name"]
+            for r in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' "
+                "AND (name GLOB '*_tasks' OR name GLOB '*_task_shows')"
+            )
+        ]
+        for table in tables:
+            if table.endswith("_shows"):
+                conn.execute(f"SELECT count(*) FROM {table}").fetchone()
+            else:
+                for _ in conn.execute(f"SELECT * FROM {table}"):
+                    pass
+
+
+_PART6_LETTER_PREFIX = re.compile(r"^[A-G]\)\s*")
+
+
+def _strip_part6_letter(sentence: str) -> str:
+    """Drop a leading "A) " style label from a Part 6 option sentence."""
+    if len(sentence) > 1 and sentence[1] == ")":
+        sentence = _PART6_LETTER_PREFIX.sub("", sentence, count=1)
+    return sentence.strip()
+
+
 def seed_db() -> None:
     from data import (
         UOE_SEED_TASKS,
@@ -540,69 +807,77 @@ def seed_db() -> None:
         PART_6_DATA,
         PART_7_DATA,
     )
-    conn = get_db()
-    cur = conn.execute("SELECT COUNT(*) as n FROM uoe_tasks")
-    if cur.fetchone()["n"] == 0:
-        for t in UOE_SEED_TASKS:
-            conn.execute(
+    with db_connection() as conn:
+        # All inserts run in the one implicit transaction committed below.
+        cur = conn.execute("SELECT COUNT(*) as n FROM uoe_tasks")
+        if cur.fetchone()["n"] == 0:
+            conn.executemany(
                 "INSERT INTO uoe_tasks (sentence1, keyword, sentence2, answer, source) VALUES (?, ?, ?, ?, ?)",
-                (t["sentence1"], t["keyword"], t["sentence2"], t["answer"], "manual"),
+                ((t["sentence1"], t["keyword"], t["sentence2"], t["answer"], "manual") for t in UOE_SEED_TASKS),
             )
-    cur = conn.execute("SELECT COUNT(*) as n FROM part1_tasks")
-    if cur.fetchone()["n"] == 0 and PART_1_DATA:
-        for t in PART_1_DATA:
-            conn.execute(
+        cur = conn.execute("SELECT COUNT(*) as n FROM part1_tasks")
+        if cur.fetchone()["n"] == 0 and PART_1_DATA:
+            conn.executemany(
                 "INSERT INTO part1_tasks (text, gaps_json, source) VALUES (?, ?, ?)",
-                (t["text"], json.dumps(t["gaps"]), "manual"),
+                ((t["text"], _dumps(t["gaps"]), "manual") for t in PART_1_DATA),
             )
-    cur = conn.execute("SELECT COUNT(*) as n FROM part3_tasks")
-    if cur.fetchone()["n"] == 0 and PART_3_DATA:
-        for set_items in PART_3_DATA:
-            conn.execute(
+        cur = conn.execute("SELECT COUNT(*) as n FROM part3_tasks")
+        if cur.fetchone()["n"] == 0 and PART_3_DATA:
+            conn.executemany(
                 "INSERT INTO part3_tasks (items_json, source) VALUES (?, ?)",
-                (json.dumps(set_items), "manual"),
+                ((_dumps(set_items), "manual") for set_items in PART_3_DATA),
             )
-    cur = conn.execute("SELECT COUNT(*) as n FROM part2_tasks")
-    if cur.fetchone()["n"] == 0 and PART_2_DATA:
-        for t in PART_2_DATA:
-            conn.execute(
+        cur = conn.execute("SELECT COUNT(*) as n FROM part2_tasks")
+        if cur.fetchone()["n"] == 0 and PART_2_DATA:
+            conn.executemany(
                 "INSERT INTO part2_tasks (text, answers_json, source) VALUES (?, ?, ?)",
-                (t["text"], json.dumps(t["answers"]), "manual"),
+                ((t["text"], _dumps(t["answers"]), "manual") for t in PART_2_DATA),
             )
-    cur = conn.execute("SELECT COUNT(*) as n FROM part5_tasks")
-    if cur.fetchone()["n"] == 0 and PART_5_DATA:
-        for t in PART_5_DATA:
-            conn.execute(
+        cur = conn.execute("SELECT COUNT(*) as n FROM part5_tasks")
+        if cur.fetchone()["n"] == 0 and PART_5_DATA:
+            conn.executemany(
                 "INSERT INTO part5_tasks (title, text, questions_json, source) VALUES (?, ?, ?, ?)",
-                (t["title"], t["text"], json.dumps(t["questions"]), "manual"),
+                ((t["title"], t["text"], _dumps(t["questions"]), "manual") for t in PART_5_DATA),
             )
-    cur = conn.execute("SELECT COUNT(*) as n FROM part6_tasks")
-    if cur.fetchone()["n"] == 0 and PART_6_DATA:
-        for t in PART_6_DATA:
-            sentences_raw = t.get("sentences", [])
-            sentences_clean = [re.sub(r"^[A-G]\)\s*", "", s).strip() for s in sentences_raw]
-            conn.execute(
+        cur = conn.execute("SELECT COUNT(*) as n FROM part6_tasks")
+        if cur.fetchone()["n"] == 0 and PART_6_DATA:
+            conn.executemany(
                 "INSERT INTO part6_tasks (paragraphs_json, sentences_json, answers_json, source) VALUES (?, ?, ?, ?)",
-                (json.dumps(t["paragraphs"]), json.dumps(sentences_clean), json.dumps(t["answers"]), "manual"),
+                (
+                    (
+                        _dumps(t["paragraphs"]),
+                        _dumps([_strip_part6_letter(s) for s in t.get("sentences", [])]),
+                        _dumps(t["answers"]),
+                        "manual",
+                    )
+                    for t in PART_6_DATA
+                ),
             )
-    cur = conn.execute("SELECT COUNT(*) as n FROM part7_tasks")
-    if cur.fetchone()["n"] == 0 and PART_7_DATA:
-        for t in PART_7_DATA:
-            sections = t.get("sections", [])
-            questions = [{"text": q.get("text"), "correct": q.get("correct")} for q in t.get("questions", [])]
-            conn.execute(
+        cur = conn.execute("SELECT COUNT(*) as n FROM part7_tasks")
+        if cur.fetchone()["n"] == 0 and PART_7_DATA:
+            conn.executemany(
                 "INSERT INTO part7_tasks (sections_json, questions_json, source) VALUES (?, ?, ?)",
-                (json.dumps(sections), json.dumps(questions), "manual"),
+                (
+                    (
+                        _dumps(t.get("sections", [])),
+                        _dumps([{"text": q.get("text"), "correct": q.get("correct")} for q in t.get("questions", [])]),
+                        "manual",
+                    )
+                    for t in PART_7_DATA
+                ),
             )
-    conn.commit()
-    conn.close()
+        for part in _PART_DB_SCHEMA:
+            fill_task_hashes(conn, part)
+        conn.commit()
+    _invalidate_task_caches()
+    _load_task_tables()
 
 
 # --- Part schema (generic task loaders) ---
 
 
 def _parse_part3_row(row):
-    data = json.loads(row["items_json"])
+    data = _loads(row["items_json"])
     if isinstance(data, dict) and "text" in data:
         return {
             "id": row["id"],
@@ -618,54 +893,63 @@ _PART_DB_SCHEMA = {
     1: {
         "table": "part1_tasks",
         "shows": "part1_task_shows",
-        "select": "SELECT id, text, gaps_json, source FROM part1_tasks WHERE id = ?",
-        "parse": lambda row: {"id": row["id"], "text": row["text"], "gaps": json.loads(row["gaps_json"])},
+        "columns": "id, text, gaps_json, source",
+        "parse": lambda row: {"id": row["id"], "text": row["text"], "gaps": _loads(row["gaps_json"])},
+        "dedup_text": lambda task: task["text"],
     },
     3: {
         "table": "part3_tasks",
         "shows": "part3_task_shows",
-        "select": "SELECT id, items_json, source FROM part3_tasks WHERE id = ?",
+        "columns": "id, items_json, source",
         "parse": lambda row: _parse_part3_row(row),
+        "dedup_text": lambda task: task.get("text") or _dumps(task.get("items")),
     },
     2: {
         "table": "part2_tasks",
         "shows": "part2_task_shows",
-        "select": "SELECT id, text, answers_json FROM part2_tasks WHERE id = ?",
-        "parse": lambda row: {"id": row["id"], "text": row["text"], "answers": json.loads(row["answers_json"])},
+        "columns": "id, text, answers_json",
+        "parse": lambda row: {"id": row["id"], "text": row["text"], "answers": _loads(row["answers_json"])},
+        "dedup_text": lambda task: task["text"],
     },
     5: {
         "table": "part5_tasks",
         "shows": "part5_task_shows",
-        "select": "SELECT id, title, text, questions_json FROM part5_tasks WHERE id = ?",
+        "columns": "id, title, text, questions_json",
         "parse": lambda row: {
             "id": row["id"],
             "title": row["title"],
             "text": row["text"],
-            "questions": json.loads(row["questions_json"]),
+            "questions": _loads(row["questions_json"]),
         },
+        "dedup_text": lambda task: task["text"],
     },
     6: {
         "table": "part6_tasks",
         "shows": "part6_task_shows",
-        "select": "SELECT id, paragraphs_json, sentences_json, answers_json FROM part6_tasks WHERE id = ?",
+        "columns": "id, paragraphs_json, sentences_json, answers_json",
         "parse": lambda row: {
             "id": row["id"],
-            "paragraphs": json.loads(row["paragraphs_json"]),
-            "sentences": json.loads(row["sentences_json"]),
-            "answers": json.loads(row["answers_json"]),
+            "paragraphs": _loads(row["paragraphs_json"]),
+            "sentences": _loads(row["sentences_json"]),
+            "answers": _loads(row["answers_json"]),
         },
+        "dedup_text": lambda task: "\n".join(map(str, task["paragraphs"])),
     },
     7: {
         "table": "part7_tasks",
         "shows": "part7_task_shows",
-        "select": "SELECT id, sections_json, questions_json FROM part7_tasks WHERE id = ?",
+        "columns": "id, sections_json, questions_json",
         "parse": lambda row: {
             "id": row["id"],
-            "sections": json.loads(row["sections_json"]),
-            "questions": json.loads(row["questions_json"]),
+            "sections": _loads(row["sections_json"]),
+            "questions": _loads(row["questions_json"]),
         },
+        "dedup_text": lambda task: _dumps(task["sections"]),
     },
 }
+for _schema in _PART_DB_SCHEMA.values():
+    _schema["select"] = f"SELECT {_schema['columns']} FROM {_schema['table']} WHERE id = ?"
+
 
 # Listening parts use part numbers 101-104 to avoid collision with reading parts 1-7
 _LISTENING_DB_SCHEMA = {}
@@ -675,26 +959,40 @@ for _lp in range(1, 5):
     _LISTENING_DB_SCHEMA[_lp] = {
         "table": _tbl,
         "shows": _stbl,
-        "select": f"SELECT id, data_json, audio_path, source FROM {_tbl} WHERE id = ?",
-        "parse": lambda row: {
-            "id": row["id"],
-            "data": json.loads(row["data_json"]),
-            "audio_path": row["audio_path"],
-            "source": row["source"],
-        },
+        "select": f"SELECT id, audio_path, source FROM {_tbl} WHERE id = ?",
+        "data_select": f"SELECT data_json FROM {_tbl} WHERE id = ?",
     }
 
 
-def get_listening_task(part: int, task_id: int) -> dict[str, Any] | None:
+@functools.lru_cache(maxsize=256)
+def _listening_data_cached(part: int, task_id: int) -> Any:
+    """Parsed data_json of a listening task, which never changes once stored.
+    A missing id raises KeyError so that misses are not cached."""
+    with db_connection() as conn:
+        row = conn.execute(_LISTENING_DB_SCHEMA[part]["data_select"], (task_id,)).fetchone()
+    if not row:
+        raise KeyError(task_id)
+    return _loads(row["data_json"])
+
+
+def get_listening_task(part: int, task_id: int) -> Mapping[str, Any] | None:
+    """Read-only listening task mapping, or None.
+
+    audio_path is read from the row on every call: regenerating audio updates it, possibly in
+    another worker process, so only the parsed data is cached.
+    """
     schema = _LISTENING_DB_SCHEMA.get(part)
     if not schema or not task_id:
         return None
     with db_connection() as conn:
-        cur = conn.execute(schema["select"], (task_id,))
-        row = cur.fetchone()
+        row = conn.execute(schema["select"], (task_id,)).fetchone()
     if not row:
         return None
-    return schema["parse"](row)
+    try:
+        data = _listening_data_cached(part, task_id)
+    except KeyError:
+        return None
+    return MappingProxyType({"id": row["id"], "data": data, "audio_path": row["audio_path"], "source": row["source"]})
 
 
 def pick_listening_task_id(part: int, exclude_current: int | None = None) -> int | None:
@@ -735,16 +1033,107 @@ def update_listening_audio_path(part: int, task_id: int, audio_path: str) -> Non
         conn.commit()
 
 
-def get_task_by_id_for_part(part: int, task_id: int | None) -> dict[str, Any] | None:
-    schema = _PART_DB_SCHEMA.get(part)
-    if not schema or not task_id:
-        return None
+@functools.lru_cache(maxsize=1024)
+def _task_by_id_cached(part: int, task_id: int) -> Mapping[str, Any]:
+    """Load and parse one task row. Tasks are never edited once stored, so results are cached
+    per process; a missing id raises KeyError so that misses are not cached."""
+    schema = _PART_DB_SCHEMA[part]
     with db_connection() as conn:
         cur = conn.execute(schema["select"], (task_id,))
         row = cur.fetchone()
     if not row:
+        raise KeyError(task_id)
+    return MappingProxyType(schema["parse"](row))
+
+
+# Tasks present at startup, parsed once per process: {part: {task_id: task}}.
+# Tasks generated later are served through _task_by_id_cached.
+_TASK_TABLES: dict[int, dict[int, Mapping[str, Any]]] = {}
+
+
+def _load_task_tables() -> None:
+    tables = {}
+    with db_connection() as conn:
+        for part, schema in _PART_DB_SCHEMA.items():
+            select_all = f"SELECT {schema['columns']} FROM {schema['table']}"
+            tables[part] = {row["id"]: MappingProxyType(schema["parse"](row)) for row in conn.execute(select_all)}
+    _TASK_TABLES.clear()
+    _TASK_TABLES.update(tables)
+
+
+def _invalidate_task_caches() -> None:
+    _TASK_TABLES.clear()
+    _task_by_id_cached.cache_clear()
+    _listening_data_cached.cache_clear()
+    _get_phrase_task_cached.cache_clear()
+
+
+def get_task_by_id_for_part(part: int, task_id: int | None) -> Mapping[str, Any] | None:
+    """Read-only task mapping for part/task_id, or None."""
+    if part not in _PART_DB_SCHEMA or not task_id:
         return None
-    return schema["parse"](row)
+    task = _TASK_TABLES.get(part, {}).get(task_id)
+    if task is not None:
+        return task
+    try:
+        return _task_by_id_cached(part, task_id)
+    except KeyError:
+        return None
+
+
+def _task_text_hash(text: str) -> str:
+    return hashlib.blake2b(norm(text).encode(), digest_size=16).hexdigest()
+
+
+def fill_task_hashes(conn, part: int) -> None:
+    """Set text_hash on rows of the part's table that have none (seeds, batch inserts). No commit."""
+    schema = _PART_DB_SCHEMA[part]
+    rows = conn.execute(f"SELECT {schema['columns']} FROM {schema['table']} WHERE text_hash IS NULL").fetchall()
+    conn.executemany(
+        f"UPDATE {schema['table']} SET text_hash = ? WHERE id = ?",
+        ((_task_text_hash(schema["dedup_text"](schema["parse"](row))), row["id"]) for row in rows),
+    )
+
+
+def insert_tasks_for_part(conn, part: int, insert_sql: str, rows) -> int:
+    """Bulk counterpart of insert_task_for_part: executemany insert_sql over rows, hash the new
+    tasks and drop those duplicating an existing (or earlier new) task. Returns the number kept.
+    No commit: the caller commits once, so the whole batch is a single transaction.
+    """
+    table = _PART_DB_SCHEMA[part]["table"]
+    last_id = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+    conn.executemany(insert_sql, rows)
+    fill_task_hashes(conn, part)
+    conn.execute(
+        f"""DELETE FROM {table} WHERE id > ? AND EXISTS (
+            SELECT 1 FROM {table} AS older WHERE older.text_hash = {table}.text_hash AND older.id < {table}.id)""",
+        (last_id,),
+    )
+    return conn.execute(f"SELECT COUNT(*) FROM {table} WHERE id > ?", (last_id,)).fetchone()[0]
+
+
+def insert_task_for_part(part: int, insert_sql: str, params: tuple) -> Mapping[str, Any]:
+    """Run insert_sql (an INSERT into the part's task table) and return the stored task,
+    read back in the same statement with RETURNING.
+
+    If a task with the same normalized text already exists, the insert is rolled back and the
+    existing task is returned instead.
+    """
+    schema = _PART_DB_SCHEMA[part]
+    with db_connection() as conn:
+        row = conn.execute(f"{insert_sql} RETURNING {schema['columns']}", params).fetchone()
+        task = schema["parse"](row)
+        text_hash = _task_text_hash(schema["dedup_text"](task))
+        dup = conn.execute(
+            f"SELECT id FROM {schema['table']} WHERE text_hash = ? AND id != ? LIMIT 1", (text_hash, task["id"])
+        ).fetchone()
+        if dup:
+            conn.rollback()
+            logger.info("Generated Part %d task duplicates task %d; reusing it", part, dup["id"])
+            return get_task_by_id_for_part(part, dup["id"])
+        conn.execute(f"UPDATE {schema['table']} SET text_hash = ? WHERE id = ?", (text_hash, task["id"]))
+        conn.commit()
+    return MappingProxyType(task)
 
 
 def record_show_for_part(part: int, task_id: int) -> None:
@@ -753,34 +1142,42 @@ def record_show_for_part(part: int, task_id: int) -> None:
         _record_show(schema["shows"], task_id)
 
 
-def _generic_get_or_create(part, generate_fn, exclude_task_id=None, openai_available=False):
-    """Generic get-or-create for any part. Picks from DB, generates if needed (when openai_available and generate_fn), records show.
+def count_unseen_tasks(part: int, limit: int) -> int:
+    """Number of tasks for part not among the recent shows, counted up to limit."""
+    schema = _PART_DB_SCHEMA.get(part)
+    if not schema:
+        return 0
+    with db_connection() as conn:
+        sql = _pick_sql(schema["table"], schema["shows"])["count_unseen"]
+        params = {"recent": _recent_shows_json(schema["shows"]), "exclude": None, "limit": limit}
+        return conn.execute(sql, params).fetchone()[0]
+
+
+def _table_has_rows(table: str) -> bool:
+    with db_connection() as conn:
+        return conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() is not None
+
+
+def _generic_get_or_create(part, generate_fn, exclude_task_id=None, openai_available=False, batch_fn=None):
+    """Generic get-or-create for any part. Picks from DB and records the show.
+    When AI is available, a low pool of unseen tasks is refilled in the background; generation
+    only runs inline when the part has no tasks at all. batch_fn(n), if given, is used for refills.
     Returns (item, task_id) or (None, None)."""
     schema = _PART_DB_SCHEMA.get(part)
     if not schema:
         return (None, None)
     task_id = pick_task_id_for_part(part, exclude_current=exclude_task_id)
-    if task_id is None and openai_available and generate_fn:
+    if openai_available and generate_fn:
+        from app.services.task_pool import ensure_task_pool
+
+        ensure_task_pool(part, generate_fn, batch_fn)
+    if task_id is None and openai_available and generate_fn and not _table_has_rows(schema["table"]):
         item = generate_fn()
         if item:
-            with db_connection() as conn:
-                cur = conn.execute(f"SELECT id FROM {schema['table']} ORDER BY id DESC LIMIT 1")
-                row = cur.fetchone()
-            if row:
-                record_show_for_part(part, row["id"])
-                return (item, row["id"])
-            return (item, None)
+            record_show_for_part(part, item["id"])
+            return (item, item["id"])
     if task_id is None:
-        with db_connection() as conn:
-            if exclude_task_id is not None:
-                cur = conn.execute(
-                    f"SELECT id FROM {schema['table']} WHERE id != ? ORDER BY RANDOM() LIMIT 1",
-                    (exclude_task_id,),
-                )
-            else:
-                cur = conn.execute(f"SELECT id FROM {schema['table']} ORDER BY RANDOM() LIMIT 1")
-            row = cur.fetchone()
-            task_id = row["id"] if row else None
+        task_id = _pick_any_task_id(schema["table"], schema["shows"], exclude_task_id)
     if task_id is None:
         return (None, None)
     record_show_for_part(part, task_id)
@@ -801,51 +1198,100 @@ def get_excluded_task_ids() -> list[int]:
 # --- Part 4 / UOE helpers ---
 
 
-def pick_task_ids_from_db(count: int, recent_grammar_topics=None):
-    recent_grammar_topics = recent_grammar_topics or []
-    excluded = get_excluded_task_ids()
+_UOE_TASK_COLUMNS = "id, sentence1, keyword, sentence2, answer, grammar_topic"
+
+
+# Below this max(id) ORDER BY RANDOM() over the whole table is cheap. Above it, pick_tasks_from_db
+# samples random ids in [1, max(id)] and reads only those rows, falling back to the full sort
+# when a few rounds of sampling do not find enough eligible tasks (gaps, many recent shows).
+_RANGE_SAMPLE_MIN_ID = 1000
+_RANGE_SAMPLE_ROUNDS = 3
+# Rows that are not recently shown, have an answer of :min_words..:max_words words (word_count is
+# registered on every connection) and contain the keyword somewhere in the answer.
+_UOE_PICK_WHERE = (
+    "id NOT IN (SELECT value FROM json_each(:recent)) "
+    "AND word_count(answer) BETWEEN :min_words AND :max_words AND instr(lower(answer), lower(keyword)) > 0"
+)
+_UOE_SAMPLE_SQL = (
+    f"SELECT {_UOE_TASK_COLUMNS} FROM uoe_tasks WHERE id IN (SELECT value FROM json_each(:ids)) AND {_UOE_PICK_WHERE}"
+)
+_UOE_PICK_SQL = f"SELECT {_UOE_TASK_COLUMNS} FROM uoe_tasks WHERE {_UOE_PICK_WHERE} ORDER BY RANDOM() LIMIT :limit"
+_UOE_PICK_BY_TOPIC_SQL = (
+    f"SELECT {_UOE_TASK_COLUMNS} FROM uoe_tasks WHERE {_UOE_PICK_WHERE} ORDER BY "
+    "CASE WHEN grammar_topic IN (SELECT value FROM json_each(:topics)) THEN 1 ELSE 0 END, RANDOM() LIMIT :limit"
+)
+
+
+def _sample_uoe_tasks(conn, max_id: int, count: int, params: dict, avoid_topics: set) -> list[dict[str, Any]] | None:
+    """count rows at random ids, preferring topics not in avoid_topics; None if sampling falls short."""
+    found: dict[int, dict[str, Any]] = {}
+    preferred = 0
+    for _ in range(_RANGE_SAMPLE_ROUNDS):
+        ids = random.sample(range(1, max_id + 1), min(max_id, count * 4))
+        for r in conn.execute(_UOE_SAMPLE_SQL, {**params, "ids": _dumps(ids)}):
+            if r["id"] not in found:
+                found[r["id"]] = dict(r)
+                preferred += r["grammar_topic"] not in avoid_topics
+        if preferred >= count:
+            break
+    else:
+        return None
+    rows = list(found.values())
+    random.shuffle(rows)
+    rows.sort(key=lambda t: t["grammar_topic"] in avoid_topics)
+    return rows[:count]
+
+
+def pick_tasks_from_db(
+    count: int, recent_grammar_topics=None, answer_words: tuple[int, int] = (1, 1 << 30)
+) -> list[dict[str, Any]]:
+    """Up to count random uoe_tasks rows not shown recently; tasks on a recent grammar topic go last.
+
+    Only rows whose answer has answer_words (min, max) words and contains the keyword are picked,
+    so callers' checks reject fewer rows. Reads the rows in the same query that picks them. Both
+    lists are bound as single parameters (json_each), so the SQL text is the same on every call.
+    """
+    params = {
+        "recent": _recent_shows_json("uoe_task_shows"),
+        "min_words": answer_words[0],
+        "max_words": answer_words[1],
+        "limit": count,
+    }
     with db_connection() as conn:
-        if recent_grammar_topics and _uoe_has_grammar_topic_column(conn):
-            placeholders = ",".join("?" * len(recent_grammar_topics))
-            order = f"CASE WHEN grammar_topic IN ({placeholders}) THEN 1 ELSE 0 END, RANDOM()"
-            if excluded:
-                ph_ex = ",".join("?" * len(excluded))
-                cur = conn.execute(
-                    f"SELECT id FROM uoe_tasks WHERE id NOT IN ({ph_ex}) ORDER BY {order} LIMIT ?",
-                    (*excluded, *recent_grammar_topics, count * 2),
-                )
-            else:
-                cur = conn.execute(
-                    f"SELECT id FROM uoe_tasks ORDER BY {order} LIMIT ?",
-                    (*recent_grammar_topics, count * 2),
-                )
+        by_topic = bool(recent_grammar_topics) and _uoe_has_grammar_topic_column(conn)
+        max_id = conn.execute("SELECT max(id) FROM uoe_tasks").fetchone()[0] or 0
+        if max_id >= _RANGE_SAMPLE_MIN_ID:
+            avoid_topics = set(recent_grammar_topics) if by_topic else set()
+            rows = _sample_uoe_tasks(conn, max_id, count, params, avoid_topics)
+            if rows is not None:
+                return rows
+        if by_topic:
+            cur = conn.execute(_UOE_PICK_BY_TOPIC_SQL, {**params, "topics": _dumps(recent_grammar_topics)})
         else:
-            if excluded:
-                ph = ",".join("?" * len(excluded))
-                cur = conn.execute(
-                    f"SELECT id FROM uoe_tasks WHERE id NOT IN ({ph}) ORDER BY RANDOM() LIMIT ?",
-                    (*excluded, count * 2),
-                )
-            else:
-                cur = conn.execute("SELECT id FROM uoe_tasks ORDER BY RANDOM() LIMIT ?", (count * 2,))
-        ids = [r["id"] for r in cur.fetchall()]
-    return ids[: count * 2]
+            cur = conn.execute(_UOE_PICK_SQL, params)
+        return [dict(r) for r in cur.fetchall()]
 
 
-def _uoe_has_grammar_topic_column(conn=None):
-    if conn is None:
-        with db_connection() as c:
-            cur = c.execute("PRAGMA table_info(uoe_tasks)")
-            return any(r["name"] == "grammar_topic" for r in cur.fetchall())
-    cur = conn.execute("PRAGMA table_info(uoe_tasks)")
-    return any(r["name"] == "grammar_topic" for r in cur.fetchall())
+# Whether uoe_tasks has the grammar_topic column. The schema only changes through migrations,
+# so it is read once per process; _ensure_uoe_grammar_topic_column resets it.
+_uoe_grammar_topic_column: bool | None = None
+
+
+def _uoe_has_grammar_topic_column(conn=None) -> bool:
+    global _uoe_grammar_topic_column
+    if _uoe_grammar_topic_column is None:
+        with contextlib.ExitStack() as stack:
+            if conn is None:
+                conn = stack.enter_context(db_connection())
+            cols = {r["name"] for r in conn.execute("PRAGMA table_info(uoe_tasks)")}
+        _uoe_grammar_topic_column = "grammar_topic" in cols
+    return _uoe_grammar_topic_column
 
 
 def get_recent_grammar_topics(limit=20):
     try:
         with db_connection() as conn:
-            cur = conn.execute("PRAGMA table_info(uoe_tasks)")
-            if not any(r["name"] == "grammar_topic" for r in cur.fetchall()):
+            if not _uoe_has_grammar_topic_column(conn):
                 return []
             cur = conn.execute(
                 """
@@ -857,40 +1303,44 @@ def get_recent_grammar_topics(limit=20):
             """,
                 (limit,),
             )
-            return [r["grammar_topic"].strip() for r in cur.fetchall() if r.get("grammar_topic")]
+            return [r["grammar_topic"].strip() for r in cur.fetchall()]
     except Exception:
         return []
 
 
 def record_shows(task_ids: list[int]) -> None:
+    recent = _recent_shows("uoe_task_shows")
     with db_connection() as conn:
-        for tid in task_ids:
-            conn.execute("INSERT INTO uoe_task_shows (task_id, shown_at) VALUES (?, datetime('now'))", (tid,))
+        conn.executemany(_shows_sql("uoe_task_shows")["insert"], ((tid,) for tid in task_ids))
         conn.commit()
+    recent.extend(task_ids)
+
+
+# The id list is bound as one JSON parameter, so the statement text is the same for any number of ids
+_UOE_TASKS_BY_IDS_SQL = (
+    "SELECT id, sentence1, keyword, sentence2, answer, grammar_topic FROM uoe_tasks "
+    "WHERE id IN (SELECT value FROM json_each(?))"
+)
+_UOE_TASKS_BY_IDS_NO_TOPIC_SQL = (
+    "SELECT id, sentence1, keyword, sentence2, answer, NULL FROM uoe_tasks WHERE id IN (SELECT value FROM json_each(?))"
+)
 
 
 def get_tasks_by_ids(ids: list[int]) -> list[dict[str, Any]]:
     if not ids:
         return []
-    ph = ",".join("?" * len(ids))
+    ids_json = _dumps(ids)
     with db_connection() as conn:
         try:
-            cur = conn.execute(
-                f"SELECT id, sentence1, keyword, sentence2, answer, grammar_topic FROM uoe_tasks WHERE id IN ({ph})",
-                ids,
-            )
+            cur = conn.execute(_UOE_TASKS_BY_IDS_SQL, (ids_json,))
         except sqlite3.OperationalError:
-            cur = conn.execute(
-                f"SELECT id, sentence1, keyword, sentence2, answer FROM uoe_tasks WHERE id IN ({ph})",
-                ids,
-            )
-        rows = cur.fetchall()
-    by_id = {r["id"]: dict(r) for r in rows}
-    out = [by_id[i] for i in ids if i in by_id]
-    for r in out:
-        if "grammar_topic" not in r:
-            r["grammar_topic"] = None
-    return out
+            cur = conn.execute(_UOE_TASKS_BY_IDS_NO_TOPIC_SQL, (ids_json,))
+        # Unpacked by position: one dict per row, no Row -> dict copy
+        by_id = {
+            tid: {"id": tid, "sentence1": s1, "keyword": kw, "sentence2": s2, "answer": ans, "grammar_topic": topic}
+            for tid, s1, kw, s2, ans, topic in cur
+        }
+    return [by_id[i] for i in ids if i in by_id]
 
 
 def uoe_task_exists(sentence1: str, keyword: str) -> bool:
@@ -955,18 +1405,27 @@ def record_part7_show(tid):
 
 # --- Get phrase tasks (study mode) ---
 
-def get_get_phrase_task_by_id(tid: int | None) -> dict[str, Any] | None:
-    if not tid:
-        return None
+@functools.lru_cache(maxsize=256)
+def _get_phrase_task_cached(tid: int) -> Mapping[str, Any]:
+    """Get-phrase tasks are never edited once stored; a missing id raises KeyError (not cached)."""
     with db_connection() as conn:
-        cur = conn.execute(
-            "SELECT id, items_json, source FROM get_phrase_tasks WHERE id = ?",
-            (tid,),
-        )
-        row = cur.fetchone()
+        row = conn.execute("SELECT id, items_json, source FROM get_phrase_tasks WHERE id = ?", (tid,)).fetchone()
     if not row:
+        raise KeyError(tid)
+    return MappingProxyType(_parse_get_phrase_row(row))
+
+
+def get_get_phrase_task_by_id(tid: int | None) -> Mapping[str, Any] | None:
+    if not tid:
+        return None
+    try:
+        return _get_phrase_task_cached(tid)
+    except KeyError:
         return None
-    data = json.loads(row["items_json"])
+
+
+def _parse_get_phrase_row(row) -> dict[str, Any]:
+    data = _loads(row["items_json"])
     return {
         "id": row["id"],
         "text": data.get("text", ""),
@@ -976,26 +1435,61 @@ def get_get_phrase_task_by_id(tid: int | None) -> dict[str, Any] | None:
 
 
 def pick_get_phrase_task_id(exclude_task_id: int | None = None) -> int | None:
-    excluded = list(_get_excluded_ids("get_phrase_task_shows"))
-    if exclude_task_id is not None and exclude_task_id not in excluded:
-        excluded.append(exclude_task_id)
-    with db_connection() as conn:
-        if excluded:
-            ph = ",".join("?" * len(excluded))
-            cur = conn.execute(
-                "SELECT id FROM get_phrase_tasks WHERE id NOT IN ({}) ORDER BY RANDOM() LIMIT 1".format(ph),
-                excluded,
-            )
-        else:
-            cur = conn.execute("SELECT id FROM get_phrase_tasks ORDER BY RANDOM() LIMIT 1")
-        row = cur.fetchone()
-        return row["id"] if row else None
+    return _pick_one_task_id("get_phrase_tasks", "get_phrase_task_shows", exclude_task_id)
 
 
 def record_get_phrase_show(task_id: int) -> None:
+    _record_show("get_phrase_task_shows", task_id)
+
+
+# --- AI response cache ---
+
+
+_AI_CACHE_TTL = f"-{AI_RESPONSE_CACHE_TTL_DAYS} days"
+
+
+def get_cached_ai_response(request_hash: str) -> str | None:
+    """Cached reply for request_hash, or None if missing or older than AI_RESPONSE_CACHE_TTL_DAYS."""
+    with db_connection() as conn:
+        row = conn.execute(
+            "SELECT content FROM ai_response_cache WHERE request_hash = ? AND created_at >= datetime('now', ?)",
+            (request_hash, _AI_CACHE_TTL),
+        ).fetchone()
+    return row["content"] if row else None
+
+
+def store_ai_response(request_hash: str, model: str, temperature: float, content: str) -> None:
+    """Store a reply (replacing an expired one) and prune expired entries in the same commit."""
+    with db_connection() as conn:
+        conn.execute("DELETE FROM ai_response_cache WHERE created_at < datetime('now', ?)", (_AI_CACHE_TTL,))
+        conn.execute(
+            "INSERT OR REPLACE INTO ai_response_cache (request_hash, model, temperature, content) VALUES (?, ?, ?, ?)",
+            (request_hash, model, temperature, content),
+        )
+        conn.commit()
+
+
+# --- Check result cache ---
+
+
+def store_check_result(token: str, payload: str | bytes, expires_at: int) -> None:
+    """Store a serialised check result until expires_at (unix time), pruning expired entries."""
     with db_connection() as conn:
+        conn.execute("DELETE FROM check_result_cache WHERE expires_at <= ?", (int(time.time()),))
         conn.execute(
-            "INSERT INTO get_phrase_task_shows (task_id, shown_at) VALUES (?, datetime('now'))",
-            (task_id,),
+            "INSERT OR REPLACE INTO check_result_cache (token, payload, expires_at) VALUES (?, ?, ?)",
+            (token, payload, expires_at),
         )
         conn.commit()
+
+
+def pop_check_result(token: str) -> str | bytes | None:
+    """Delete and return the payload stored under token, or None if missing or expired."""
+    with db_connection() as conn:
+        row = conn.execute(
+            "DELETE FROM check_result_cache WHERE token = ? RETURNING payload, expires_at", (token,)
+        ).fetchone()
+        conn.commit()
+    if row is None or row["expires_at"] <= time.time():
+        return None
+    return row["payload"]
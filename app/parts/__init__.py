@@ -1,10 +1,9 @@
 """Part registry: CHECKERS, task config, generate config, error messages, and re-exports."""
-from flask import session
-
 from app.config import PARTS_RANGE, PART_QUESTION_COUNTS
 from app.db import get_task_by_id_for_part, get_tasks_by_ids
 
 from . import part1, part2, part3, part4, part5, part6, part7
+from .checking import session_task_id
 
 PARTS = {1: part1, 2: part2, 3: part3, 4: part4, 5: part5, 6: part6, 7: part7}
 
@@ -49,11 +48,7 @@ def _ensure_part_task(part, exclude_task_id=None):
     if part not in _PART_TASK_CONFIG:
         return None, None
     key, get_or_create, get_by_id = _PART_TASK_CONFIG[part]
-    if not session.get(key):
-        _, tid = get_or_create(exclude_task_id=exclude_task_id)
-        if tid:
-            session[key] = tid
-    tid = session.get(key)
+    tid = session_task_id(key, lambda: get_or_create(exclude_task_id=exclude_task_id))
     return (get_by_id(tid) if tid else None, tid)
 
 
@@ -0,0 +1,79 @@
+"""Shared answer scoring for the check_partN functions.
+
+Each part supplies its answer key and how to read and compare a submitted value;
+score_answers() runs the common loop: form fields → read → compare → details.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable, Mapping, Sequence
+from typing import Any
+
+from flask import session
+
+from app.config import MAX_EXPLANATION_LEN
+from app.utils import answers_match, form_answers
+
+
+def session_task_id(key: str, get_or_create: Callable[[], tuple[Any, int | None]]) -> int | None:
+    """Task id stored in session[key]; when there is none, get_or_create() picks one and it is stored."""
+    task_id = session.get(key)
+    if not task_id:
+        _, task_id = get_or_create()
+        if task_id:
+            session[key] = task_id
+    return task_id
+
+
+def read_text(raw: str | None) -> str:
+    return (raw or "").strip()
+
+
+def read_choice(raw: str | None) -> int:
+    """Selected option index, or -1 when nothing (or garbage) was submitted."""
+    try:
+        return int(raw)
+    except (TypeError, ValueError):
+        return -1
+
+
+def same(user_val: Any, key: Any) -> bool:
+    return user_val == key
+
+
+def strict_match(user_val: str, key: str) -> bool:
+    return answers_match(user_val, key, strict=True)
+
+
+def score_answers(
+    form: Mapping[str, str],
+    prefix: str,
+    keys: Sequence[Any],
+    *,
+    read: Callable[[str | None], Any] = read_text,
+    compare: Callable[[Any, Any], bool] = answers_match,
+    expected: Sequence[str] | None = None,
+) -> tuple[int, list[dict]]:
+    """Score the form fields prefix0, prefix1, … against keys. Returns (score, details).
+
+    *expected* is the answer shown to the user for each gap; when given it is stored in the details.
+    """
+    user_vals = form_answers(form, prefix)
+    details = []
+    score = 0
+    for i, key in enumerate(keys):
+        user_val = read(user_vals.get(i))
+        correct = compare(user_val, key)
+        if correct:
+            score += 1
+        detail = {"correct": correct, "user_val": user_val}
+        if expected is not None:
+            detail["expected"] = expected[i]
+        details.append(detail)
+    return score, details
+
+
+def attach_explanations(details: list[dict], explanations: Sequence[Any]) -> None:
+    """Store the AI explanations (one string per gap, in order) on the matching details."""
+    for detail, exp in zip(details, explanations, strict=False):
+        if exp:
+            detail["explanation"] = str(exp)[:MAX_EXPLANATION_LEN].strip()
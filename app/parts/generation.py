@@ -0,0 +1,72 @@
+"""Shared single-task generator for Parts 1, 2, 3, 5, 6 and 7.
+
+Each part describes its generation with a TaskSpec (topics, prompt, validation, INSERT);
+generate_task() runs the common steps: topic → RAG examples → AI call → JSON → validate → store.
+"""
+from __future__ import annotations
+
+import logging
+import random
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from app.ai import ai_available, chat_create, chat_create_json
+from app.db import insert_task_for_part
+from app.rag.helpers import get_rag_examples_text
+
+logger = logging.getLogger("fce_trainer")
+
+Messages = list[dict[str, str]]
+
+
+@dataclass(frozen=True)
+class TaskSpec:
+    part: int
+    topics: Sequence[str]
+    # (topic, level, ref_examples) -> chat messages
+    messages: Callable[[str, str, str], Messages]
+    # parsed JSON -> cleaned task data, or None to reject the reply
+    validate: Callable[[dict], dict | None]
+    insert_sql: str
+    # cleaned task data -> INSERT parameters
+    to_row: Callable[[dict], tuple]
+    temperature: float = 0.7
+    attempts: int = 1
+    # raw reply text -> JSON object; None streams the reply through chat_create_json
+    parse: Callable[[str], dict | None] | None = None
+
+
+def user_prompt(prompt_fn: Callable[..., str]) -> Callable[[str, str, str], Messages]:
+    """Adapt a get_task_prompt_partN(topic, level=, ref_examples=) builder to a single user message."""
+
+    def messages(topic: str, level: str, ref_examples: str) -> Messages:
+        return [{"role": "user", "content": prompt_fn(topic, level=level, ref_examples=ref_examples)}]
+
+    return messages
+
+
+def _reply_json(spec: TaskSpec, messages: Messages) -> dict | None:
+    if spec.parse is None:
+        return chat_create_json(messages, temperature=spec.temperature)
+    comp = chat_create(messages, temperature=spec.temperature)
+    return spec.parse((comp.choices[0].message.content or "").strip())
+
+
+def generate_task(spec: TaskSpec, level: str = "b2") -> Mapping[str, Any] | None:
+    """Generate, validate and store one task for spec.part. Returns the stored task or None."""
+    if not ai_available:
+        return None
+    topic = random.choice(spec.topics)
+    ref_examples = get_rag_examples_text(part=spec.part, topic=topic)
+    messages = spec.messages(topic, level, ref_examples)
+    for attempt in range(spec.attempts):
+        try:
+            data = _reply_json(spec, messages)
+            validated = spec.validate(data) if data else None
+            if validated:
+                return insert_task_for_part(spec.part, spec.insert_sql, spec.to_row(validated))
+        except Exception:
+            if attempt == spec.attempts - 1:
+                logger.exception("OpenAI Part %d error", spec.part)
+    return None
@@ -1,19 +1,19 @@
 """Get phrases: study mode — 8 gaps, each gap = correct collocation with GET (e.g. get over, get rid of)."""
-import json
 import logging
 import re
 
-from flask import session
-
 from app.ai import chat_create, ai_available
 from app.ai.prompts import get_task_prompt_get_phrases
 from app.ai.explanations import fetch_explanations_get_phrases
 from app.config import GET_PHRASE_PART, MAX_EXPLANATION_LEN
-from app.db import db_connection, get_get_phrase_task_by_id, pick_get_phrase_task_id, record_get_phrase_show
-from app.utils import e as _e, answers_match, extract_json_object, validate_get_phrase_data
+from app.db import _parse_get_phrase_row, db_connection, get_get_phrase_task_by_id, pick_get_phrase_task_id, record_get_phrase_show
+from app.parts.checking import score_answers, session_task_id
+from app.utils import e as _e, extract_json_object, format_explanation_list, json_dumps, validate_get_phrase_data
 
 logger = logging.getLogger("fce_trainer")
 
+_GAP_SPLIT_RE = re.compile(r"\([1-8]\)_____")
+
 
 def generate_get_phrase_with_openai(level="b2"):
     if not ai_available:
@@ -32,13 +32,12 @@ def generate_get_phrase_with_openai(level="b2"):
             if not validated:
                 continue
             with db_connection() as conn:
-                cur = conn.execute(
-                    "INSERT INTO get_phrase_tasks (items_json, source) VALUES (?, ?)",
-                    (json.dumps(validated), "openai"),
-                )
-                tid = cur.lastrowid
+                row = conn.execute(
+                    "INSERT INTO get_phrase_tasks (items_json, source) VALUES (?, ?) RETURNING id, items_json, source",
+                    (json_dumps(validated), "openai"),
+                ).fetchone()
                 conn.commit()
-            return get_get_phrase_task_by_id(tid)
+            return _parse_get_phrase_row(row)
         except Exception:
             if attempt == 2:
                 logger.exception("OpenAI Get phrases error")
@@ -51,34 +50,34 @@ def get_or_create_get_phrase_item(exclude_task_id=None):
     if task_id is None and ai_available:
         item = generate_get_phrase_with_openai()
         if item:
-            with db_connection() as conn:
-                cur = conn.execute("SELECT id FROM get_phrase_tasks ORDER BY id DESC LIMIT 1")
-                row = cur.fetchone()
-            if row:
-                record_get_phrase_show(row["id"])
-                return (item, row["id"])
-            return (item, None)
+            record_get_phrase_show(item["id"])
+            return (item, item["id"])
     if task_id is None:
         return (None, None)
     record_get_phrase_show(task_id)
     return (get_get_phrase_task_by_id(task_id), task_id)
 
 
+_GET_PHRASE_HINT = '<p class="get-phrase-hint">Each gap needs a phrase with <strong>get</strong> (e.g. get over, get rid of, get along with, get through).</p>'
+
+
 def build_get_phrase_html(task, check_result=None):
     if not task or not task.get("text") or not task.get("answers") or len(task.get("answers", [])) < 8:
         return "<p>No data.</p>"
     text = (task.get("text") or "").strip()
     answers = task.get("answers") or []
-    parts = re.split(r"\((?:1|2|3|4|5|6|7|8)\)_____", text)
+    parts = _GAP_SPLIT_RE.split(text)
     if len(parts) != 9:
         return "<p>Invalid get-phrase text format.</p>"
-    out = []
+    details = (check_result.get("details") if check_result else None) or []
+    n_details = len(details)
+    out = ['<div class="get-phrase-single reading-text exercise cloze-text">', _GET_PHRASE_HINT]
     for i in range(8):
         val = ""
         cls = ""
-        if check_result and check_result.get("details") and i < len(check_result["details"]):
-            val = check_result["details"][i].get("user_val", "")
-            cls = " result-correct" if check_result["details"][i].get("correct") else " result-wrong"
+        if i < n_details:
+            val = details[i].get("user_val", "")
+            cls = " result-correct" if details[i].get("correct") else " result-wrong"
         out.append(_e(parts[i]))
         out.append(
             f'<span class="gap-inline part3-gap{cls}">'
@@ -86,59 +85,19 @@ def build_get_phrase_html(task, check_result=None):
             f"</span>"
         )
     out.append(_e(parts[8]))
-    left_html = "".join(out)
-    if check_result and check_result.get("details"):
-        expl_list = []
-        for i, d in enumerate(check_result["details"]):
-            if i >= 8:
-                break
-            expected = d.get("expected", answers[i] if i < len(answers) else "")
-            correct = d.get("correct")
-            exp = d.get("explanation", "")
-            li_cls = " part2-expl-correct" if correct else " part2-expl-wrong"
-            if not correct and expected:
-                body = f'<span class="part2-expl-correct">Correct: <em>{_e(expected)}</em></span>. <span class="part2-expl-reason">{_e(exp)}</span>'
-            elif correct and exp:
-                body = f'<span class="part2-expl-reason">{_e(exp)}</span>'
-            elif correct:
-                body = "Correct."
-            else:
-                body = f'<span class="part2-expl-correct">Correct: <em>{_e(expected)}</em></span>.'
-            expl_list.append(f'<li class="part2-expl-item{li_cls}"><strong>Gap {i + 1}:</strong> {body}</li>')
-        if expl_list:
-            left_html += (
-                '<div class="explanations-block">'
-                '<h4>Why this answer is correct / why it is wrong</h4>'
-                '<ol class="answer-explanations">' + "".join(expl_list) + "</ol></div>"
-            )
-    hint = '<p class="get-phrase-hint">Each gap needs a phrase with <strong>get</strong> (e.g. get over, get rid of, get along with, get through).</p>'
-    return (
-        '<div class="get-phrase-single reading-text exercise cloze-text">'
-        + hint
-        + left_html
-        + "</div>"
-    )
+    if details:
+        out.append(format_explanation_list(details, answers))
+    out.append("</div>")
+    return "".join(out)
 
 
 def check_get_phrases(form):
-    task_id = session.get("get_phrase_task_id")
-    if not task_id:
-        _, task_id = get_or_create_get_phrase_item()
-        if task_id:
-            session["get_phrase_task_id"] = task_id
+    task_id = session_task_id("get_phrase_task_id", get_or_create_get_phrase_item)
     task = get_get_phrase_task_by_id(task_id) if task_id else None
     if not task or not task.get("answers") or len(task["answers"]) < 8:
         return None
-    answers = task["answers"]
-    details = []
-    score = 0
-    for i in range(8):
-        user_val = (form.get(f"gp_{i}") or "").strip()
-        expected = answers[i] if i < len(answers) else ""
-        correct = answers_match(user_val, expected)
-        if correct:
-            score += 1
-        details.append({"correct": correct, "user_val": user_val, "expected": expected})
+    answers = task["answers"][:8]
+    score, details = score_answers(form, "gp_", answers, expected=answers)
     result = {"part": GET_PHRASE_PART, "score": score, "total": 8, "details": details}
     explanations_data = fetch_explanations_get_phrases(task, details)
     for i, data in enumerate(explanations_data):
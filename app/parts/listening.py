@@ -1,9 +1,9 @@
 """FCE Listening Parts 1–4: generation, checking, audio management."""
 from __future__ import annotations
 
-import json
 import logging
 import random
+from collections.abc import Mapping
 from pathlib import Path
 
 from app.ai import chat_create, ai_available
@@ -19,7 +19,6 @@ from app.ai.prompts.listening_generation import (
 )
 from app.config import LISTENING_QUESTION_COUNTS
 from app.db import (
-    db_connection,
     get_listening_task,
     pick_listening_task_id,
     record_listening_show,
@@ -27,7 +26,7 @@ from app.db import (
     update_listening_audio_path,
 )
 from app.services.tts import generate_listening_audio
-from app.utils import extract_json_object
+from app.utils import extract_json_object, json_dumps
 
 logger = logging.getLogger("fce_trainer")
 
@@ -237,7 +236,7 @@ def generate_listening_task(part: int) -> dict | None:
             audio_url = None
 
         # Save to DB
-        data_json = json.dumps(data, ensure_ascii=False)
+        data_json = json_dumps(data)
         task_id = save_listening_task(part, data_json, audio_url)
 
         if task_id:
@@ -262,19 +261,10 @@ def get_or_create_listening_task(part: int, exclude_id: int | None = None) -> tu
 
     # Fallback to any existing task
     if task_id is None:
-        from app.db import _LISTENING_DB_SCHEMA
+        from app.db import _LISTENING_DB_SCHEMA, _pick_any_task_id
         schema = _LISTENING_DB_SCHEMA.get(part)
         if schema:
-            with db_connection() as conn:
-                if exclude_id is not None:
-                    cur = conn.execute(
-                        f"SELECT id FROM {schema['table']} WHERE id != ? ORDER BY RANDOM() LIMIT 1",
-                        (exclude_id,),
-                    )
-                else:
-                    cur = conn.execute(f"SELECT id FROM {schema['table']} ORDER BY RANDOM() LIMIT 1")
-                row = cur.fetchone()
-                task_id = row["id"] if row else None
+            task_id = _pick_any_task_id(schema["table"], schema["shows"], exclude_id)
 
     if task_id is None:
         return None, None
@@ -289,7 +279,7 @@ def get_or_create_listening_task(part: int, exclude_id: int | None = None) -> tu
     return task, task_id
 
 
-def retry_audio_generation(part: int, task: dict, force: bool = False) -> dict:
+def retry_audio_generation(part: int, task: Mapping, force: bool = False) -> Mapping:
     """Generate (or re-generate) audio for a listening task."""
     if not force and task.get("audio_path"):
         return task
@@ -310,7 +300,7 @@ def retry_audio_generation(part: int, task: dict, force: bool = False) -> dict:
                 except Exception:
                     pass
             update_listening_audio_path(part, task["id"], audio_url)
-            task["audio_path"] = audio_url
+            task = {**task, "audio_path": audio_url}
             logger.info("Audio generated for listening part %d task %d", part, task["id"])
     except Exception:
         logger.exception("Audio generation failed for listening part %d task %d", part, task.get("id"))
@@ -1,114 +1,117 @@
 """Part 1: Multiple-choice cloze — 8 gaps, A/B/C/D."""
-import json
 import logging
 import random
-import re
 
 from flask import session
 
 from app.ai import chat_create, ai_available
-from app.ai.prompts import get_task_prompt_part1
+from app.ai.prompts import get_task_messages_part1, get_task_prompt_batch, get_task_prompt_part1
 from app.ai.explanations import fetch_explanations_part1
 from app.config import LETTERS
 from app.db import (
     db_connection,
     get_part1_task_by_id,
     _generic_get_or_create,
+    insert_tasks_for_part,
     record_show_for_part,
 )
+from app.parts.checking import attach_explanations, read_choice, same, score_answers
+from app.parts.generation import TaskSpec, generate_task
 from app.parts.topics import PART1_TOPICS
-from app.rag.helpers import get_rag_examples_text
-from app.utils import e as _e, extract_json_object, validate_part1_data
+from app.utils import e as _e, escaped_segments, explanation_item, explanations_block, extract_json_array, json_dumps, validate_part1_data
 
 logger = logging.getLogger("fce_trainer")
 
 
+PART1_SPEC = TaskSpec(
+    part=1,
+    topics=PART1_TOPICS,
+    messages=lambda topic, level, ref_examples: get_task_messages_part1(topic, level, ref_examples=ref_examples),
+    validate=validate_part1_data,
+    insert_sql="INSERT INTO part1_tasks (text, gaps_json, source) VALUES (?, ?, ?)",
+    to_row=lambda v: (v["text"], json_dumps(v["gaps"]), "openai"),
+    temperature=0.8,
+)
+
+
 def generate_part1_with_openai(level="b2"):
-    if not ai_available:
-        return None
+    return generate_task(PART1_SPEC, level)
+
+
+def generate_part1_batch(n=5, level="b2"):
+    """Generate up to n Part 1 tasks (one topic each) with a single AI call. Returns the number stored."""
+    if not ai_available or n < 1:
+        return 0
     level = (level or "b2").strip().lower()
     if level != "b2plus":
         level = "b2"
-    topic = random.choice(PART1_TOPICS)
-    ref_examples = get_rag_examples_text(part=1, topic=topic)
-    prompt = get_task_prompt_part1(topic, level, ref_examples=ref_examples)
+    topics = random.sample(PART1_TOPICS, n)
+    prompt = get_task_prompt_batch(get_task_prompt_part1("(see the topic list below)", level), topics)
     try:
         comp = chat_create([{"role": "user", "content": prompt}], temperature=0.8)
         content = (comp.choices[0].message.content or "").strip()
-        data = extract_json_object(content)
-        if not data:
-            return None
-        validated = validate_part1_data(data)
-        if not validated:
-            return None
-        with db_connection() as conn:
-            cur = conn.execute(
-                "INSERT INTO part1_tasks (text, gaps_json, source) VALUES (?, ?, ?)",
-                (validated["text"], json.dumps(validated["gaps"]), "openai"),
-            )
-            tid = cur.lastrowid
-            conn.commit()
-        return get_part1_task_by_id(tid)
+        items = extract_json_array(content) or []
+        validated = [validate_part1_data(d) for d in items if isinstance(d, dict)]
+        rows = [PART1_SPEC.to_row(v) for v in validated if v]
+        stored = 0
+        if rows:
+            with db_connection() as conn:
+                stored = insert_tasks_for_part(conn, 1, PART1_SPEC.insert_sql, rows)
+                conn.commit()
+        if stored < n:
+            logger.warning("Part 1 batch: kept %d of %d requested tasks", stored, n)
+        return stored
     except Exception:
-        logger.exception("OpenAI Part 1 error")
-        return None
+        logger.exception("OpenAI Part 1 batch error")
+        return 0
 
 
 def get_or_create_part1_task():
-    item, _ = _generic_get_or_create(1, generate_part1_with_openai, openai_available=ai_available)
+    item, _ = _generic_get_or_create(
+        1, generate_part1_with_openai, openai_available=ai_available, batch_fn=generate_part1_batch
+    )
     return item
 
 
+def _part1_expected_html(gap, detail):
+    """Correct letter plus escaped option (e.g. "B) word") for a gap's explanation."""
+    correct_idx = gap.get("correct", 0)
+    correct_letter = LETTERS[correct_idx] if correct_idx < len(LETTERS) else "?"
+    expected_word = detail.get("expected") or (gap.get("options") or [""])[correct_idx]
+    return f"{correct_letter}) {_e(expected_word)}"
+
+
 def build_part1_html(item, check_result=None):
     if not item or not item.get("gaps"):
         return "<p>No data.</p>"
-    parts = re.split(r"(\(\d+\)_____)", item["text"])
+    details = (check_result.get("details") if check_result else None) or []
+    n_details = len(details)
     gap_i = 0
     out = []
-    for p in parts:
-        if re.match(r"^\(\d+\)_____$", p) and gap_i < len(item["gaps"]):
+    for p, is_gap in escaped_segments(item["text"]):
+        if is_gap and gap_i < len(item["gaps"]):
             g = item["gaps"][gap_i]
+            d = details[gap_i] if gap_i < n_details else None
+            user_val = d.get("user_val") if d else None
             opts = "".join(
-                f'<option value="{j}"{" selected" if check_result and check_result.get("details") and check_result["details"][gap_i].get("user_val") == j else ""}>'
+                f'<option value="{j}"{" selected" if user_val == j else ""}>'
                 f"{LETTERS[j]}) {_e(opt)}</option>"
                 for j, opt in enumerate(g["options"])
             )
             cls = ""
-            if check_result and check_result.get("details") and gap_i < len(check_result["details"]):
-                d = check_result["details"][gap_i]
+            if d is not None:
                 cls = " result-correct" if d.get("correct") else " result-wrong"
             out.append(f'<span class="gap-inline{cls}"><select name="p1_{gap_i}" aria-label="Gap {gap_i + 1}"><option value="">—</option>{opts}</select></span>')
             gap_i += 1
         else:
-            out.append(_e(p))
-    html = "".join(out)
-    if check_result and check_result.get("details"):
-        expl_list = []
-        for i, d in enumerate(check_result["details"]):
-            if i >= len(item["gaps"]):
-                break
-            correct = d.get("correct")
-            correct_idx = item["gaps"][i].get("correct", 0)
-            correct_letter = LETTERS[correct_idx] if correct_idx < len(LETTERS) else "?"
-            expected_word = d.get("expected") or (item["gaps"][i].get("options") or [""])[correct_idx]
-            exp = d.get("explanation", "")
-            if not correct:
-                if exp:
-                    expl_list.append(
-                        f'<li class="part2-expl-item part2-expl-wrong">'
-                        f'<strong>Gap {i + 1}:</strong> <span class="part2-expl-correct">Correct: <em>{correct_letter}) {_e(expected_word)}</em></span>. '
-                        f'<span class="part2-expl-reason">{_e(exp)}</span></li>'
-                    )
-                else:
-                    expl_list.append(
-                        f'<li class="part2-expl-item part2-expl-wrong">'
-                        f'<strong>Gap {i + 1}:</strong> <span class="part2-expl-correct">Correct: <em>{correct_letter}) {_e(expected_word)}</em></span>.</li>'
-                    )
-            elif exp:
-                expl_list.append(f'<li class="part2-expl-item part2-expl-correct"><strong>Gap {i + 1}:</strong> <span class="part2-expl-reason">{_e(exp)}</span></li>')
-        if expl_list:
-            html += '<div class="explanations-block"><h4>Why this answer is correct / why it is wrong</h4><ol class="answer-explanations">' + "".join(expl_list) + "</ol></div>"
-    return html
+            out.append(p)
+    if details:
+        out.append(explanations_block(
+            explanation_item(i, d.get("correct"), _part1_expected_html(item["gaps"][i], d), d.get("explanation", ""))
+            for i, d in enumerate(details[:len(item["gaps"])])
+            if d.get("explanation") or not d.get("correct")
+        ))
+    return "".join(out)
 
 
 def check_part1(data, form):
@@ -116,22 +119,11 @@ def check_part1(data, form):
     item = get_part1_task_by_id(task_id) if task_id else session.get("part1_task")
     if not item or not item.get("gaps"):
         return None
-    details = []
-    score = 0
-    for i in range(8):
-        user_val = form.get(f"p1_{i}")
-        try:
-            user_int = int(user_val)
-        except (TypeError, ValueError):
-            user_int = -1
-        correct_idx = item["gaps"][i]["correct"]
-        correct = user_int == correct_idx
-        if correct:
-            score += 1
-        details.append({"correct": correct, "user_val": user_int, "expected": item["gaps"][i]["options"][correct_idx]})
+    gaps = item["gaps"][:8]
+    score, details = score_answers(
+        form, "p1_", [g["correct"] for g in gaps], read=read_choice, compare=same,
+        expected=[g["options"][g["correct"]] for g in gaps],
+    )
     result = {"part": 1, "score": score, "total": 8, "details": details}
-    explanations = fetch_explanations_part1(item, details)
-    for i, exp in enumerate(explanations):
-        if i < len(result["details"]):
-            result["details"][i]["explanation"] = exp
+    attach_explanations(details, fetch_explanations_part1(item, details))
     return result
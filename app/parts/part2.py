@@ -1,51 +1,19 @@
 """Part 2: Open cloze — 8 gaps, one word each."""
-import json
 import logging
-import random
-import re
 
-from flask import session
-
-from app.ai import chat_create, ai_available
-from app.ai.prompts import get_task_prompt_part2
+from app.ai import ai_available
+from app.ai.prompts import get_task_messages_part2
 from app.ai.explanations import fetch_explanations_part2
-from app.config import MAX_EXPLANATION_LEN
-from app.db import _generic_get_or_create, get_part2_task_by_id, db_connection
-from app.utils import e as _e, answers_match, extract_json_object, validate_part2_data
+from app.db import _generic_get_or_create, get_part2_task_by_id
+from app.parts.checking import attach_explanations, score_answers, session_task_id
+from app.parts.generation import TaskSpec, generate_task
+from app.parts.topics import PART2_TOPICS
+from app.utils import e as _e, escaped_segments, explanation_item, explanations_block, json_dumps, validate_part2_data
 
 logger = logging.getLogger("fce_trainer")
 
-PART2_TOPICS = [
-    "travel and holidays",
-    "education and learning",
-    "technology and the internet",
-    "health and fitness",
-    "the environment and climate",
-    "arts and music",
-    "sport and competition",
-    "work and careers",
-    "family and relationships",
-    "food and cooking",
-    "science and discovery",
-    "history and culture",
-    "shopping and consumerism",
-    "nature and wildlife",
-    "entertainment and media",
-    "transport and cities",
-    "hobbies and free time",
-    "news and current events",
-]
-
-
-def generate_part2_with_openai(level="b2"):
-    if not ai_available:
-        return None
-    topic = random.choice(PART2_TOPICS)
-
-    # RAG: retrieve similar examples for style reference
-    from app.rag.helpers import get_rag_examples_text
-    ref_examples = get_rag_examples_text(part=2, topic=topic)
 
+def _part2_messages(topic, level, ref_examples):
     # Fetch words the user previously got wrong that are due for repetition
     required_words = []
     try:
@@ -54,28 +22,21 @@ def generate_part2_with_openai(level="b2"):
         required_words = [d["word"] for d in due]
     except Exception:
         logger.debug("get_due_words_part2 failed, generating without required words", exc_info=True)
+    return get_task_messages_part2(topic, level, required_words=required_words, ref_examples=ref_examples)
 
-    prompt = get_task_prompt_part2(topic, level, required_words=required_words, ref_examples=ref_examples)
-    try:
-        comp = chat_create([{"role": "user", "content": prompt}], temperature=0.7)
-        content = (comp.choices[0].message.content or "").strip()
-        data = extract_json_object(content)
-        if not data:
-            return None
-        validated = validate_part2_data(data)
-        if not validated:
-            return None
-        with db_connection() as conn:
-            cur = conn.execute(
-                "INSERT INTO part2_tasks (text, answers_json, source) VALUES (?, ?, ?)",
-                (validated["text"], json.dumps(validated["answers"]), "openai"),
-            )
-            tid = cur.lastrowid
-            conn.commit()
-        return get_part2_task_by_id(tid)
-    except Exception:
-        logger.exception("OpenAI Part 2 error")
-        return None
+
+PART2_SPEC = TaskSpec(
+    part=2,
+    topics=PART2_TOPICS,
+    messages=_part2_messages,
+    validate=validate_part2_data,
+    insert_sql="INSERT INTO part2_tasks (text, answers_json, source) VALUES (?, ?, ?)",
+    to_row=lambda v: (v["text"], json_dumps(v["answers"]), "openai"),
+)
+
+
+def generate_part2_with_openai(level="b2"):
+    return generate_task(PART2_SPEC, level)
 
 
 def get_or_create_part2_item(exclude_task_id=None):
@@ -85,72 +46,39 @@ def get_or_create_part2_item(exclude_task_id=None):
 def build_part2_html(item, check_result=None):
     if not item or not item.get("answers"):
         return "<p>No data.</p>"
-    parts = re.split(r"(\(\d+\)_____)", item["text"])
+    details = (check_result.get("details") if check_result else None) or []
+    n_details = len(details)
     gap_i = 0
     out = []
-    for p in parts:
-        if re.match(r"^\(\d+\)_____$", p) and gap_i < len(item["answers"]):
+    for p, is_gap in escaped_segments(item["text"]):
+        if is_gap and gap_i < len(item["answers"]):
             val = ""
-            if check_result and check_result.get("details") and gap_i < len(check_result["details"]):
-                val = check_result["details"][gap_i].get("user_val", "")
             cls = ""
-            if check_result and check_result.get("details") and gap_i < len(check_result["details"]):
-                d = check_result["details"][gap_i]
+            if gap_i < n_details:
+                d = details[gap_i]
+                val = d.get("user_val", "")
                 cls = " result-correct" if d.get("correct") else " result-wrong"
             out.append(f'<span class="gap-inline{cls}"><input type="text" name="p2_{gap_i}" value="{_e(val)}" placeholder="{gap_i + 1}" aria-label="Gap {gap_i + 1}" /></span>')
             gap_i += 1
         else:
-            out.append(_e(p))
-    html = "".join(out)
-    if check_result and check_result.get("details"):
-        expl_list = []
-        for i, d in enumerate(check_result["details"]):
-            if i >= len(item["answers"]):
-                break
-            correct = d.get("correct")
-            expected = d.get("expected", "")
-            exp = d.get("explanation", "")
-            if not correct and expected:
-                if exp:
-                    expl_list.append(
-                        f'<li class="part2-expl-item part2-expl-wrong">'
-                        f'<strong>Gap {i + 1}:</strong> <span class="part2-expl-correct">Correct: <em>{_e(expected)}</em></span>. '
-                        f'<span class="part2-expl-reason">{_e(exp)}</span></li>'
-                    )
-                else:
-                    expl_list.append(
-                        f'<li class="part2-expl-item part2-expl-wrong">'
-                        f'<strong>Gap {i + 1}:</strong> <span class="part2-expl-correct">Correct: <em>{_e(expected)}</em></span>.</li>'
-                    )
-            elif exp:
-                expl_list.append(f'<li class="part2-expl-item part2-expl-correct"><strong>Gap {i + 1}:</strong> <span class="part2-expl-reason">{_e(exp)}</span></li>')
-        if expl_list:
-            html += '<div class="explanations-block"><h4>Why this answer is correct / why it is wrong</h4><ol class="answer-explanations">' + "".join(expl_list) + "</ol></div>"
-    return html
+            out.append(p)
+    if details:
+        out.append(explanations_block(
+            explanation_item(i, d.get("correct"), _e(d.get("expected", "")), d.get("explanation", ""))
+            for i, d in enumerate(details[:len(item["answers"])])
+            if d.get("explanation") or (not d.get("correct") and d.get("expected"))
+        ))
+    return "".join(out)
 
 
 def check_part2(data, form):
-    task_id = session.get("part2_task_id")
-    if not task_id:
-        _, task_id = get_or_create_part2_item()
-        if task_id:
-            session["part2_task_id"] = task_id
+    task_id = session_task_id("part2_task_id", get_or_create_part2_item)
     item = get_part2_task_by_id(task_id) if task_id else None
     if not item or not item.get("answers"):
         return None
-    details = []
-    score = 0
-    for i in range(len(item["answers"])):
-        user_val = (form.get(f"p2_{i}") or "").strip()
-        expected = item["answers"][i]
-        correct = answers_match(user_val, expected)
-        if correct:
-            score += 1
-        details.append({"correct": correct, "user_val": user_val, "expected": expected})
-    result = {"part": 2, "score": score, "total": len(item["answers"]), "details": details,
-              "answers": list(item["answers"]), "text": item.get("text", "")}
-    explanations = fetch_explanations_part2(item, details)
-    for i, exp in enumerate(explanations):
-        if i < len(result["details"]) and exp:
-            result["details"][i]["explanation"] = (str(exp)[:MAX_EXPLANATION_LEN]).strip()
+    answers = item["answers"]
+    score, details = score_answers(form, "p2_", answers, expected=answers)
+    result = {"part": 2, "score": score, "total": len(answers), "details": details,
+              "answers": list(answers), "text": item.get("text", "")}
+    attach_explanations(details, fetch_explanations_part2(item, details))
     return result
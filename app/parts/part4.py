@@ -1,37 +1,50 @@
 """Part 4: Key word transformation — 6 items from UOE DB or OpenAI."""
-import difflib
+import functools
 import json
 import logging
+import queue
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-from app.ai import chat_create, ai_available
+from app.ai import ai_available, chat_stream_json_items, multi_choice_available
 from app.ai.prompts import get_task_prompt_part4
 from app.ai.explanations import fetch_explanations_part4
-from app.config import PART4_TASKS_PER_SET
+from app.config import PART4_STREAM_WORKERS, PART4_TASKS_PER_SET
 from app.db import (
     db_connection,
     get_tasks_by_ids,
     get_recent_grammar_topics,
-    pick_task_ids_from_db,
+    pick_tasks_from_db,
     record_shows,
     uoe_task_exists,
     _ensure_uoe_grammar_topic_column,
 )
-from app.utils import e as _e, norm, word_count, answers_match, extract_json_array
+from app.parts.checking import attach_explanations
+from app.utils import e as _e, json_dumps, norm, similarity, word_count, answers_match, form_answers
 
 logger = logging.getLogger("fce_trainer")
 
+_UNDERSCORES_RE = re.compile(r"\s+_{2,}\s*")
+
+
+@functools.lru_cache(maxsize=1024)
+def _keyword_re(kw: str) -> re.Pattern:
+    return re.compile(r"\b" + re.escape(kw) + r"\b")
+
 
 def _answer_uses_keyword(answer: str, keyword: str) -> bool:
     if not answer or not keyword:
         return False
     a = norm(answer)
-    kw = keyword.strip().lower()
-    return bool(re.search(r"\b" + re.escape(kw) + r"\b", a))
+    return bool(_keyword_re(keyword.strip().lower()).search(a))
+
+
+_PART4_ANSWER_WORDS = (3, 5)
 
 
 def _part4_answer_length_ok(answer: str) -> bool:
-    return 3 <= word_count(answer) <= 5
+    return _PART4_ANSWER_WORDS[0] <= word_count(answer) <= _PART4_ANSWER_WORDS[1]
 
 
 def _part4_sentence2_same_as_sentence1(sentence1: str, sentence2: str, answer: str) -> bool:
@@ -41,31 +54,101 @@ def _part4_sentence2_same_as_sentence1(sentence1: str, sentence2: str, answer: s
     return norm(reconstructed) == norm(sentence1)
 
 
+# Near-duplicate check against the most recent uoe_tasks. similarity() only runs on tasks
+# sharing at least _TRIGRAM_PREFILTER (Jaccard) of their character trigrams with the candidate;
+# pairs with a ratio >= _SIMILAR_RATIO share well above that. Normalised texts and trigram sets
+# are kept per task id, as tasks are never edited, so only tasks new since the last check are read.
+_SIMILAR_RECENT = 500
+_SIMILAR_RATIO = 0.88
+_TRIGRAM_PREFILTER = 0.2
+_task_trigrams: dict[int, tuple[tuple[str, frozenset], tuple[str, frozenset]]] = {}
+_RECENT_TASK_IDS_SQL = "SELECT id FROM uoe_tasks ORDER BY id DESC LIMIT ?"
+_TASK_TEXTS_SQL = "SELECT id, sentence1, sentence2, answer FROM uoe_tasks WHERE id IN (SELECT value FROM json_each(?))"
+
+
+def _trigrams(s: str) -> frozenset:
+    return frozenset(s[i:i + 3] for i in range(max(len(s) - 2, 1)))
+
+
+def _with_trigrams(s: str) -> tuple[str, frozenset]:
+    return s, _trigrams(s)
+
+
+def _close_match(new: tuple[str, frozenset], old: tuple[str, frozenset]) -> bool:
+    (text, grams), (old_text, old_grams) = new, old
+    if not old_text or len(grams & old_grams) < _TRIGRAM_PREFILTER * len(grams | old_grams):
+        return False
+    return similarity(text, old_text) >= _SIMILAR_RATIO
+
+
 def _part4_similar_to_existing(sentence1: str, sentence2: str, answer: str, exclude_ids=None) -> bool:
     if not sentence1 or not sentence2 or "_____" not in sentence2:
         return False
+    if len(_task_trigrams) > 2 * _SIMILAR_RECENT:
+        _task_trigrams.clear()
     with db_connection() as conn:
-        cur = conn.execute(
-            "SELECT id, sentence1, sentence2, answer FROM uoe_tasks ORDER BY id DESC LIMIT 500"
-        )
-        rows = cur.fetchall()
+        ids = [r[0] for r in conn.execute(_RECENT_TASK_IDS_SQL, (_SIMILAR_RECENT,))]
+        missing = [i for i in ids if i not in _task_trigrams]
+        if missing:
+            for r in conn.execute(_TASK_TEXTS_SQL, (json_dumps(missing),)):
+                _task_trigrams[r["id"]] = (
+                    _with_trigrams(norm(r["sentence1"] or "")),
+                    _with_trigrams(norm((r["sentence2"] or "").replace("_____", (r["answer"] or "").strip()))),
+                )
     exclude_ids = set(exclude_ids or [])
-    n1_new = norm(sentence1)
-    recon_new = norm(sentence2.replace("_____", (answer or "").strip()))
-    for r in rows:
-        if r["id"] in exclude_ids:
+    n1_new = _with_trigrams(norm(sentence1))
+    recon_new = _with_trigrams(norm(sentence2.replace("_____", (answer or "").strip())))
+    for task_id in ids:
+        old = _task_trigrams.get(task_id)
+        if old is None or task_id in exclude_ids:
             continue
-        n1_old = norm(r["sentence1"] or "")
-        recon_old = norm((r["sentence2"] or "").replace("_____", (r["answer"] or "").strip()))
-        if not n1_old and not recon_old:
-            continue
-        if n1_old and difflib.SequenceMatcher(None, n1_new, n1_old).ratio() >= 0.88:
-            return True
-        if recon_old and difflib.SequenceMatcher(None, recon_new, recon_old).ratio() >= 0.88:
+        n1_old, recon_old = old
+        if _close_match(n1_new, n1_old) or _close_match(recon_new, recon_old):
             return True
     return False
 
 
+# Independent replies asked for per set: as n choices of a single request where the provider
+# supports it (the prompt is sent and billed once), otherwise as requests sent at once. Replies
+# are streamed and each item is validated and stored as soon as it arrives, until the set is full.
+_PART4_REPLIES = 2
+_STREAM_END = object()
+
+# Shared by all requests so concurrent users reuse the stream threads and together stay within
+# PART4_STREAM_WORKERS open AI requests. The executor starts no threads until the first submit,
+# so creating it at import time is safe before gunicorn forks.
+_stream_pool = ThreadPoolExecutor(max_workers=PART4_STREAM_WORKERS, thread_name_prefix="part4-stream")
+
+
+_INSERT_UOE_TASK_SQL = (
+    "INSERT INTO uoe_tasks (sentence1, keyword, sentence2, answer, source, grammar_topic) VALUES (?, ?, ?, ?, ?, ?)"
+)
+
+
+def _stream_part4_items(
+    count: int, level: str, recent_avoid: str, choices: int, out: queue.Queue, stop: threading.Event
+) -> None:
+    """One AI request for count Part 4 items per choice; puts each item on out as it arrives, then _STREAM_END."""
+    from app.rag.helpers import get_rag_examples_text
+
+    try:
+        # RAG: retrieve similar examples for style reference
+        ref_examples = get_rag_examples_text(part=4)
+        prompt = get_task_prompt_part4(count, level, recent_avoid, ref_examples=ref_examples)
+        items = chat_stream_json_items([{"role": "user", "content": prompt}], temperature=0.8, n=choices)
+        try:
+            for item in items:
+                if stop.is_set():
+                    break
+                out.put(item)
+        finally:
+            items.close()
+    except Exception:
+        logger.exception("OpenAI Part 4 batch error")
+    finally:
+        out.put(_STREAM_END)
+
+
 def _generate_tasks_with_openai(count: int, level: str = "b2plus", recent_grammar_topics=None):
     if not ai_available:
         return []
@@ -74,75 +157,91 @@ def _generate_tasks_with_openai(count: int, level: str = "b2plus", recent_gramma
     recent_avoid = ""
     if recent_grammar_topics:
         recent_avoid = "\nAvoid or minimise repetition of these recently used grammar topics: " + ", ".join(recent_grammar_topics[:10]) + ".\n"
-    result = []
+    items: queue.Queue = queue.Queue()
+    stop = threading.Event()
+    requests, choices = (1, _PART4_REPLIES) if multi_choice_available else (_PART4_REPLIES, 1)
+    for _ in range(requests):
+        _stream_pool.submit(_stream_part4_items, count, level, recent_avoid, choices, items, stop)
+    try:
+        return _store_part4_items(_drain(items, requests), count)
+    finally:
+        stop.set()
+
+
+def _drain(items: queue.Queue, producers: int):
+    """Yield queued items until every producer has put _STREAM_END."""
+    while producers:
+        item = items.get()
+        if item is _STREAM_END:
+            producers -= 1
+        else:
+            yield item
+
+
+def _store_part4_items(items, count: int) -> list[dict]:
+    """Validate items in arrival order and insert the first count acceptable ones.
+
+    Items come from live AI streams, so they are only collected while reading; the INSERTs run in
+    one short transaction afterwards instead of holding SQLite's write lock for the whole stream.
+    """
+    accepted = []
+    seen_in_batch = set()
     topics_used_in_batch = set()
-    for attempt in range(2):
-        need = count - len(result)
-        if need <= 0:
-            break
-        # RAG: retrieve similar examples for style reference
-        from app.rag.helpers import get_rag_examples_text
-        ref_examples = get_rag_examples_text(part=4)
-        prompt = get_task_prompt_part4(need, level, recent_avoid, ref_examples=ref_examples)
-        try:
-            comp = chat_create([{"role": "user", "content": prompt}], temperature=0.8)
-            content = (comp.choices[0].message.content or "").strip()
-            arr = extract_json_array(content)
-            if not isinstance(arr, list):
-                continue
-            with db_connection() as conn:
-                for item in arr[:need]:
-                    s1 = (item.get("sentence1") or "").strip()
-                    kw = (item.get("keyword") or "").strip().upper()
-                    s2 = (item.get("sentence2") or "").strip()
-                    if "_____" not in s2:
-                        s2 = re.sub(r"\s+_{2,}\s*", " _____ ", s2)
-                    ans = (item.get("answer") or "").strip()
-                    grammar_topic = (item.get("grammar_topic") or "").strip() or None
-                    if not all([s1, kw, s2, ans]):
-                        continue
-                    if not _answer_uses_keyword(ans, kw):
-                        continue
-                    if not _part4_answer_length_ok(ans):
-                        continue
-                    if _part4_sentence2_same_as_sentence1(s1, s2, ans):
-                        continue
-                    if _part4_similar_to_existing(s1, s2, ans, exclude_ids=[x["id"] for x in result]):
-                        continue
-                    if uoe_task_exists(s1, kw):
-                        continue
-                    if grammar_topic and grammar_topic.lower() in topics_used_in_batch:
-                        continue
-                    cur = conn.execute(
-                        "INSERT INTO uoe_tasks (sentence1, keyword, sentence2, answer, source, grammar_topic) VALUES (?, ?, ?, ?, ?, ?)",
-                        (s1, kw, s2, ans, "openai", grammar_topic),
-                    )
-                    new_id = cur.lastrowid
-                    result.append({"id": new_id, "sentence1": s1, "keyword": kw, "sentence2": s2, "answer": ans, "grammar_topic": grammar_topic})
-                    if grammar_topic:
-                        topics_used_in_batch.add(grammar_topic.lower())
-                conn.commit()
-        except Exception:
-            logger.exception("OpenAI Part 4 batch error")
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        s1 = (item.get("sentence1") or "").strip()
+        kw = (item.get("keyword") or "").strip().upper()
+        s2 = (item.get("sentence2") or "").strip()
+        if "_____" not in s2:
+            s2 = _UNDERSCORES_RE.sub(" _____ ", s2)
+        ans = (item.get("answer") or "").strip()
+        grammar_topic = (item.get("grammar_topic") or "").strip() or None
+        if not all([s1, kw, s2, ans]):
+            continue
+        if not _answer_uses_keyword(ans, kw):
+            continue
+        if not _part4_answer_length_ok(ans):
+            continue
+        if _part4_sentence2_same_as_sentence1(s1, s2, ans):
+            continue
+        if (s1, kw) in seen_in_batch or _part4_similar_to_existing(s1, s2, ans):
+            continue
+        if uoe_task_exists(s1, kw):
+            continue
+        if grammar_topic and grammar_topic.lower() in topics_used_in_batch:
+            continue
+        accepted.append({"sentence1": s1, "keyword": kw, "sentence2": s2, "answer": ans, "grammar_topic": grammar_topic})
+        seen_in_batch.add((s1, kw))
+        if grammar_topic:
+            topics_used_in_batch.add(grammar_topic.lower())
+        if len(accepted) >= count:
             break
+    if not accepted:
+        return []
+    result = []
+    with db_connection() as conn:
+        for t in accepted:
+            new_id = conn.execute(
+                _INSERT_UOE_TASK_SQL, (t["sentence1"], t["keyword"], t["sentence2"], t["answer"], "openai", t["grammar_topic"])
+            ).lastrowid
+            result.append({"id": new_id, **t})
+        conn.commit()
     return result
 
 
 def fetch_part4_tasks(level: str = "b2plus", db_only: bool = False):
     _ensure_uoe_grammar_topic_column()
     tasks = []
+    recent_topics = get_recent_grammar_topics(15)
     if not db_only and ai_available:
-        tasks = _generate_tasks_with_openai(
-            PART4_TASKS_PER_SET,
-            level=level,
-            recent_grammar_topics=get_recent_grammar_topics(15),
-        )
+        tasks = _generate_tasks_with_openai(PART4_TASKS_PER_SET, level=level, recent_grammar_topics=recent_topics)
     if not tasks:
-        recent_topics = get_recent_grammar_topics(15)
-        ids = pick_task_ids_from_db(PART4_TASKS_PER_SET * 2, recent_grammar_topics=recent_topics)
-        if not ids:
+        # The query already enforces the answer length and keyword containment; extra
+        # candidates cover the whole-word keyword and sentence checks below.
+        rows = pick_tasks_from_db(PART4_TASKS_PER_SET * 2, recent_grammar_topics=recent_topics, answer_words=_PART4_ANSWER_WORDS)
+        if not rows:
             return None
-        rows = get_tasks_by_ids(ids)
         out = []
         for r in rows:
             if len(out) >= PART4_TASKS_PER_SET:
@@ -152,46 +251,48 @@ def fetch_part4_tasks(level: str = "b2plus", db_only: bool = False):
             if _part4_sentence2_same_as_sentence1(r["sentence1"], r["sentence2"], r["answer"]):
                 continue
             out.append(r)
-        if out:
-            record_shows([r["id"] for r in out])
-        return [{"id": r["id"], "sentence1": r["sentence1"], "keyword": r["keyword"], "sentence2": r["sentence2"], "answer": r["answer"]} for r in out] if out else None
+        if not out:
+            return None
+        tasks = out
     record_shows([t["id"] for t in tasks])
-    return [{"id": t["id"], "sentence1": t["sentence1"], "keyword": t["keyword"], "sentence2": t["sentence2"], "answer": t["answer"]} for t in tasks]
+    # The rows are fresh dicts built for this call; drop grammar_topic in place instead of copying
+    for t in tasks:
+        t.pop("grammar_topic", None)
+    return tasks
+
+
+def _part4_task_html(i: int, t: dict, detail: dict | None) -> str:
+    s2 = (t.get("sentence2") or "").replace("_____", '<span class="gap-placeholder">_____</span>')
+    val = cls = hint = explanation = ""
+    if detail is not None and (detail.get("user_val") or "").strip():
+        val = detail.get("user_val", "")
+        cls = " result-correct" if detail.get("correct") else " result-wrong"
+        if not detail.get("correct"):
+            hint = f'<p class="correct-answer-hint">Correct: {_e(detail.get("expected"))}</p>'
+        exp = detail.get("explanation")
+        if exp:
+            explanation = f'<p class="answer-explanation">{_e(exp)}</p>'
+    return (
+        f'<div class="question-block uoe-block{cls}">'
+        f'<p class="uoe-sentence1"><strong>{i + 1}.</strong> {_e(t.get("sentence1"))}</p>'
+        f'<p class="uoe-keyword">Use <strong>{_e(t.get("keyword"))}</strong></p>'
+        f'<p class="uoe-sentence2">{s2}</p>'
+        f'<div class="gap-line"><input type="text" name="p4_{i}" value="{_e(val)}" placeholder="3–5 words" aria-label="Question {i + 1} answer" /></div>'
+        f"{hint}{explanation}</div>"
+    )
 
 
 def build_part4_html(tasks, check_result=None):
     if not tasks:
         return "<p>No tasks loaded.</p>"
-    out = []
-    for i, t in enumerate(tasks):
-        if not isinstance(t, dict):
-            continue
-        s2 = (t.get("sentence2") or "").replace("_____", '<span class="gap-placeholder">_____</span>')
-        val = ""
-        cls = ""
-        detail = None
-        if check_result and isinstance(check_result.get("details"), list) and i < len(check_result["details"]):
-            d = check_result["details"][i]
-            detail = d if isinstance(d, dict) else None
-        attempted = detail is not None and (detail.get("user_val") or "").strip()
-        if attempted:
-            val = detail.get("user_val", "")
-            cls = " result-correct" if detail.get("correct") else " result-wrong"
-        out.append(
-            f'<div class="question-block uoe-block{cls}">'
-            f'<p class="uoe-sentence1"><strong>{i + 1}.</strong> {_e(t.get("sentence1"))}</p>'
-            f'<p class="uoe-keyword">Use <strong>{_e(t.get("keyword"))}</strong></p>'
-            f'<p class="uoe-sentence2">{s2}</p>'
-            f'<div class="gap-line"><input type="text" name="p4_{i}" value="{_e(val)}" placeholder="3–5 words" aria-label="Question {i + 1} answer" /></div>'
-        )
-        if attempted and not detail.get("correct"):
-            out.append(f'<p class="correct-answer-hint">Correct: {_e(detail.get("expected"))}</p>')
-        if attempted:
-            exp = detail.get("explanation")
-            if exp:
-                out.append(f'<p class="answer-explanation">{_e(exp)}</p>')
-        out.append("</div>")
-    return "".join(out)
+    details = check_result.get("details") if check_result else None
+    if not isinstance(details, list):
+        details = []
+    return "".join(
+        _part4_task_html(i, t, details[i] if i < len(details) and isinstance(details[i], dict) else None)
+        for i, t in enumerate(tasks)
+        if isinstance(t, dict)
+    )
 
 
 def check_part4(data, form):
@@ -206,11 +307,12 @@ def check_part4(data, form):
     details = []
     score = 0
     total_attempted = 0
+    user_vals = form_answers(form, "p4_")
     for i in range(len(tasks)):
         t = tasks[i]
         if not isinstance(t, dict):
             continue
-        user_val = (form.get(f"p4_{i}") or "").strip()
+        user_val = (user_vals.get(i) or "").strip()
         expected = t.get("answer") or ""
         correct = answers_match(user_val, expected)
         if user_val:
@@ -219,9 +321,5 @@ def check_part4(data, form):
                 score += 1
         details.append({"correct": correct, "user_val": user_val, "expected": expected})
     result = {"part": 4, "score": score, "total": total_attempted, "details": details}
-    explanations = fetch_explanations_part4(tasks, details)
-    max_explanation_len = 400
-    for i, exp in enumerate(explanations):
-        if i < len(result["details"]) and exp:
-            result["details"][i]["explanation"] = (str(exp)[:max_explanation_len]).strip()
+    attach_explanations(details, fetch_explanations_part4(tasks, details))
     return result
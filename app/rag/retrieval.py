@@ -13,6 +13,7 @@ import random
 from typing import Any
 
 from app.db import db_connection
+from app.utils import json_loads
 from app.rag.embeddings import (
     bytes_to_embedding,
     cosine_similarity,
@@ -151,12 +152,11 @@ def _retrieve_by_keywords(topic: str, candidates: list[dict], k: int) -> list[di
 
 def _clean_candidate(c: dict) -> dict:
     """Remove embedding blob and parse metadata."""
-    import json
     d = {k: v for k, v in c.items() if k != "embedding"}
     if "metadata_json" in d:
         try:
-            d["metadata"] = json.loads(d["metadata_json"])
-        except (json.JSONDecodeError, TypeError):
+            d["metadata"] = json_loads(d["metadata_json"])
+        except (ValueError, TypeError):
             d["metadata"] = {}
         del d["metadata_json"]
     return d
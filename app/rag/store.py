@@ -5,11 +5,11 @@ with structured metadata and the full prompt/task text.
 """
 from __future__ import annotations
 
-import json
 import logging
 from typing import Any
 
 from app.db import db_connection
+from app.utils import json_dumps, json_loads
 
 logger = logging.getLogger("fce_trainer")
 
@@ -63,7 +63,7 @@ def add_example(
     if not search_text:
         search_text = _build_search_text(paper, part, task_type, topic, level, prompt_text, metadata)
 
-    meta_json = json.dumps(metadata or {})
+    meta_json = json_dumps(metadata or {})
 
     with db_connection() as conn:
         cur = conn.execute(
@@ -153,7 +153,7 @@ def _row_to_dict(row) -> dict:
     d.pop("embedding", None)  # Don't include raw bytes in dict
     if "metadata_json" in d:
         try:
-            d["metadata"] = json.loads(d["metadata_json"])
-        except (json.JSONDecodeError, TypeError):
+            d["metadata"] = json_loads(d["metadata_json"])
+        except (ValueError, TypeError):
             d["metadata"] = {}
     return d
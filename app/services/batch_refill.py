@@ -0,0 +1,117 @@
+"""Offline refill of Part 1/2/3 task tables through the OpenAI Batch API (half price, results within 24h).
+
+submit_batch_refill() uploads one chat-completion request per topic and records the batch id;
+ingest_completed_batches() (run periodically, e.g. from cron via scripts/batch_refill.py) stores the
+results of finished batches. Interactive generation still goes through chat_create.
+"""
+from __future__ import annotations
+
+import io
+import logging
+
+from app.ai import openai_client, openai_model
+from app.ai.prompts import get_task_messages_part1, get_task_messages_part2, get_task_messages_part3
+from app.db import db_connection, insert_tasks_for_part
+from app.parts.part1 import PART1_SPEC
+from app.parts.part2 import PART2_SPEC
+from app.parts.part3 import PART3_SPEC
+from app.utils import extract_json_object, json_dumps, json_loads
+
+logger = logging.getLogger("fce_trainer")
+
+# part -> (generation spec, messages builder). The plain builders are used rather than
+# spec.messages, which adds the current user's due words / stems.
+_BATCH_PARTS = {
+    1: (PART1_SPEC, get_task_messages_part1),
+    2: (PART2_SPEC, get_task_messages_part2),
+    3: (PART3_SPEC, get_task_messages_part3),
+}
+
+_FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def build_batch_requests(parts=(1, 2, 3), level: str = "b2") -> list[dict]:
+    """One /v1/chat/completions request per topic of each part; custom_id is "part<N>-<topic index>"."""
+    requests_ = []
+    for part in parts:
+        spec, messages_fn = _BATCH_PARTS[part]
+        for i, topic in enumerate(spec.topics):
+            requests_.append({
+                "custom_id": f"part{part}-{i}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": openai_model,
+                    "messages": messages_fn(topic, level),
+                    "temperature": spec.temperature,
+                },
+            })
+    return requests_
+
+
+def submit_batch_refill(parts=(1, 2, 3), level: str = "b2") -> str | None:
+    """Upload the refill requests and create a batch. Returns the batch id, or None without OpenAI."""
+    if openai_client is None:
+        logger.warning("Batch refill needs OPENAI_API_KEY (the Batch API is OpenAI-only)")
+        return None
+    lines = "\n".join(json_dumps(r) for r in build_batch_requests(parts, level))
+    upload = openai_client.files.create(file=("refill.jsonl", io.BytesIO(lines.encode("utf-8"))), purpose="batch")
+    batch = openai_client.batches.create(
+        input_file_id=upload.id, endpoint="/v1/chat/completions", completion_window="24h"
+    )
+    with db_connection() as conn:
+        conn.execute("INSERT INTO ai_batches (id, status) VALUES (?, ?)", (batch.id, batch.status))
+        conn.commit()
+    logger.info("Submitted batch refill %s (%d requests)", batch.id, len(lines.splitlines()))
+    return batch.id
+
+
+def parse_batch_output(output_jsonl: str) -> dict[int, list[tuple]]:
+    """Validate each result line of a batch output file. Returns {part: [insert rows]}."""
+    rows: dict[int, list[tuple]] = {}
+    for line in output_jsonl.splitlines():
+        if not line.strip():
+            continue
+        try:
+            result = json_loads(line)
+            part = int(result["custom_id"].split("-", 1)[0].removeprefix("part"))
+            content = result["response"]["body"]["choices"][0]["message"]["content"] or ""
+        except (ValueError, KeyError, IndexError, TypeError):
+            logger.debug("Skipping malformed batch output line", exc_info=True)
+            continue
+        if part not in _BATCH_PARTS:
+            continue
+        spec = _BATCH_PARTS[part][0]
+        data = extract_json_object(content)
+        validated = spec.validate(data) if data else None
+        if validated:
+            rows.setdefault(part, []).append(spec.to_row(validated))
+    return rows
+
+
+def ingest_completed_batches() -> int:
+    """Store results of every finished, not yet ingested batch. Returns the number of tasks inserted."""
+    if openai_client is None:
+        return 0
+    with db_connection() as conn:
+        pending = [r["id"] for r in conn.execute("SELECT id FROM ai_batches WHERE ingested_at IS NULL")]
+    inserted = 0
+    for batch_id in pending:
+        batch = openai_client.batches.retrieve(batch_id)
+        if batch.status not in _FINAL_STATUSES:
+            continue
+        rows = {}
+        if batch.status == "completed" and batch.output_file_id:
+            rows = parse_batch_output(openai_client.files.content(batch.output_file_id).text)
+        stored = 0
+        with db_connection() as conn:
+            for part, part_rows in rows.items():
+                stored += insert_tasks_for_part(conn, part, _BATCH_PARTS[part][0].insert_sql, part_rows)
+            conn.execute(
+                "UPDATE ai_batches SET status = ?, ingested_at = datetime('now') WHERE id = ?",
+                (batch.status, batch_id),
+            )
+            conn.commit()
+        inserted += stored
+        logger.info("Batch %s %s: stored %d tasks", batch_id, batch.status, stored)
+    return inserted
@@ -0,0 +1,47 @@
+"""Store for check results between the POST and the redirected GET.
+
+Results live in the check_result_cache table, so the GET finds them whichever worker
+process handled the POST.
+"""
+from __future__ import annotations
+
+import secrets
+import time
+import zlib
+from typing import Any
+
+from app.config import CHECK_RESULT_CACHE_TTL
+from app.db import pop_check_result, store_check_result
+from app.utils import json_dumps, json_loads
+
+# JSON payloads longer than this (e.g. with AI explanations) are stored zlib-compressed
+_COMPRESS_MIN_LEN = 2048
+
+
+def _pack(result: dict[str, Any]) -> str | bytes:
+    """JSON text, or zlib-compressed JSON bytes (stored as a BLOB) for large results."""
+    payload = json_dumps(result)
+    if len(payload) > _COMPRESS_MIN_LEN:
+        return zlib.compress(payload.encode(), 1)
+    return payload
+
+
+def _unpack(payload: str | bytes) -> dict[str, Any]:
+    if isinstance(payload, bytes):
+        payload = zlib.decompress(payload)
+    return json_loads(payload)
+
+
+def cache_put(result: dict[str, Any], ttl: int = CHECK_RESULT_CACHE_TTL) -> str:
+    """Store result under a new random token for ttl seconds."""
+    token = secrets.token_urlsafe(16)
+    store_check_result(token, _pack(result), int(time.time()) + ttl)
+    return token
+
+
+def cache_pop(token: str | None) -> dict[str, Any] | None:
+    """Remove and return the result stored under token, or None."""
+    if not token:
+        return None
+    payload = pop_check_result(token)
+    return _unpack(payload) if payload is not None else None
@@ -101,7 +101,7 @@ def _get_achievements(user_id: int) -> list[dict]:
         meta = ACHIEVEMENTS.get(key, {})
         raw = r["unlocked_at"]
         try:
-            dt = datetime.strptime(raw[:19], "%Y-%m-%d %H:%M:%S")
+            dt = datetime.fromisoformat(raw[:19])
             display = dt.strftime("%d %b %Y")
         except (ValueError, TypeError):
             display = raw[:10] if raw else ""
@@ -156,7 +156,7 @@ def award_xp(user_id: int, score: int, total: int, part: int) -> dict:
             pass  # already practiced today
         elif last_date:
             try:
-                last_dt = datetime.strptime(last_date, "%Y-%m-%d").date()
+                last_dt = date.fromisoformat(last_date)
                 delta = (date.today() - last_dt).days
                 if delta == 1:
                     streak += 1
@@ -34,7 +34,7 @@ def start_mock_exam(proctor_session_id: int | None = None) -> None:
     session[_SK_DURATION] = MOCK_EXAM_DURATION_SECONDS
     session[_SK_FINISHED] = False
     session[_SK_PARTS_SCORES] = {}
-    session["parts_checked"] = []
+    session["parts_checked_mask"] = 0
     if proctor_session_id:
         session[_SK_PROCTOR_SESSION] = proctor_session_id
     # Clear any leftover task IDs so fresh tasks are loaded
@@ -123,5 +123,5 @@ def cancel_mock_exam() -> None:
     for key in (_SK_ACTIVE, _SK_START, _SK_DURATION, _SK_PROCTOR_SESSION,
                 _SK_FINISHED, _SK_PARTS_SCORES):
         session.pop(key, None)
-    session.pop("parts_checked", None)
+    session.pop("parts_checked_mask", None)
     session.pop("mock_exam", None)
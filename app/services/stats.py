@@ -1,7 +1,10 @@
 """Check history and per-part statistics."""
 from __future__ import annotations
 
+import functools
 import logging
+import threading
+import time
 from datetime import datetime
 
 from flask import session
@@ -66,6 +69,7 @@ def claim_orphaned_stats(user_id: int) -> int:
         if count > 0:
             conn.execute("UPDATE check_history SET user_id = ? WHERE user_id IS NULL", (user_id,))
             conn.commit()
+            _invalidate_part_stats()
             logging.getLogger("fce_trainer").info("Claimed %d orphaned stats for user %d", count, user_id)
     return count
 
@@ -88,22 +92,15 @@ def record_check_result(result: dict) -> dict | None:
             (part, score, total, user_id),
         )
         check_id = cur.lastrowid
-        for i, d in enumerate(details):
-            explanation = d.get("explanation") if isinstance(d, dict) else None
-            if not explanation:
-                continue
-            conn.execute(
-                """INSERT INTO answer_explanations (check_id, part, item_index, user_val, expected_val, explanation_text, created_at)
-                   VALUES (?, ?, ?, ?, ?, ?, datetime('now'))""",
-                (
-                    check_id,
-                    part,
-                    i,
-                    d.get("user_val") if isinstance(d, dict) else None,
-                    d.get("expected") if isinstance(d, dict) else None,
-                    str(explanation).strip(),
-                ),
-            )
+        conn.executemany(
+            """INSERT INTO answer_explanations (check_id, part, item_index, user_val, expected_val, explanation_text, created_at)
+               VALUES (?, ?, ?, ?, ?, ?, datetime('now'))""",
+            [
+                (check_id, part, i, d.get("user_val"), d.get("expected"), str(d["explanation"]).strip())
+                for i, d in enumerate(details)
+                if isinstance(d, dict) and d.get("explanation")
+            ],
+        )
         conn.commit()
 
     # Award XP & check achievements for logged-in users
@@ -153,57 +150,75 @@ def record_check_result(result: dict) -> dict | None:
     return reward
 
 
+# Per-part totals for PARTS_RANGE in one query: the parts CTE left-joins check_history, so parts
+# without attempts still get a zero row, and percent / wrong counts are computed by SQLite.
+# strftime has no month names, so "%d %b %Y, %H:%M" takes the month from _MONTHS.
+_MONTHS = "JanFebMarAprMayJunJulAugSepOctNovDec"
+_LAST_ATTEMPT_COLUMNS = f"""
+       , MAX(h.created_at) AS last_attempt_at
+       , CASE WHEN length(MAX(h.created_at)) >= 19 THEN COALESCE(
+           strftime('%d ', MAX(h.created_at))
+           || substr('{_MONTHS}', 3 * strftime('%m', MAX(h.created_at)) - 2, 3)
+           || strftime(' %Y, %H:%M', MAX(h.created_at)),
+           substr(MAX(h.created_at), 1, 16)
+         ) END AS last_attempt_at_display"""
+
+
+@functools.cache
+def _part_stats_sql(window: str, last_attempt: bool) -> str:
+    parts = ", ".join(f"({p})" for p in PARTS_RANGE)
+    return f"""WITH parts(part) AS (VALUES {parts})
+        SELECT p.part,
+               COALESCE(SUM(h.score), 0) AS total_correct,
+               COALESCE(SUM(h.total) - SUM(h.score), 0) AS total_wrong,
+               COALESCE(SUM(h.total), 0) AS total_questions,
+               COUNT(h.id) AS attempts,
+               ROUND(100.0 * SUM(h.score) / NULLIF(SUM(h.total), 0), 1) AS percent{_LAST_ATTEMPT_COLUMNS if last_attempt else ""}
+        FROM parts p
+        LEFT JOIN check_history h ON h.part = p.part AND h.user_id IS :user_id AND {window}
+        GROUP BY p.part
+        ORDER BY p.part"""
+
+
+def _part_stats(user_id: int | None, window: str = "1", last_attempt: bool = False) -> list[dict]:
+    """One dict per part in PARTS_RANGE for the check_history rows matching window."""
+    if user_id is None:
+        user_id = session.get("user_id")
+    with db_connection() as conn:
+        cur = conn.execute(_part_stats_sql(window, last_attempt), {"user_id": user_id})
+        return [dict(r) for r in cur]
+
+
+# All-time stats per user_id: (newest check_history id, expiry, stats). A new check anywhere
+# bumps MAX(id) and so invalidates entries in every worker process; the TTL bounds how long
+# another process can serve stats from before claim_orphaned_stats() reassigned rows.
+_PART_STATS_TTL = 30.0
+_PART_STATS_CACHE_MAX = 512
+_part_stats_cache: dict[int | None, tuple[int | None, float, list[dict]]] = {}
+_part_stats_lock = threading.Lock()
+
+
+def _invalidate_part_stats() -> None:
+    with _part_stats_lock:
+        _part_stats_cache.clear()
+
+
 def get_part_stats(user_id: int | None = None) -> list[dict]:
     if user_id is None:
         user_id = session.get("user_id")
     with db_connection() as conn:
-        if user_id is None:
-            cur = conn.execute(
-                "SELECT part, SUM(score) AS total_correct, SUM(total) AS total_questions, COUNT(*) AS attempts, MAX(created_at) AS last_attempt_at FROM check_history WHERE user_id IS NULL GROUP BY part"
-            )
-        else:
-            cur = conn.execute(
-                "SELECT part, SUM(score) AS total_correct, SUM(total) AS total_questions, COUNT(*) AS attempts, MAX(created_at) AS last_attempt_at FROM check_history WHERE user_id = ? GROUP BY part",
-                (user_id,),
-            )
-        rows = cur.fetchall()
-    stats_by_part = {r["part"]: r for r in rows}
-    out = []
-    for part in PARTS_RANGE:
-        row = stats_by_part.get(part)
-        if not row or not row["total_questions"]:
-            out.append({
-                "part": part,
-                "total_correct": 0,
-                "total_wrong": 0,
-                "total_questions": 0,
-                "attempts": 0,
-                "percent": None,
-                "last_attempt_at": None,
-                "last_attempt_at_display": None,
-            })
-        else:
-            total_correct = row["total_correct"] or 0
-            total_questions = row["total_questions"] or 0
-            total_wrong = total_questions - total_correct
-            percent = round(100 * total_correct / total_questions, 1) if total_questions else None
-            raw_at = row["last_attempt_at"] if row["last_attempt_at"] else None
-            try:
-                dt = datetime.strptime(raw_at[:19], "%Y-%m-%d %H:%M:%S") if raw_at and len(raw_at) >= 19 else None
-                last_display = dt.strftime("%d %b %Y, %H:%M") if dt else None
-            except (ValueError, TypeError):
-                last_display = raw_at[:16] if raw_at else None
-            out.append({
-                "part": part,
-                "total_correct": total_correct,
-                "total_wrong": total_wrong,
-                "total_questions": total_questions,
-                "attempts": row["attempts"] or 0,
-                "percent": percent,
-                "last_attempt_at": raw_at,
-                "last_attempt_at_display": last_display,
-            })
-    return out
+        last_id = conn.execute("SELECT MAX(id) FROM check_history").fetchone()[0]
+    now = time.monotonic()
+    cached = _part_stats_cache.get(user_id)
+    if cached is not None and cached[0] == last_id and now < cached[1]:
+        stats = cached[2]
+    else:
+        stats = _part_stats(user_id, last_attempt=True)
+        with _part_stats_lock:
+            if len(_part_stats_cache) >= _PART_STATS_CACHE_MAX:
+                _part_stats_cache.clear()
+            _part_stats_cache[user_id] = (last_id, now + _PART_STATS_TTL, stats)
+    return [dict(s) for s in stats]
 
 
 def get_get_phrase_stats(user_id=None):
@@ -236,88 +251,12 @@ def get_get_phrase_stats(user_id=None):
 
 def get_daily_stats(user_id=None):
     """Stats for today only: per-part correct/total/attempts. Same shape as get_part_stats but for date(created_at)=today."""
-    if user_id is None:
-        user_id = session.get("user_id")
-    where, params = _user_filter_sql(user_id)
-    with db_connection() as conn:
-        cur = conn.execute(
-            f"""SELECT part, SUM(score) AS total_correct, SUM(total) AS total_questions, COUNT(*) AS attempts
-                FROM check_history
-                WHERE {where} AND date(created_at) = date('now', 'localtime')
-                GROUP BY part""",
-            params,
-        )
-        rows = cur.fetchall()
-    stats_by_part = {r["part"]: r for r in rows}
-    out = []
-    for part in PARTS_RANGE:
-        row = stats_by_part.get(part)
-        if not row or not row["total_questions"]:
-            out.append({
-                "part": part,
-                "total_correct": 0,
-                "total_wrong": 0,
-                "total_questions": 0,
-                "attempts": 0,
-                "percent": None,
-            })
-        else:
-            total_correct = row["total_correct"] or 0
-            total_questions = row["total_questions"] or 0
-            total_wrong = total_questions - total_correct
-            percent = round(100 * total_correct / total_questions, 1) if total_questions else None
-            out.append({
-                "part": part,
-                "total_correct": total_correct,
-                "total_wrong": total_wrong,
-                "total_questions": total_questions,
-                "attempts": row["attempts"] or 0,
-                "percent": percent,
-            })
-    return out
+    return _part_stats(user_id, "date(h.created_at) = date('now', 'localtime')")
 
 
 def get_weekly_stats(user_id=None):
     """Stats for last 7 days: per-part correct/total/attempts."""
-    if user_id is None:
-        user_id = session.get("user_id")
-    where, params = _user_filter_sql(user_id)
-    with db_connection() as conn:
-        cur = conn.execute(
-            f"""SELECT part, SUM(score) AS total_correct, SUM(total) AS total_questions, COUNT(*) AS attempts
-                FROM check_history
-                WHERE {where} AND created_at >= datetime('now', '-7 days', 'localtime')
-                GROUP BY part""",
-            params,
-        )
-        rows = cur.fetchall()
-    stats_by_part = {r["part"]: r for r in rows}
-    out = []
-    for part in PARTS_RANGE:
-        row = stats_by_part.get(part)
-        if not row or not row["total_questions"]:
-            out.append({
-                "part": part,
-                "total_correct": 0,
-                "total_wrong": 0,
-                "total_questions": 0,
-                "attempts": 0,
-                "percent": None,
-            })
-        else:
-            total_correct = row["total_correct"] or 0
-            total_questions = row["total_questions"] or 0
-            total_wrong = total_questions - total_correct
-            percent = round(100 * total_correct / total_questions, 1) if total_questions else None
-            out.append({
-                "part": part,
-                "total_correct": total_correct,
-                "total_wrong": total_wrong,
-                "total_questions": total_questions,
-                "attempts": row["attempts"] or 0,
-                "percent": percent,
-            })
-    return out
+    return _part_stats(user_id, "h.created_at >= datetime('now', '-7 days', 'localtime')")
 
 
 def get_progress_series(user_id=None, days=14):
@@ -377,7 +316,7 @@ def get_words_learning(user_id=None, part=3, limit=50):
     for r in rows:
         raw_at = r["created_at"]
         try:
-            dt = datetime.strptime(raw_at[:19], "%Y-%m-%d %H:%M:%S") if raw_at and len(raw_at) >= 19 else None
+            dt = datetime.fromisoformat(raw_at[:19]) if raw_at and len(raw_at) >= 19 else None
             display_at = dt.strftime("%d %b") if dt else raw_at[:10] if raw_at else ""
         except (ValueError, TypeError):
             display_at = raw_at[:10] if raw_at else ""
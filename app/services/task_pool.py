@@ -0,0 +1,83 @@
+"""Background pre-generation of AI tasks, so page requests are served from the DB instead of waiting on the AI."""
+from __future__ import annotations
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import TASK_POOL_MIN_UNSEEN, TASK_POOL_REFILL, TASK_POOL_WORKERS
+from app.db import count_unseen_tasks
+
+logger = logging.getLogger("fce_trainer")
+
+# Created on first use, i.e. after gunicorn has forked the worker
+_executor: ThreadPoolExecutor | None = None
+_lock = threading.Lock()
+_refilling: set[int] = set()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=TASK_POOL_WORKERS, thread_name_prefix="task-pool")
+    return _executor
+
+
+def _refill_batch(part: int, batch_fn, count: int) -> None:
+    try:
+        created = batch_fn(count)
+        logger.info("Task pool: generated %d/%d Part %d tasks", created, count, part)
+    except Exception:
+        logger.exception("Task pool refill failed for Part %d", part)
+    finally:
+        with _lock:
+            _refilling.discard(part)
+
+
+def _refill_single(part: int, generate_fn, count: int) -> None:
+    """Submit count independent generate_fn() calls, so they (AI call, JSON parsing, validation)
+    run side by side on the pool's workers. The last one to finish ends the refill."""
+    futures = []
+    remaining = [count]
+
+    def _done(_future) -> None:
+        with _lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+            _refilling.discard(part)
+        created = 0
+        for f in futures:
+            if f.exception() is not None:
+                logger.error("Task pool generation failed for Part %d", part, exc_info=f.exception())
+            elif f.result():
+                created += 1
+        logger.info("Task pool: generated %d/%d Part %d tasks", created, count, part)
+
+    executor = _get_executor()
+    futures.extend(executor.submit(generate_fn) for _ in range(count))
+    for f in futures:
+        f.add_done_callback(_done)
+
+
+def ensure_task_pool(part: int, generate_fn, batch_fn=None) -> bool:
+    """Schedule a background refill when fewer than TASK_POOL_MIN_UNSEEN unseen tasks remain.
+
+    The refill uses batch_fn(n) (one AI call for n tasks) when given, else n concurrent calls of
+    generate_fn(). At most one refill per part runs at a time. Returns True if a refill was scheduled.
+    """
+    with _lock:
+        if part in _refilling:
+            return False
+    if count_unseen_tasks(part, TASK_POOL_MIN_UNSEEN) >= TASK_POOL_MIN_UNSEEN:
+        return False
+    with _lock:
+        if part in _refilling:
+            return False
+        _refilling.add(part)
+    logger.debug("Task pool low for Part %d; scheduling %d generations", part, TASK_POOL_REFILL)
+    if batch_fn is not None:
+        _get_executor().submit(_refill_batch, part, batch_fn, TASK_POOL_REFILL)
+    else:
+        _refill_single(part, generate_fn, TASK_POOL_REFILL)
+    return True
@@ -12,6 +12,7 @@ from urllib.parse import quote
 import requests
 
 from app.db import db_connection
+from app.utils import json_dumps, json_loads
 
 logger = logging.getLogger("fce_trainer")
 
@@ -103,7 +104,7 @@ def _pons_lang_name(code: str) -> str:
 
 def _translate_ai(word: str, sentence: str, target_lang: str = "ru") -> tuple[str, str]:
     """Translate word and sentence using the AI client."""
-    from app.ai import chat_create, ai_available
+    from app.ai import chat_create_cached, ai_available
     from app.services.settings import LANGUAGES
     if not ai_available:
         return "", ""
@@ -116,13 +117,12 @@ def _translate_ai(word: str, sentence: str, target_lang: str = "ru") -> tuple[st
     prompt += '\nReturn ONLY a JSON object: {"word_translated": "...", "sentence_translated": "..."}'
     prompt += '\nIf there is no sentence, set sentence_translated to empty string.'
     try:
-        import json
-        comp = chat_create([{"role": "user", "content": prompt}], temperature=0.1)
+        from app.utils import extract_json_object
+        comp = chat_create_cached([{"role": "user", "content": prompt}], temperature=0.1)
         content = (comp.choices[0].message.content or "").strip()
-        m = re.search(r'\{[\s\S]*\}', content)
-        if not m:
+        data = extract_json_object(content)
+        if not data:
             return "", ""
-        data = json.loads(m.group(0))
         word_tr = (data.get("word_translated") or "").strip()
         sentence_tr = (data.get("sentence_translated") or "").strip()
         logger.debug("AI translated '%s' → '%s'", word[:30], word_tr[:30])
@@ -190,19 +190,17 @@ def fetch_word_forms(word: str) -> dict:
 
     Falls back to empty dict if AI is unavailable or returns bad data.
     """
-    import json as _json
-
     if not word or not word.strip() or " " in word.strip():
         return {}
     w = word.strip().lower()
 
     try:
-        from app.ai import ai_available, chat_create
+        from app.ai import ai_available, chat_create_cached
         if not ai_available:
             logger.debug("Word forms: AI not available, skipping for '%s'", w)
             return {}
 
-        resp = chat_create(
+        resp = chat_create_cached(
             messages=[
                 {"role": "system", "content": "You are a helpful English linguistics assistant. Respond with valid JSON only."},
                 {"role": "user", "content": _WORD_FORMS_PROMPT.format(word=w)},
@@ -214,7 +212,7 @@ def fetch_word_forms(word: str) -> dict:
         if raw.startswith("```"):
             raw = raw.split("\n", 1)[-1].rsplit("```", 1)[0].strip()
 
-        forms = _json.loads(raw)
+        forms = json_loads(raw)
         if not isinstance(forms, dict):
             return {}
 
@@ -266,8 +264,7 @@ def save_word(user_id: int, word: str, sentence: str, source_part: int | None =
     if not word_forms and " " not in word:
         forms = fetch_word_forms(word)
         if forms:
-            import json
-            word_forms = json.dumps(forms)
+            word_forms = json_dumps(forms)
 
     with db_connection() as conn:
         conn.execute(
@@ -350,7 +347,6 @@ def update_translation(user_id: int, word_id: int, word_ru: str, sentence_ru: st
 
 def refresh_word_forms_for_entry(user_id: int, word_id: int) -> dict | None:
     """Re-fetch word forms for an existing vocab entry. Returns updated forms dict or None."""
-    import json as _json
     with db_connection() as conn:
         row = conn.execute(
             "SELECT id, word FROM vocab_notebook WHERE id = ? AND user_id = ?",
@@ -362,7 +358,7 @@ def refresh_word_forms_for_entry(user_id: int, word_id: int) -> dict | None:
         if " " in word:
             return {}  # no forms for phrases
         forms = fetch_word_forms(word)
-        forms_json = _json.dumps(forms) if forms else ""
+        forms_json = json_dumps(forms) if forms else ""
         conn.execute(
             "UPDATE vocab_notebook SET word_forms = ? WHERE id = ? AND user_id = ?",
             (forms_json, word_id, user_id),
@@ -373,14 +369,13 @@ def refresh_word_forms_for_entry(user_id: int, word_id: int) -> dict | None:
 
 def refresh_all_word_forms(user_id: int) -> int:
     """Re-fetch word forms for all single-word entries. Returns count of updated entries."""
-    import json as _json
     words = get_words(user_id)
     updated = 0
     for w in words:
         if " " in w["word"]:
             continue
         forms = fetch_word_forms(w["word"])
-        forms_json = _json.dumps(forms) if forms else ""
+        forms_json = json_dumps(forms) if forms else ""
         with db_connection() as conn:
             conn.execute(
                 "UPDATE vocab_notebook SET word_forms = ? WHERE id = ? AND user_id = ?",
@@ -428,7 +423,6 @@ def _fetch_tts_audio(word: str) -> bytes | None:
 
 def _build_anki_rows(words: list[dict], with_audio: bool = False) -> list[list[str]]:
     """Build rows for Anki TSV. Each row = [front, back, tag]."""
-    import json as _json
     rows = []
     for w in words:
         front_parts = [f"<b>{w['word']}</b>"]
@@ -438,7 +432,7 @@ def _build_anki_rows(words: list[dict], with_audio: bool = False) -> list[list[s
         # Word forms
         if w.get("word_forms"):
             try:
-                forms = _json.loads(w["word_forms"]) if isinstance(w["word_forms"], str) else w["word_forms"]
+                forms = json_loads(w["word_forms"]) if isinstance(w["word_forms"], str) else w["word_forms"]
                 labels = {"noun": "n", "verb": "v", "adjective": "adj", "adverb": "adv"}
                 form_parts = []
                 for pos, abbr in labels.items():
@@ -542,7 +536,6 @@ def export_quizlet_tsv(user_id: int) -> str:
     Term  = English word + word forms.
     Definition = Russian translation + sentence.
     """
-    import json as _json
     words = get_words(user_id)
     lines: list[str] = []
     for w in words:
@@ -550,7 +543,7 @@ def export_quizlet_tsv(user_id: int) -> str:
         term_parts = [w["word"]]
         if w.get("word_forms"):
             try:
-                forms = _json.loads(w["word_forms"]) if isinstance(w["word_forms"], str) else w["word_forms"]
+                forms = json_loads(w["word_forms"]) if isinstance(w["word_forms"], str) else w["word_forms"]
                 labels = {"noun": "n", "verb": "v", "adjective": "adj", "adverb": "adv"}
                 for pos, abbr in labels.items():
                     if forms.get(pos):
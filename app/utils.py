@@ -5,19 +5,87 @@ import difflib
 import html
 import json
 import re
-from functools import wraps
+from collections.abc import Callable, Iterable, Mapping
+from functools import lru_cache, wraps
 from typing import Any
 
 from flask import redirect, session, url_for
 
+try:
+    from rapidfuzz.fuzz import ratio as _rf_ratio
+except ImportError:  # optional C extension; difflib gives near-identical scores
+    _rf_ratio = None
 
+try:
+    import orjson
+
+    def json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+
+    json_loads = orjson.loads
+except ImportError:  # stdlib fallback; orjson is optional
+    json_dumps = json.dumps
+    json_loads = json.loads
+
+
+_WS_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=8192)
 def norm(s):
-    return re.sub(r"\s+", " ", (s or "").strip().lower())
+    return _WS_RE.sub(" ", (s or "").strip().lower())
+
+
+_escape = html.escape
 
 
 def e(s):
     """HTML-escape for safe output."""
-    return html.escape(str(s)) if s is not None else ""
+    return _escape(str(s)) if s is not None else ""
+
+
+_GAP_SEGMENT_RE = re.compile(r"(\(\d+\)_____)")
+
+
+@lru_cache(maxsize=2048)
+def escaped_segments(text: str) -> tuple[tuple[str, bool], ...]:
+    """Split a passage at its (n)_____ gap markers: (HTML-escaped segment, is_gap) pairs.
+
+    Stored passages never change, so each is split and escaped once instead of on every render.
+    """
+    return tuple((_escape(p), i % 2 == 1) for i, p in enumerate(_GAP_SEGMENT_RE.split(text)))
+
+
+def cache_task_render(builder: Callable[..., str], maxsize: int = 256) -> Callable[..., str]:
+    """Memoize a task builder's plain render (no check result) per task id.
+
+    Stored tasks are read-only mappings that stay cached in app.db, so a render is reused only
+    while the very same task object is passed in; a reloaded task is rendered again.
+    """
+    cache: dict[Any, tuple[Any, str]] = {}
+
+    @wraps(builder)
+    def render(item, *args):
+        task_id = item.get("id") if isinstance(item, Mapping) else None
+        if task_id is None or any(a is not None for a in args):
+            return builder(item, *args)
+        hit = cache.get(task_id)
+        if hit is not None and hit[0] is item:
+            return hit[1]
+        html = builder(item, *args)
+        if len(cache) >= maxsize:
+            cache.pop(next(iter(cache)), None)
+        cache[task_id] = (item, html)
+        return html
+
+    return render
+
+
+def similarity(a: str, b: str) -> float:
+    """Similarity ratio in [0, 1] (rapidfuzz when installed, else difflib)."""
+    if _rf_ratio is not None:
+        return _rf_ratio(a, b) / 100.0
+    return difflib.SequenceMatcher(None, a, b).ratio()
 
 
 def answers_match(user_val: str, expected: str, strict: bool = False) -> bool:
@@ -28,13 +96,23 @@ def answers_match(user_val: str, expected: str, strict: bool = False) -> bool:
         return False
     if strict:
         return False
-    return difflib.SequenceMatcher(None, a, b).ratio() >= 0.88
+    return similarity(a, b) >= 0.88
 
 
 def word_count(s: str) -> int:
     return len((s or "").split())
 
 
+def form_answers(form: Mapping[str, str], prefix: str) -> dict[int, str]:
+    """Collect numbered answer fields (e.g. p4_0, p4_1, …) in one pass: {index: value}."""
+    cut = len(prefix)
+    return {
+        int(k[cut:]): v
+        for k, v in form.items()
+        if k.startswith(prefix) and k[cut:].isdigit()
+    }
+
+
 # ---------------------------------------------------------------------------
 # Auth decorator
 # ---------------------------------------------------------------------------
@@ -53,15 +131,26 @@ def login_required(f):
 # JSON helpers (shared across parts)
 # ---------------------------------------------------------------------------
 
-def extract_json_object(text: str) -> dict[str, Any] | None:
-    """Extract first {...} JSON object from text. Returns parsed dict or None."""
+def find_json_object_text(text: str) -> str | None:
+    """Text of the first balanced {...} in text (braces inside JSON strings are ignored), or None.
+
+    A single forward pass, unlike a greedy regex search that backtracks from the last "}".
+    """
     if not text:
         return None
-    m = re.search(r"\{[\s\S]*\}", text)
-    if not m:
+    start = text.find("{")
+    if start == -1:
+        return None
+    return JsonObjectScanner().feed(text[start:])
+
+
+def extract_json_object(text: str) -> dict[str, Any] | None:
+    """Extract first {...} JSON object from text. Returns parsed dict or None."""
+    raw = find_json_object_text(text)
+    if raw is None:
         return None
     try:
-        data = json.loads(m.group(0))
+        data = json_loads(raw)
         return data if isinstance(data, dict) else None
     except (json.JSONDecodeError, ValueError):
         return None
@@ -79,7 +168,7 @@ def extract_json_array(text: str) -> list[Any] | None:
             continue
         try:
             chunk = text[start : end + 1]
-            arr = json.loads(chunk)
+            arr = json_loads(chunk)
             if isinstance(arr, list):
                 return arr
         except (json.JSONDecodeError, TypeError):
@@ -87,10 +176,121 @@ def extract_json_array(text: str) -> list[Any] | None:
     return None
 
 
+class JsonObjectScanner:
+    """Incremental, string-aware brace matcher: feed text chunks, get the first complete {...} back.
+
+    Each character is looked at once, so streamed responses can be checked as they arrive.
+    """
+
+    def __init__(self):
+        self._parts: list[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.started = False
+        self.seen = 0  # characters fed so far
+
+    def feed(self, chunk: str) -> str | None:
+        """Consume chunk; return the object text once its closing brace arrives, else None."""
+        start = 0
+        for i, ch in enumerate(chunk):
+            if not self.started:
+                if ch == "{":
+                    self.started = True
+                    self._depth = 1
+                    start = i
+                continue
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._parts.append(chunk[start : i + 1])
+                    self.seen += i + 1
+                    return "".join(self._parts)
+        if self.started:
+            self._parts.append(chunk[start:])
+        self.seen += len(chunk)
+        return None
+
+
+class JsonArrayScanner:
+    """Incremental scanner over the first [...] of a stream: returns the text of each object or
+    array element as soon as it closes, so items can be used before the whole array arrives.
+    Scalar elements are skipped.
+    """
+
+    def __init__(self):
+        self._item: list[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.started = False
+        self.done = False  # the array's closing bracket has been seen
+        self.seen = 0  # characters fed so far
+
+    def feed(self, chunk: str) -> list[str]:
+        """Consume chunk; return the texts of the elements completed in it (possibly none)."""
+        items = []
+        start = None if self._depth < 2 else 0
+        for i, ch in enumerate(chunk):
+            if self.done:
+                break
+            if not self.started:
+                if ch == "[":
+                    self.started = True
+                    self._depth = 1
+                continue
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+                if self._depth == 2:
+                    start = i
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1 and start is not None:
+                    self._item.append(chunk[start : i + 1])
+                    items.append("".join(self._item))
+                    self._item = []
+                    start = None
+                elif self._depth == 0:
+                    self.done = True
+        if start is not None:
+            self._item.append(chunk[start:])
+        self.seen += len(chunk)
+        return items
+
+
 # ---------------------------------------------------------------------------
 # AI response validation helpers
 # ---------------------------------------------------------------------------
 
+_GAP_MARKER_RE = re.compile(r"\((\d)\)_____")
+_GAP_NUMBERS = list("12345678")
+
+
+def has_gap_markers(text: str) -> bool:
+    """True if text has the markers (1)_____ … (8)_____ exactly once each (one regex pass)."""
+    return sorted(_GAP_MARKER_RE.findall(text)) == _GAP_NUMBERS
+
+
 def validate_part1_data(data: dict) -> dict | None:
     """Validate Part 1 task data (multiple-choice cloze). Returns cleaned dict or None."""
     text = (data.get("text") or "").strip()
@@ -115,9 +315,8 @@ def validate_part2_data(data: dict) -> dict | None:
     answers = data.get("answers")
     if not text or not isinstance(answers, list) or len(answers) != 8:
         return None
-    for i in range(1, 9):
-        if f"({i})_____" not in text:
-            return None
+    if not has_gap_markers(text):
+        return None
     return {"text": text, "answers": [str(a).strip() for a in answers]}
 
 
@@ -130,9 +329,8 @@ def validate_part3_data(data: dict) -> dict | None:
         return None
     if not isinstance(answers, list) or len(answers) != 8:
         return None
-    for i in range(1, 9):
-        if f"({i})_____" not in text:
-            return None
+    if not has_gap_markers(text):
+        return None
     return {
         "text": text,
         "stems": [str(s).strip().upper() for s in stems],
@@ -169,9 +367,8 @@ def validate_get_phrase_data(data: dict) -> dict | None:
     answers = data.get("answers")
     if not text or not isinstance(answers, list) or len(answers) != 8:
         return None
-    for i in range(1, 9):
-        if f"({i})_____" not in text:
-            return None
+    if not has_gap_markers(text):
+        return None
     return {"text": text, "answers": [str(a).strip().lower() for a in answers]}
 
 
@@ -179,6 +376,38 @@ def validate_get_phrase_data(data: dict) -> dict | None:
 # Explanation formatting (shared across parts 1, 2, 3, 5, get_phrases)
 # ---------------------------------------------------------------------------
 
+_EXPL_ITEM = '<li class="part2-expl-item part2-expl-%s"><strong>Gap %d:</strong> %s</li>'
+_EXPL_EXPECTED = '<span class="part2-expl-correct">Correct: <em>%s</em></span>.'
+_EXPL_REASON = '<span class="part2-expl-reason">%s</span>'
+_EXPL_WORD_FAMILY = '<div class="part3-word-family"><strong>Word family:</strong> %s</div>'
+_EXPL_BLOCK = (
+    '<div class="explanations-block">'
+    '<h4>Why this answer is correct / why it is wrong</h4>'
+    '<ol class="answer-explanations">%s</ol></div>'
+)
+
+
+def explanation_item(i: int, correct: Any, expected_html: str, exp: str, word_family: str = "") -> str:
+    """One <li> of the explanations block for gap *i* (0-based); *expected_html* is already escaped."""
+    if not correct:
+        body = _EXPL_EXPECTED % expected_html
+        if exp:
+            body += " " + _EXPL_REASON % e(exp)
+    elif exp:
+        body = _EXPL_REASON % e(exp)
+    else:
+        body = "Correct."
+    if word_family:
+        body += _EXPL_WORD_FAMILY % e(word_family)
+    return _EXPL_ITEM % ("correct" if correct else "wrong", i + 1, body)
+
+
+def explanations_block(items: Iterable[str]) -> str:
+    """Wrap explanation_item() strings in the explanations block ("" when there are none)."""
+    joined = "".join(items)
+    return _EXPL_BLOCK % joined if joined else ""
+
+
 def format_explanation_list(
     details: list[dict],
     answers: list[Any],
@@ -191,35 +420,12 @@ def format_explanation_list(
 
     *get_expected* is an optional callable(index, detail) -> expected_display_str.
     """
-    expl_list: list[str] = []
-    for i, d in enumerate(details):
-        if i >= total:
-            break
-        correct = d.get("correct")
-        expected = d.get("expected", answers[i] if i < len(answers) else "")
+    items = []
+    for i, d in enumerate(details[:total]):
         if get_expected:
             expected = get_expected(i, d)
-        exp = d.get("explanation", "")
-        word_family = d.get("word_family", "") if get_word_family else ""
-        li_cls = " part2-expl-correct" if correct else " part2-expl-wrong"
-        if not correct and expected:
-            body = (
-                f'<span class="part2-expl-correct">Correct: <em>{e(expected)}</em></span>.'
-                + (f' <span class="part2-expl-reason">{e(exp)}</span>' if exp else "")
-            )
-        elif correct and exp:
-            body = f'<span class="part2-expl-reason">{e(exp)}</span>'
-        elif correct:
-            body = "Correct."
         else:
-            body = f'<span class="part2-expl-correct">Correct: <em>{e(expected)}</em></span>.'
-        if word_family:
-            body += f'<div class="part3-word-family"><strong>Word family:</strong> {e(word_family)}</div>'
-        expl_list.append(f'<li class="part2-expl-item{li_cls}"><strong>Gap {i + 1}:</strong> {body}</li>')
-    if not expl_list:
-        return ""
-    return (
-        '<div class="explanations-block">'
-        '<h4>Why this answer is correct / why it is wrong</h4>'
-        '<ol class="answer-explanations">' + "".join(expl_list) + "</ol></div>"
-    )
+            expected = d.get("expected", answers[i] if i < len(answers) else "")
+        word_family = d.get("word_family", "") if get_word_family else ""
+        items.append(explanation_item(i, d.get("correct"), e(expected), d.get("explanation", ""), word_family))
+    return explanations_block(items)
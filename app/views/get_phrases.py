@@ -1,10 +1,8 @@
 """Get phrases study mode: 8 gaps, each gap = correct GET collocation."""
 import logging
-import secrets
 
 from flask import Blueprint, redirect, render_template, request, session, url_for
 
-from app.config import CHECK_RESULT_CACHE_MAX
 from app.db import get_get_phrase_task_by_id
 from app.parts.get_phrases import (
     build_get_phrase_html,
@@ -13,11 +11,11 @@ from app.parts.get_phrases import (
 )
 from app.parts.get_phrases import generate_get_phrase_with_openai
 from app.ai import ai_available
+from app.services.check_cache import cache_pop, cache_put
 from app.services.stats import get_get_phrase_stats, record_check_result
 
 logger = logging.getLogger("fce_trainer")
 
-_CHECK_RESULT_CACHE = {}
 bp = Blueprint("get_phrases", __name__)
 
 
@@ -38,20 +36,14 @@ def get_phrases():
             result = check_get_phrases(request.form)
             if result:
                 record_check_result(result)
-                if len(_CHECK_RESULT_CACHE) >= CHECK_RESULT_CACHE_MAX:
-                    _CHECK_RESULT_CACHE.pop(next(iter(_CHECK_RESULT_CACHE)))
-                token = secrets.token_urlsafe(32)
-                _CHECK_RESULT_CACHE[token] = result
+                token = cache_put(result)
                 return redirect(url_for("get_phrases.get_phrases", check_result_token=token))
         if action == "next":
             session.pop("get_phrase_task_id", None)
             session.pop("get_phrase_check_result", None)
             return redirect(url_for("get_phrases.get_phrases"))
 
-    check_result = None
-    token = request.args.get("check_result_token")
-    if token and token in _CHECK_RESULT_CACHE:
-        check_result = _CHECK_RESULT_CACHE.pop(token)
+    check_result = cache_pop(request.args.get("check_result_token"))
     # Use current task from session if set (so refresh doesn't pick a new task or call OpenAI)
     task_id = session.get("get_phrase_task_id")
     if task_id:
@@ -1,10 +1,10 @@
 """Use of English / Reading: index page with part tabs and check result."""
+import functools
 import logging
-import secrets
 
 from flask import Blueprint, current_app, redirect, render_template, request, session, url_for
 
-from app.config import CHECK_RESULT_CACHE_MAX, PARTS_RANGE, PART_QUESTION_COUNTS
+from app.config import PARTS_RANGE, PART_QUESTION_COUNTS
 from app.db import get_task_by_id_for_part, get_tasks_by_ids
 from app.services.repetition import get_due_task_id, get_due_task_ids_for_part4, get_due_counts
 from app.parts import (
@@ -27,12 +27,12 @@ from app.parts import (
     get_or_create_part1_task,
     get_part1_task_by_id,
 )
+from app.services.check_cache import cache_pop, cache_put
 from app.services.stats import get_part_stats, record_check_result
 from app.services.mock_exam import is_mock_exam_active, get_time_remaining, record_part_score, is_time_expired
 
 logger = logging.getLogger("fce_trainer")
 
-_CHECK_RESULT_CACHE = {}
 bp = Blueprint("use_of_english", __name__)
 
 
@@ -58,38 +58,51 @@ def _inc_idx(part: int):
     session[f"part{part}_idx"] = _get_idx(part) + 1
 
 
+_LEVELS = ("b2", "b2plus")
+
+
+def _pick_level(form, default="b2"):
+    """Level chosen in the form, or *default* when it is missing or not one of _LEVELS."""
+    level = (form.get("level") or default).strip().lower()
+    return level if level in _LEVELS else default
+
+
+def _generate_part4(form):
+    # Part 4 generates a whole set of tasks and always redirects to part=4
+    level = _pick_level(form)
+    generated = fetch_part4_tasks(level=level, db_only=False)
+    if generated:
+        session["part4_task_ids"] = [t["id"] for t in generated]
+        session.pop("check_result", None)
+    return redirect(url_for("use_of_english.use_of_english", part=4, part4_generated=len(generated) if generated else 0, part4_level=level))
+
+
+def _generate_part(part_num, form):
+    cfg = _GENERATE_CONFIG[part_num]
+    level = _pick_level(form, cfg["default_level"])
+    item = cfg["fn"](level)
+    if item and item.get("id"):
+        session[cfg["session_key"]] = item["id"]
+        for key in cfg.get("extra_cleanup", []):
+            session.pop(key, None)
+        session.pop("check_result", None)
+        params = {"part": part_num, f"part{part_num}_generated": 1}
+        if part_num in (1, 2, 3, 5, 6):
+            params[f"part{part_num}_level"] = level
+        return redirect(url_for("use_of_english.use_of_english", **params))
+    return redirect(url_for("use_of_english.use_of_english", part=part_num))
+
+
+# POST action -> handler(form)
+_GENERATE_ACTIONS = {
+    "generate_part4": _generate_part4,
+    **{f"generate_part{p}": functools.partial(_generate_part, p) for p in _GENERATE_CONFIG},
+}
+
+
 def _handle_generate_action(action):
-    from app.parts import part4
-    # Part 4 is not in _GENERATE_CONFIG; handle it first so we always redirect to part=4
-    if action == "generate_part4":
-        level = (request.form.get("level") or "b2").strip().lower()
-        if level not in ("b2", "b2plus"):
-            level = "b2"
-        generated = part4.fetch_part4_tasks(level=level, db_only=False)
-        if generated:
-            session["part4_task_ids"] = [t["id"] for t in generated]
-            session.pop("check_result", None)
-        return redirect(url_for("use_of_english.use_of_english", part=4, part4_generated=len(generated) if generated else 0, part4_level=level))
-
-    for part_num, cfg in _GENERATE_CONFIG.items():
-        if action != f"generate_part{part_num}":
-            continue
-        default_level = cfg["default_level"]
-        level = (request.form.get("level") or default_level).strip().lower()
-        if level not in ("b2", "b2plus"):
-            level = default_level
-        item = cfg["fn"](level)
-        if item and item.get("id"):
-            session[cfg["session_key"]] = item["id"]
-            for key in cfg.get("extra_cleanup", []):
-                session.pop(key, None)
-            session.pop("check_result", None)
-            params = {"part": part_num, f"part{part_num}_generated": 1}
-            if part_num in (1, 2, 3, 5, 6):
-                params[f"part{part_num}_level"] = level
-            return redirect(url_for("use_of_english.use_of_english", **params))
-        return redirect(url_for("use_of_english.use_of_english", part=part_num))
-    return None
+    handler = _GENERATE_ACTIONS.get(action)
+    return handler(request.form) if handler else None
 
 
 def _handle_check_action(form):
@@ -111,13 +124,9 @@ def _handle_check_action(form):
             _record_mock_score(result)
         part_checked = result.get("part")
         if part_checked and part_checked in PARTS_RANGE:
-            parts_checked = session.get("parts_checked") or []
-            if part_checked not in parts_checked:
-                session["parts_checked"] = parts_checked + [part_checked]
-        if len(_CHECK_RESULT_CACHE) >= CHECK_RESULT_CACHE_MAX:
-            _CHECK_RESULT_CACHE.pop(next(iter(_CHECK_RESULT_CACHE)))
-        token = secrets.token_urlsafe(32)
-        _CHECK_RESULT_CACHE[token] = result
+            # Bit p set once part p has been checked in this session
+            session["parts_checked_mask"] = session.get("parts_checked_mask", 0) | (1 << part_checked)
+        token = cache_put(result)
         return redirect(url_for("use_of_english.use_of_english", part=part, check_result_token=token))
     return redirect(url_for("use_of_english.use_of_english", part=part))
 
@@ -180,31 +189,44 @@ def _try_serve_review(part: int) -> bool:
 
 
 def _load_part_items(current_part):
+    """Load the task(s) of the part being shown; the page only renders that part."""
     items = {}
-    if current_part == 1 and not session.get("part1_task_id"):
-        task = get_or_create_part1_task()
-        if task and task.get("id"):
-            session["part1_task_id"] = task["id"]
-    if session.get("part1_task_id"):
-        items[1] = get_part1_task_by_id(session["part1_task_id"])
-    for p in (2, 3, 5, 6, 7):
-        if current_part == p:
-            item, _ = _ensure_part_task(p)
-            items[p] = item
-        else:
-            tid = session.get(f"part{p}_task_id")
-            items[p] = get_task_by_id_for_part(p, tid) if tid else None
-    if current_part == 4 and not session.get("part4_task_ids"):
-        p4 = fetch_part4_tasks(level="b2plus", db_only=bool(session.get("part4_db_only")))
-        if p4:
-            session["part4_task_ids"] = [t["id"] for t in p4]
-    if session.get("part4_task_ids"):
-        items[4] = get_tasks_by_ids(session["part4_task_ids"])
+    if current_part == 1:
+        if not session.get("part1_task_id"):
+            task = get_or_create_part1_task()
+            if task and task.get("id"):
+                session["part1_task_id"] = task["id"]
+        tid = session.get("part1_task_id")
+        items[1] = get_part1_task_by_id(tid) if tid else None
+    elif current_part == 4:
+        if not session.get("part4_task_ids"):
+            p4 = fetch_part4_tasks(level="b2plus", db_only=bool(session.get("part4_db_only")))
+            if p4:
+                session["part4_task_ids"] = [t["id"] for t in p4]
+        task_ids = session.get("part4_task_ids")
+        items[4] = get_tasks_by_ids(task_ids) if task_ids else None
     else:
-        items[4] = None
+        items[current_part], _ = _ensure_part_task(current_part)
     return items
 
 
+# index.html only renders the current part, so only that part's HTML is built:
+# {part: (task item, check result for that part) -> template variables}
+_PART_HTML_BUILDERS = {
+    1: lambda item, cr: {"part1_html": build_part1_html(item, cr)},
+    2: lambda item, cr: {"part2_html": build_part2_html(item, cr)},
+    3: lambda item, cr: {"part3_html": build_part3_html(item or [], cr)},
+    4: lambda item, cr: {"part4_html": build_part4_html(item or [], cr)},
+    5: lambda item, cr: {"part5_text": build_part5_text(item), "part5_html": build_part5_html(item, cr)},
+    6: lambda item, cr: {"part6_text": build_part6_text(item, cr), "part6_questions": build_part6_questions(item)},
+    7: lambda item, cr: {"part7_text": build_part7_text(item), "part7_questions": build_part7_questions(item, cr)},
+}
+_PART_HTML_KEYS = (
+    "part1_html", "part2_html", "part3_html", "part4_html", "part5_text", "part5_html",
+    "part6_text", "part6_questions", "part7_text", "part7_questions",
+)
+
+
 def _build_template_context(current_part, check_result, items):
     cr = check_result if check_result and check_result.get("part") == current_part else None
     errors = {}
@@ -218,32 +240,20 @@ def _build_template_context(current_part, check_result, items):
             else "No tasks in database. Set OPENAI_API_KEY or GOOGLE_AI_API_KEY to generate new tasks."
         )
     ctx = {"current_part": current_part, "check_result": check_result}
-    ctx["part1_html"] = build_part1_html(items.get(1), cr if current_part == 1 else None) if 1 not in errors else ""
-    ctx["part1_error"] = errors.get(1)
-    ctx["part2_html"] = build_part2_html(items.get(2), cr if current_part == 2 else None)
-    ctx["part2_error"] = errors.get(2)
-    ctx["part3_html"] = build_part3_html(items.get(3) or [], cr if current_part == 3 else None)
-    ctx["part3_error"] = errors.get(3)
-    ctx["part4_html"] = build_part4_html(items.get(4) or [], cr if current_part == 4 else None) if 4 not in errors else ""
-    ctx["part4_error"] = errors.get(4)
+    ctx.update(dict.fromkeys(_PART_HTML_KEYS, ""))
+    if current_part not in errors:
+        ctx.update(_PART_HTML_BUILDERS[current_part](items.get(current_part), cr))
+    for p in PARTS_RANGE:
+        ctx[f"part{p}_error"] = errors.get(p)
     ctx["part4_db_only"] = bool(session.get("part4_db_only"))
-    ctx["part5_text"] = build_part5_text(items.get(5)) if 5 not in errors else ""
-    ctx["part5_html"] = build_part5_html(items.get(5), cr if current_part == 5 else None) if 5 not in errors else ""
-    ctx["part5_error"] = errors.get(5)
-    ctx["part6_text"] = build_part6_text(items.get(6), cr if current_part == 6 else None) if 6 not in errors else ""
-    ctx["part6_questions"] = build_part6_questions(items.get(6)) if 6 not in errors else ""
-    ctx["part6_error"] = errors.get(6)
-    ctx["part7_text"] = build_part7_text(items.get(7)) if items.get(7) else ""
-    ctx["part7_questions"] = build_part7_questions(items.get(7), cr if current_part == 7 else None) if items.get(7) else ""
-    ctx["part7_error"] = errors.get(7)
     for p in (1, 2, 3, 4, 5, 6, 7):
         ctx[f"part{p}_generated"] = request.args.get(f"part{p}_generated", type=int)
     for p in (1, 2, 3, 4):
         ctx[f"part{p}_level"] = request.args.get(f"part{p}_level") or ""
     part_stats = get_part_stats()
     ctx["current_part_stats"] = part_stats[current_part - 1] if part_stats else None
-    parts_checked = session.get("parts_checked") or []
-    ctx["parts_done"] = [p in parts_checked for p in PARTS_RANGE]
+    mask = session.get("parts_checked_mask", 0)
+    ctx["parts_done"] = [bool(mask >> p & 1) for p in PARTS_RANGE]
     ctx["part_counts"] = [PART_QUESTION_COUNTS[p] for p in PARTS_RANGE]
     # Spaced repetition: review indicator + due counts for tab badges
     ctx["is_review"] = session.pop("sr_review", False)
@@ -281,10 +291,7 @@ def use_of_english():
         session["part4_db_only"] = request.args.get("part4_db_only", "").strip().lower() in ("1", "true", "on", "yes")
     if request.args.get("next", type=int, default=0):
         return _handle_next(current_part)
-    check_result = None
-    token = request.args.get("check_result_token")
-    if token and token in _CHECK_RESULT_CACHE:
-        check_result = _CHECK_RESULT_CACHE.pop(token)
+    check_result = cache_pop(request.args.get("check_result_token"))
     if check_result is None:
         check_result = session.pop("check_result", None)
     items = _load_part_items(current_part)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""Refill Part 1/2/3 task tables through the OpenAI Batch API.
+
+Usage:
+    python -m scripts.batch_refill submit [--parts 1 2 3] [--level b2|b2plus]
+    python -m scripts.batch_refill ingest      # run periodically (e.g. hourly cron)
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+# Ensure project root is in path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dotenv import load_dotenv  # noqa: E402
+load_dotenv()
+
+from app.db import init_db  # noqa: E402
+from app.services.batch_refill import ingest_completed_batches, submit_batch_refill  # noqa: E402
+
+
+def cmd_submit(args):
+    batch_id = submit_batch_refill(parts=tuple(args.parts), level=args.level)
+    if not batch_id:
+        print("Error: OPENAI_API_KEY is required for batch refills")
+        sys.exit(1)
+    print(f"Submitted batch {batch_id}")
+
+
+def cmd_ingest(args):
+    print(f"Stored {ingest_completed_batches()} new tasks")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch refill of FCE-Trainer task tables")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_submit = sub.add_parser("submit", help="Submit a refill batch")
+    p_submit.add_argument("--parts", type=int, nargs="+", default=[1, 2, 3], choices=[1, 2, 3])
+    p_submit.add_argument("--level", default="b2", choices=["b2", "b2plus"])
+    p_submit.set_defaults(func=cmd_submit)
+
+    p_ingest = sub.add_parser("ingest", help="Store results of finished batches")
+    p_ingest.set_defaults(func=cmd_ingest)
+
+    args = parser.parse_args()
+    init_db()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
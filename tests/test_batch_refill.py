@@ -0,0 +1,37 @@
+"""Tests for the OpenAI Batch API refill helpers."""
+from __future__ import annotations
+
+import json
+
+from app.services.batch_refill import build_batch_requests, parse_batch_output
+
+
+def _output_line(custom_id, content):
+    return json.dumps({
+        "custom_id": custom_id,
+        "response": {"body": {"choices": [{"message": {"content": content}}]}},
+    })
+
+
+def test_build_batch_requests_one_per_topic():
+    from app.parts.topics import PART1_TOPICS
+
+    reqs = build_batch_requests(parts=(1,))
+    assert len(reqs) == len(PART1_TOPICS)
+    assert reqs[0]["custom_id"] == "part1-0"
+    assert reqs[0]["url"] == "/v1/chat/completions"
+
+
+def test_parse_batch_output_keeps_valid_tasks():
+    text = " ".join(f"({n})_____" for n in range(1, 9))
+    part2 = {"text": text, "answers": list("abcdefgh")}
+    output = "\n".join([
+        _output_line("part2-0", json.dumps(part2)),
+        _output_line("part2-1", '{"text": "no gaps"}'),
+        _output_line("part3-0", "not json"),
+        "garbage",
+    ])
+    rows = parse_batch_output(output)
+    assert list(rows) == [2]
+    [(stored_text, answers_json, source)] = rows[2]
+    assert (stored_text, json.loads(answers_json), source) == (text, list("abcdefgh"), "openai")
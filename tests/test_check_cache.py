@@ -0,0 +1,34 @@
+"""Tests for the check-result cache."""
+from __future__ import annotations
+
+from app.db import db_connection
+from app.services.check_cache import cache_pop, cache_put
+
+
+class TestCheckResultCache:
+    def test_pop_returns_result_once(self, app):
+        token = cache_put({"part": 1, "details": [{"correct": True, "user_val": 2}]})
+        assert cache_pop(token) == {"part": 1, "details": [{"correct": True, "user_val": 2}]}
+        assert cache_pop(token) is None
+
+    def test_expired_entries_not_returned_and_pruned(self, app):
+        expired = cache_put({"n": 1}, ttl=-1)
+        assert cache_pop(expired) is None
+        stale = cache_put({"n": 2}, ttl=-1)
+        fresh = cache_put({"n": 3})
+        with db_connection() as conn:
+            tokens = {r["token"] for r in conn.execute("SELECT token FROM check_result_cache")}
+        assert stale not in tokens and fresh in tokens
+        assert cache_pop(fresh) == {"n": 3}
+
+    def test_missing_token(self, app):
+        assert cache_pop(None) is None
+        assert cache_pop("nope") is None
+
+    def test_large_result_stored_compressed(self, app):
+        result = {"part": 2, "details": [{"correct": False, "explanation": "x" * 300} for _ in range(8)]}
+        token = cache_put(result)
+        with db_connection() as conn:
+            payload = conn.execute("SELECT payload FROM check_result_cache WHERE token = ?", (token,)).fetchone()[0]
+        assert isinstance(payload, bytes) and len(payload) < 2048
+        assert cache_pop(token) == result
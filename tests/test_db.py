@@ -1,7 +1,7 @@
 """Tests for database operations."""
 from __future__ import annotations
 
-from app.db import db_connection, get_task_by_id_for_part, init_db
+from app.db import db_connection, get_task_by_id_for_part, init_db, pick_task_id_for_part, record_show_for_part
 
 
 class TestMigrations:
@@ -33,6 +33,35 @@ class TestIndexes:
             assert "idx_check_history_user_id" in indexes
             assert "idx_check_history_created_at" in indexes
             assert "idx_check_history_user_part" in indexes
+            assert "idx_check_history_user_part_totals" in indexes
+
+
+class TestConnection:
+    def test_connection_reused_per_thread(self, app):
+        import threading
+
+        from app.db import get_db
+
+        with app.app_context():
+            first = get_db()
+        with app.app_context():
+            assert get_db() is first
+        other = []
+        t = threading.Thread(target=lambda: other.append(get_db()))
+        t.start()
+        t.join()
+        assert other[0] is not first
+
+    def test_error_rolls_back(self, app):
+        with app.app_context():
+            try:
+                with db_connection() as conn:
+                    conn.execute("INSERT INTO part2_tasks (text, answers_json) VALUES ('rolled back', '[]')")
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            with db_connection() as conn:
+                assert conn.execute("SELECT 1 FROM part2_tasks WHERE text = 'rolled back'").fetchone() is None
 
 
 class TestTaskRetrieval:
@@ -45,3 +74,214 @@ class TestTaskRetrieval:
         with app.app_context():
             result = get_task_by_id_for_part(99, 1)
             assert result is None
+
+    def test_seeded_tasks_served_from_memory(self, app):
+        from app.db import _TASK_TABLES
+
+        with app.app_context():
+            with db_connection() as conn:
+                tid = conn.execute("SELECT min(id) FROM part2_tasks").fetchone()[0]
+            assert tid in _TASK_TABLES[2]
+            assert get_task_by_id_for_part(2, tid) is _TASK_TABLES[2][tid]
+
+    def test_listening_audio_path_read_fresh(self, app):
+        from app.db import get_listening_task, save_listening_task
+
+        with app.app_context():
+            tid = save_listening_task(1, '{"questions": []}', None)
+            assert get_listening_task(1, tid)["audio_path"] is None
+            # Another worker process generates the audio
+            with db_connection() as conn:
+                conn.execute("UPDATE listening_part1_tasks SET audio_path = '/audio/new.mp3' WHERE id = ?", (tid,))
+                conn.commit()
+            task = get_listening_task(1, tid)
+        assert task["audio_path"] == "/audio/new.mp3" and task["data"] == {"questions": []}
+
+
+class TestTaskPicking:
+    def _reset_part1(self, n):
+        from app.db import _RECENT_SHOWS
+
+        _RECENT_SHOWS.pop("part1_task_shows", None)
+        with db_connection() as conn:
+            conn.execute("DELETE FROM part1_task_shows")
+            conn.execute("DELETE FROM part1_tasks")
+            ids = [
+                conn.execute(
+                    "INSERT INTO part1_tasks (text, gaps_json) VALUES (?, ?)", (f"t{i}", "[]")
+                ).lastrowid
+                for i in range(n)
+            ]
+            conn.commit()
+        return ids
+
+    def test_pick_skips_recent_shows_and_current(self, app):
+        with app.app_context():
+            a, b, c = self._reset_part1(3)
+            record_show_for_part(1, a)
+            record_show_for_part(1, b)
+            assert pick_task_id_for_part(1) == c
+            assert pick_task_id_for_part(1, exclude_current=c) is None
+
+    def test_pick_on_large_table_respects_exclusions(self, app):
+        with app.app_context():
+            ids = self._reset_part1(150)
+            for task_id in ids[:-1]:
+                record_show_for_part(1, task_id)
+            # Only the last 100 shows are excluded, so ids[:49] are eligible again.
+            eligible = set(ids[:49]) | {ids[-1]}
+            for _ in range(20):
+                assert pick_task_id_for_part(1) in eligible
+
+    def test_recent_shows_kept_in_memory(self, app):
+        from app.db import _RECENT_SHOWS, _get_excluded_ids
+
+        with app.app_context():
+            a, b = self._reset_part1(2)
+            record_show_for_part(1, a)
+            record_show_for_part(1, b)
+            record_show_for_part(1, a)
+            assert list(_RECENT_SHOWS["part1_task_shows"]) == [a, b, a]
+            assert _get_excluded_ids("part1_task_shows") == [a, b]
+
+    def test_get_phrase_pick_skips_recent_shows(self, app):
+        from app.db import _RECENT_SHOWS, pick_get_phrase_task_id, record_get_phrase_show
+
+        with app.app_context():
+            _RECENT_SHOWS.pop("get_phrase_task_shows", None)
+            with db_connection() as conn:
+                conn.execute("DELETE FROM get_phrase_task_shows")
+                conn.execute("DELETE FROM get_phrase_tasks")
+                a, b = [
+                    conn.execute(
+                        "INSERT INTO get_phrase_tasks (items_json) VALUES (?)", (f'{{"text": "t{i}", "answers": ["up"]}}',)
+                    ).lastrowid
+                    for i in range(2)
+                ]
+                conn.commit()
+            record_get_phrase_show(a)
+            assert list(_RECENT_SHOWS["get_phrase_task_shows"]) == [a]
+            for _ in range(20):
+                assert pick_get_phrase_task_id() == b
+
+    def test_insert_returns_stored_task(self, app):
+        from app.db import insert_task_for_part
+
+        with app.app_context():
+            task = insert_task_for_part(
+                2,
+                "INSERT INTO part2_tasks (text, answers_json, source) VALUES (?, ?, ?)",
+                ("new text", '["a"]', "openai"),
+            )
+            assert task["text"] == "new text" and task["answers"] == ["a"]
+            assert get_task_by_id_for_part(2, task["id"])["text"] == "new text"
+
+    def test_duplicate_generation_reuses_existing_task(self, app):
+        from app.db import insert_task_for_part
+
+        sql = "INSERT INTO part2_tasks (text, answers_json, source) VALUES (?, ?, ?)"
+        with app.app_context():
+            first = insert_task_for_part(2, sql, ("Same  Text here", '["a"]', "openai"))
+            second = insert_task_for_part(2, sql, ("same text HERE", '["b"]', "openai"))
+            assert second["id"] == first["id"]
+            with db_connection() as conn:
+                n = conn.execute("SELECT count(*) FROM part2_tasks WHERE text_hash IS NULL").fetchone()[0]
+            assert n == 0
+
+    def test_fallback_pick_ignores_history_but_not_current(self, app):
+        from app.db import _pick_any_task_id
+
+        with app.app_context():
+            a, b = self._reset_part1(2)
+            record_show_for_part(1, a)
+            record_show_for_part(1, b)
+            for _ in range(10):
+                assert _pick_any_task_id("part1_tasks", "part1_task_shows", exclude_current=a) == b
+
+
+class TestAIResponseCache:
+    def test_expired_entry_is_a_miss_and_pruned(self, app):
+        from app.db import get_cached_ai_response, store_ai_response
+
+        with app.app_context():
+            store_ai_response("old-entry", "m", 0.3, "old reply")
+            assert get_cached_ai_response("old-entry") == "old reply"
+            with db_connection() as conn:
+                conn.execute(
+                    "UPDATE ai_response_cache SET created_at = datetime('now', '-400 days') WHERE request_hash = ?",
+                    ("old-entry",),
+                )
+                conn.commit()
+            assert get_cached_ai_response("old-entry") is None
+            store_ai_response("new-entry", "m", 0.3, "new reply")
+            with db_connection() as conn:
+                hashes = {r[0] for r in conn.execute("SELECT request_hash FROM ai_response_cache")}
+        assert "old-entry" not in hashes and "new-entry" in hashes
+
+
+class TestUoeTasksByIds:
+    def test_keeps_requested_order_and_skips_missing(self, app):
+        from app.db import get_tasks_by_ids
+
+        with app.app_context():
+            with db_connection() as conn:
+                ids = [r["id"] for r in conn.execute("SELECT id FROM uoe_tasks ORDER BY id LIMIT 3")]
+            assert len(ids) == 3
+            tasks = get_tasks_by_ids([ids[2], 10**9, ids[0]])
+        assert [t["id"] for t in tasks] == [ids[2], ids[0]]
+        assert all("grammar_topic" in t for t in tasks)
+
+
+class TestUoeTaskShows:
+    def test_returns_topics_of_shown_tasks(self, app):
+        from app.db import get_recent_grammar_topics, record_shows
+
+        with app.app_context():
+            with db_connection() as conn:
+                tid = conn.execute(
+                    "INSERT INTO uoe_tasks (sentence1, keyword, sentence2, answer, grammar_topic) "
+                    "VALUES ('s1', 'KW', 's2 _____', 'a b c', ' passive voice ') RETURNING id"
+                ).fetchone()[0]
+                conn.commit()
+            record_shows([tid])
+            assert "passive voice" in get_recent_grammar_topics(50)
+
+    def test_picked_tasks_skip_recent_shows(self, app):
+        from app.db import pick_tasks_from_db, record_shows
+
+        with app.app_context():
+            picked = pick_tasks_from_db(5)
+            assert picked and {"id", "sentence1", "keyword", "sentence2", "answer"} <= picked[0].keys()
+            record_shows([t["id"] for t in picked])
+            again = {t["id"] for t in pick_tasks_from_db(1000)}
+        assert again.isdisjoint(t["id"] for t in picked)
+
+    def test_range_sampling_prefers_other_topics(self, app, monkeypatch):
+        from app import db as db_mod
+
+        with app.app_context():
+            with db_connection() as conn:
+                conn.executemany(
+                    "INSERT INTO uoe_tasks (sentence1, keyword, sentence2, answer, grammar_topic) VALUES (?, 'KW', 's2 _____', 'a kw c', ?)",
+                    [(f"sampled {i}", "modals" if i % 2 else "passive") for i in range(200)],
+                )
+                conn.commit()
+            monkeypatch.setattr(db_mod, "_RANGE_SAMPLE_MIN_ID", 1)
+            picked = db_mod.pick_tasks_from_db(10, ["modals"])
+            db_mod.record_shows([t["id"] for t in picked])
+            again = db_mod.pick_tasks_from_db(10)
+        assert len(picked) == 10 and all(t["grammar_topic"] != "modals" for t in picked)
+        assert len(again) == 10 and {t["id"] for t in again}.isdisjoint(t["id"] for t in picked)
+
+    def test_picks_filter_answers_in_sql(self, app):
+        from app.db import pick_tasks_from_db
+
+        with app.app_context():
+            with db_connection() as conn:
+                conn.executemany(
+                    "INSERT INTO uoe_tasks (sentence1, keyword, sentence2, answer) VALUES ('filter test', ?, 's2 _____', ?)",
+                    [("ZZQ", "zzq"), ("ZZQ", "one two zzq four five six"), ("ZZQ", "no keyword here"), ("ZZQ", "it was zzq")],
+                )
+                conn.commit()
+            picked = [t for t in pick_tasks_from_db(1000, answer_words=(3, 5)) if t["keyword"] == "ZZQ"]
+        assert [t["answer"] for t in picked] == ["it was zzq"]
@@ -0,0 +1,341 @@
+"""Tests for the part modules (generation, rendering)."""
+from __future__ import annotations
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.db import db_connection
+
+
+def _fake_completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def _part1_task(i):
+    return {
+        "text": " ".join(f"({n})_____" for n in range(1, 9)) + f" task {i}",
+        "gaps": [{"options": ["a", "b", "c", "d"], "correct": 1}] * 8,
+    }
+
+
+class TestPart1Batch:
+    def test_batch_stores_valid_tasks(self, app, monkeypatch):
+        from app.parts import part1
+
+        tasks = [_part1_task(1), {"text": "broken"}, _part1_task(2)]
+        monkeypatch.setattr(part1, "ai_available", True)
+        monkeypatch.setattr(part1, "chat_create", lambda *a, **k: _fake_completion(json.dumps(tasks)))
+        with app.app_context():
+            with db_connection() as conn:
+                before = conn.execute("SELECT count(*) FROM part1_tasks").fetchone()[0]
+            assert part1.generate_part1_batch(3) == 2
+            with db_connection() as conn:
+                after = conn.execute("SELECT count(*) FROM part1_tasks").fetchone()[0]
+        assert after == before + 2
+
+    def test_batch_drops_duplicate_tasks(self, app, monkeypatch):
+        from app.parts import part1
+
+        tasks = [_part1_task(11), _part1_task(11), _part1_task(12)]
+        monkeypatch.setattr(part1, "ai_available", True)
+        monkeypatch.setattr(part1, "chat_create", lambda *a, **k: _fake_completion(json.dumps(tasks)))
+        with app.app_context():
+            assert part1.generate_part1_batch(3) == 2
+            # A second identical batch adds nothing new.
+            assert part1.generate_part1_batch(3) == 0
+            with db_connection() as conn:
+                stored = conn.execute(
+                    "SELECT count(*) FROM part1_tasks WHERE text LIKE '%task 11' OR text LIKE '%task 12'"
+                ).fetchone()[0]
+        assert stored == 2
+
+
+def _stream_chunk(text, index=0):
+    return SimpleNamespace(choices=[SimpleNamespace(index=index, delta=SimpleNamespace(content=text))])
+
+
+class _FakeStream:
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self.consumed = 0
+        self.closed = False
+
+    def __iter__(self):
+        for piece in self.pieces:
+            self.consumed += 1
+            yield _stream_chunk(*piece) if isinstance(piece, tuple) else _stream_chunk(piece)
+
+    def close(self):
+        self.closed = True
+
+
+class TestChatCreateJson:
+    def _client(self, stream):
+        return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kwargs: stream)))
+
+    def test_stops_reading_once_object_closes(self, monkeypatch):
+        import app.ai as ai
+
+        stream = _FakeStream(['```json\n{"a": ', '[1, 2]}', "\n```", " more text"])
+        monkeypatch.setattr(ai, "_provider", "openai")
+        monkeypatch.setattr(ai, "openai_client", self._client(stream))
+        assert ai.chat_create_json([{"role": "user", "content": "x"}]) == {"a": [1, 2]}
+        assert stream.consumed == 2 and stream.closed
+
+    def test_aborts_without_json(self, monkeypatch):
+        import app.ai as ai
+
+        stream = _FakeStream(["x" * 300, "y" * 300, "{}"])
+        monkeypatch.setattr(ai, "_provider", "groq")
+        monkeypatch.setattr(ai, "groq_client", self._client(stream))
+        assert ai.chat_create_json([{"role": "user", "content": "x"}]) is None
+        assert stream.consumed == 2 and stream.closed
+
+
+class TestChatStreamJsonItems:
+    def test_items_from_several_choices(self, monkeypatch):
+        import app.ai as ai
+
+        stream = _FakeStream([('[{"a": 1}, ', 0), ('Here: [{"b": ', 1), ("2}]", 1), ('{"a": 3}]', 0), (" never read", 0)])
+        requested = {}
+
+        def create(**kwargs):
+            requested.update(kwargs)
+            return stream
+
+        client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        monkeypatch.setattr(ai, "_provider", "openai")
+        monkeypatch.setattr(ai, "openai_client", client)
+        items = list(ai.chat_stream_json_items([{"role": "user", "content": "x"}], n=2))
+        assert items == [{"a": 1}, {"b": 2}, {"a": 3}]
+        assert stream.consumed == 4 and stream.closed
+        assert requested["n"] == 2 and requested["stream"]
+
+
+class TestChatCreateRetry:
+    def _failing(self, monkeypatch, status_code):
+        import app.ai as ai
+
+        calls = []
+
+        def create(messages, temperature, model):
+            calls.append(1)
+            raise ai.AIHTTPError(f"HTTP {status_code}", status_code)
+
+        monkeypatch.setattr(ai, "_provider", "google")
+        monkeypatch.setattr(ai, "_google_create", create)
+        monkeypatch.setattr(ai.chat_create.retry, "sleep", lambda seconds: None)
+        return ai, calls
+
+    def test_retries_rate_limit(self, monkeypatch):
+        ai, calls = self._failing(monkeypatch, 429)
+        with pytest.raises(ai.AIHTTPError):
+            ai.chat_create([{"role": "user", "content": "x"}])
+        assert len(calls) == 4
+
+    def test_does_not_retry_bad_request(self, monkeypatch):
+        ai, calls = self._failing(monkeypatch, 400)
+        with pytest.raises(ai.AIHTTPError):
+            ai.chat_create([{"role": "user", "content": "x"}])
+        assert len(calls) == 1
+
+
+class TestChatCreateCached:
+    def test_identical_request_served_from_cache(self, app, monkeypatch):
+        import app.ai as ai
+
+        calls = []
+
+        def create(messages, temperature=0.7, model=None):
+            calls.append(temperature)
+            return _fake_completion(f"reply {len(calls)}")
+
+        monkeypatch.setattr(ai, "_provider", "openai")
+        monkeypatch.setattr(ai, "chat_create", create)
+        messages = [{"role": "user", "content": "explain gap 1 (cache test)"}]
+        with app.app_context():
+            first = ai.chat_create_cached(messages, temperature=0.3)
+            second = ai.chat_create_cached(messages, temperature=0.3)
+            other = ai.chat_create_cached(messages, temperature=0.5)
+        assert first.choices[0].message.content == second.choices[0].message.content == "reply 1"
+        assert other.choices[0].message.content == "reply 2"
+        assert calls == [0.3, 0.5]
+
+
+class TestGenerateTask:
+    def test_stores_validated_task(self, app, monkeypatch):
+        from app.parts import generation
+        from app.parts.part2 import PART2_SPEC
+
+        text = " ".join(f"({n})_____" for n in range(1, 9)) + " generated by spec"
+        monkeypatch.setattr(generation, "ai_available", True)
+        monkeypatch.setattr(generation, "get_rag_examples_text", lambda **kw: "")
+        monkeypatch.setattr(generation, "chat_create_json", lambda *a, **k: {"text": text, "answers": list("abcdefgh")})
+        with app.app_context():
+            task = generation.generate_task(PART2_SPEC)
+        assert task["text"] == text and task["answers"] == list("abcdefgh")
+
+    def test_retries_until_valid(self, app, monkeypatch):
+        from app.parts import generation
+        from app.parts.part3 import PART3_SPEC
+
+        replies = iter([{"text": "bad"}, None])
+        monkeypatch.setattr(generation, "ai_available", True)
+        monkeypatch.setattr(generation, "get_rag_examples_text", lambda **kw: "")
+        monkeypatch.setattr(generation, "chat_create_json", lambda *a, **k: next(replies, None))
+        with app.app_context():
+            assert generation.generate_task(PART3_SPEC) is None
+        assert next(replies, "exhausted") == "exhausted"
+
+
+class TestPart4Similarity:
+    def test_near_duplicate_detected(self, app):
+        from app.parts.part4 import _part4_similar_to_existing
+
+        s1 = "I have never seen such a beautiful sunset over the quiet northern lake."
+        s2 = "It is the most beautiful sunset _____ seen over the quiet northern lake."
+        with app.app_context():
+            with db_connection() as conn:
+                conn.execute(
+                    "INSERT INTO uoe_tasks (sentence1, keyword, sentence2, answer) VALUES (?, ?, ?, ?)",
+                    (s1, "EVER", s2, "I have ever"),
+                )
+                conn.commit()
+            assert _part4_similar_to_existing(s1.replace("such", "so"), s2, "I have ever")
+            assert not _part4_similar_to_existing(
+                "My brother started learning Spanish three years ago.",
+                "My brother _____ Spanish for three years.",
+                "has been learning",
+            )
+
+
+class TestPart4Generation:
+    def test_requests_run_concurrently_and_fill_the_set(self, app, monkeypatch):
+        import threading
+
+        from app.parts import part4
+
+        barrier = threading.Barrier(part4._PART4_REPLIES, timeout=5)
+        replies = iter([
+            [{"sentence1": "Zebras rarely visit the old quarry.", "keyword": "SELDOM",
+              "sentence2": "Zebras _____ the old quarry.", "answer": "are seldom seen visiting"}],
+            [{"sentence1": "Nobody expected the violinist to cancel.", "keyword": "SURPRISE",
+              "sentence2": "It _____ the violinist cancelled.", "answer": "came as a surprise that"}],
+        ])
+        lock = threading.Lock()
+
+        def fake_stream(messages, temperature=0.7, n=1):
+            assert n == 1
+            barrier.wait()
+            with lock:
+                reply = next(replies)
+            yield from reply
+
+        monkeypatch.setattr(part4, "ai_available", True)
+        monkeypatch.setattr(part4, "chat_stream_json_items", fake_stream)
+        with app.app_context():
+            tasks = part4._generate_tasks_with_openai(2)
+        assert sorted(t["keyword"] for t in tasks) == ["SELDOM", "SURPRISE"]
+
+    def test_other_connections_can_write_while_stream_runs(self, app, monkeypatch):
+        import sqlite3
+        import time
+
+        from app import db
+        from app.parts import part4
+
+        writes = []
+
+        def slow_stream(messages, temperature=0.7, n=1):
+            yield {"sentence1": "The ferry to the island leaves every two hours.", "keyword": "INTERVALS",
+                   "sentence2": "The ferry to the island leaves _____ two hours.", "answer": "at intervals of"}
+            time.sleep(0.3)  # the first item has been validated by now
+            other = sqlite3.connect(db.DB_PATH, timeout=0.1)
+            try:
+                other.execute("INSERT INTO check_history (part, score, total) VALUES (1, 1, 8)")
+                other.commit()
+                writes.append("ok")
+            except sqlite3.OperationalError as exc:
+                writes.append(str(exc))
+            finally:
+                other.close()
+            yield {"sentence1": "The museum was too crowded for us to enjoy it.", "keyword": "SO",
+                   "sentence2": "The museum was _____ we could not enjoy it.", "answer": "so crowded that"}
+
+        monkeypatch.setattr(part4, "ai_available", True)
+        monkeypatch.setattr(part4, "multi_choice_available", False)
+        monkeypatch.setattr(part4, "_PART4_REPLIES", 1)
+        monkeypatch.setattr(part4, "chat_stream_json_items", slow_stream)
+        with app.app_context():
+            tasks = part4._generate_tasks_with_openai(2)
+        assert writes == ["ok"]
+        assert [t["keyword"] for t in tasks] == ["INTERVALS", "SO"]
+
+
+class TestBuildPart3Html:
+    def test_old_format_shows_explanations(self):
+        from app.parts.part3 import build_part3_html
+
+        items = [{"sentence": f"Sentence {i} _____ here. STEM", "key": "STEM", "answer": "stems"} for i in range(8)]
+        details = [{"user_val": "x", "correct": False, "expected": "stems", "explanation": "Needs a plural noun."}] * 8
+        html = build_part3_html(items, {"details": details})
+        assert "explanations-block" in html and "Needs a plural noun." in html
+
+
+class TestExplanationsPart3:
+    @pytest.mark.parametrize("stored", [
+        {"text": " ".join(f"({n})_____" for n in range(1, 9)), "stems": ["HAPPY"] * 8, "answers": ["happiness"] * 8},
+        [{"sentence": f"Sentence {i} _____ here.", "key": "HAPPY", "answer": "happiness"} for i in range(8)],
+    ])
+    def test_stored_task_gets_explanations(self, app, monkeypatch, stored):
+        from app.ai import explanations
+        from app.db import get_part3_task_by_id
+
+        prompts = []
+
+        def fake_cached(messages, temperature=0.3, model=None):
+            prompts.append(messages)
+            return _fake_completion(json.dumps([{"explanation": "Noun needed.", "word_family": "happy"}] * 8))
+
+        monkeypatch.setattr(explanations, "ai_available", True)
+        monkeypatch.setattr(explanations, "chat_create_cached", fake_cached)
+        with app.app_context():
+            with db_connection() as conn:
+                task_id = conn.execute(
+                    "INSERT INTO part3_tasks (items_json, source) VALUES (?, 'manual')", (json.dumps(stored),)
+                ).lastrowid
+                conn.commit()
+            task = get_part3_task_by_id(task_id)
+            result = explanations.fetch_explanations_part3(task, [{"user_val": "happy"}] * 8)
+        assert len(prompts) == 1
+        assert result == [{"explanation": "Noun needed.", "word_family": "happy"}] * 8
+
+
+class TestScoreAnswers:
+    def test_text_answers_keep_expected(self):
+        from app.parts.checking import score_answers
+
+        form = {"p2_0": " Which ", "p2_1": "wrong"}
+        score, details = score_answers(form, "p2_", ["which", "that"], expected=["which", "that"])
+        assert score == 1
+        assert details == [
+            {"correct": True, "user_val": "Which", "expected": "which"},
+            {"correct": False, "user_val": "wrong", "expected": "that"},
+        ]
+
+    def test_choices_read_missing_as_unanswered(self):
+        from app.parts.checking import read_choice, same, score_answers
+
+        score, details = score_answers({"p5_0": "2", "p5_1": "x"}, "p5_", [2, 0, 1], read=read_choice, compare=same)
+        assert score == 1
+        assert [d["user_val"] for d in details] == [2, -1, -1]
+
+    def test_attach_explanations_truncates_and_skips_empty(self):
+        from app.config import MAX_EXPLANATION_LEN
+        from app.parts.checking import attach_explanations
+
+        details = [{}, {}]
+        attach_explanations(details, ["x" * (MAX_EXPLANATION_LEN + 10), ""])
+        assert details == [{"explanation": "x" * MAX_EXPLANATION_LEN}, {}]
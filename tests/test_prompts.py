@@ -0,0 +1,19 @@
+"""Tests for the task generation prompts."""
+from __future__ import annotations
+
+from app.ai.prompts import get_task_messages_part1, get_task_messages_part2, get_task_messages_part3
+
+
+def test_system_prompt_independent_of_topic():
+    for build in (get_task_messages_part1, get_task_messages_part2, get_task_messages_part3):
+        a = build("travel", "b2")
+        b = build("food and cooking", "b2")
+        assert a[0] == b[0]
+        assert a[0]["role"] == "system" and "travel" not in a[0]["content"]
+        assert a[1]["content"].startswith("topic: travel\nlevel: b2")
+
+
+def test_required_words_go_in_user_message():
+    system, user = get_task_messages_part2("sport", "b2plus", required_words=["Despite"])
+    assert "despite" in user["content"]
+    assert system == get_task_messages_part2("sport", "b2plus")[0]
@@ -0,0 +1,58 @@
+"""Tests for check history and per-part statistics."""
+from __future__ import annotations
+
+from app.db import db_connection
+
+
+class TestRecordCheckResult:
+    def test_stores_explanations_for_explained_items(self, app):
+        from app.services.stats import record_check_result
+
+        details = [
+            {"user_val": "a", "expected": "b", "explanation": " Wrong tense. "},
+            {"user_val": "c", "expected": "c"},
+            "not a dict",
+            {"user_val": "d", "expected": "e", "explanation": "Collocation."},
+        ]
+        with app.test_request_context():
+            record_check_result({"part": 2, "score": 1, "total": 4, "details": details})
+            with db_connection() as conn:
+                rows = conn.execute(
+                    "SELECT item_index, user_val, expected_val, explanation_text FROM answer_explanations "
+                    "WHERE check_id = (SELECT max(id) FROM check_history) ORDER BY item_index"
+                ).fetchall()
+        assert [tuple(r) for r in rows] == [(0, "a", "b", "Wrong tense."), (3, "d", "e", "Collocation.")]
+
+
+class TestPartStats:
+    def test_one_row_per_part_with_formatted_last_attempt(self, app):
+        from app.services.stats import get_part_stats
+
+        with app.test_request_context():
+            with db_connection() as conn:
+                conn.executemany(
+                    "INSERT INTO check_history (part, score, total, user_id, created_at) VALUES (?, ?, ?, 77, ?)",
+                    [(1, 3, 8, "2026-10-10 22:15:00"), (1, 4, 8, "2026-10-16 07:05:09")],
+                )
+                conn.commit()
+            stats = get_part_stats(77)
+        assert [s["part"] for s in stats] == list(range(1, 8))
+        assert stats[0] == {
+            "part": 1, "total_correct": 7, "total_wrong": 9, "total_questions": 16, "attempts": 2, "percent": 43.8,
+            "last_attempt_at": "2026-10-16 07:05:09", "last_attempt_at_display": "16 Oct 2026, 07:05",
+        }
+        assert stats[1]["attempts"] == 0 and stats[1]["percent"] is None and stats[1]["last_attempt_at_display"] is None
+
+    def test_cached_stats_refresh_after_new_check(self, app):
+        from app.services.stats import get_part_stats, record_check_result
+
+        from flask import session
+
+        with app.test_request_context():
+            session["user_id"] = 78
+            before = get_part_stats()
+            before[2]["attempts"] = 99
+            assert get_part_stats()[2]["attempts"] == 0
+            record_check_result({"part": 3, "score": 5, "total": 8, "details": []})
+            after = get_part_stats()
+        assert after[2]["attempts"] == 1 and after[2]["total_correct"] == 5
@@ -0,0 +1,72 @@
+"""Tests for background task-pool refills."""
+from __future__ import annotations
+
+import threading
+
+from app.config import TASK_POOL_REFILL, TASK_POOL_WORKERS
+from app.db import count_unseen_tasks, db_connection
+from app.services import task_pool
+
+
+def _reset_part2(n):
+    with db_connection() as conn:
+        conn.execute("DELETE FROM part2_task_shows")
+        conn.execute("DELETE FROM part2_tasks")
+        conn.executemany(
+            "INSERT INTO part2_tasks (text, answers_json) VALUES (?, ?)", ((f"t{i}", "[]") for i in range(n))
+        )
+        conn.commit()
+
+
+class TestTaskPool:
+    def test_low_pool_schedules_one_refill(self, app):
+        calls = []
+        done = threading.Event()
+        release = threading.Event()
+
+        def fake_generate():
+            release.wait(5)
+            calls.append(1)
+            if len(calls) == TASK_POOL_REFILL:
+                done.set()
+            return {"id": len(calls)}
+
+        with app.app_context():
+            _reset_part2(2)
+            assert count_unseen_tasks(2, 10) == 2
+            assert task_pool.ensure_task_pool(2, fake_generate)
+            # A refill for the part is already running
+            assert not task_pool.ensure_task_pool(2, fake_generate)
+            release.set()
+            assert done.wait(5)
+        assert len(calls) == TASK_POOL_REFILL
+
+    def test_single_generations_run_concurrently(self, app):
+        # The first TASK_POOL_WORKERS calls only return once all of them are in flight at once.
+        barrier = threading.Barrier(TASK_POOL_WORKERS, timeout=5)
+        started = []
+        finished = []
+        done = threading.Event()
+
+        def fake_generate():
+            started.append(1)
+            if len(started) <= TASK_POOL_WORKERS:
+                try:
+                    barrier.wait()
+                except threading.BrokenBarrierError:
+                    pass
+            finished.append(not barrier.broken)
+            if len(finished) == TASK_POOL_REFILL:
+                done.set()
+            return {"id": 1}
+
+        with app.app_context():
+            _reset_part2(0)
+            assert task_pool.ensure_task_pool(2, fake_generate)
+            assert done.wait(10)
+        assert all(finished)
+
+    def test_full_pool_does_nothing(self, app):
+        with app.app_context():
+            _reset_part2(20)
+            assert not task_pool.ensure_task_pool(2, lambda: None)
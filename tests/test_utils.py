@@ -4,13 +4,22 @@ from __future__ import annotations
 import json
 
 from app.utils import (
+    JsonArrayScanner,
+    JsonObjectScanner,
     answers_match,
+    cache_task_render,
     e,
+    escaped_segments,
+    explanation_item,
+    explanations_block,
     extract_json_array,
     extract_json_object,
+    find_json_object_text,
+    form_answers,
     format_explanation_list,
     login_required,
     norm,
+    similarity,
     validate_get_phrase_data,
     validate_part1_data,
     validate_part2_data,
@@ -42,6 +51,27 @@ class TestHtmlEscape:
     def test_none_returns_empty(self):
         assert e(None) == ""
 
+    def test_escaped_segments_mark_gaps(self):
+        assert escaped_segments("A <b> (1)_____ & (12)_____") == (
+            ("A &lt;b&gt; ", False), ("(1)_____", True), (" &amp; ", False), ("(12)_____", True), ("", False),
+        )
+
+
+class TestCacheTaskRender:
+    def test_plain_render_reused_for_same_task_object(self):
+        calls = []
+
+        @cache_task_render
+        def build(item, check_result=None):
+            calls.append(check_result)
+            return f"{item['text']}:{len(calls)}"
+
+        task = {"id": 1, "text": "a"}
+        assert build(task) == build(task) == "a:1"
+        assert build(task, {"details": []}) == "a:2"
+        assert build({"id": 1, "text": "b"}) == "b:3"
+        assert build({"text": "no id"}) == "no id:4"
+
 
 class TestWordCount:
     def test_counts(self):
@@ -52,6 +82,15 @@ class TestWordCount:
         assert word_count(None) == 0
 
 
+class TestFormAnswers:
+    def test_collects_numbered_fields_for_prefix(self):
+        form = {"p4_0": "a", "p4_2": "c", "p4_x": "?", "p5_0": "b", "task_id": "7"}
+        assert form_answers(form, "p4_") == {0: "a", 2: "c"}
+
+    def test_empty_form(self):
+        assert form_answers({}, "p1_") == {}
+
+
 # ---------------------------------------------------------------------------
 # answers_match
 # ---------------------------------------------------------------------------
@@ -73,6 +112,18 @@ class TestAnswersMatch:
         assert not answers_match("", "dog")
         assert not answers_match("cat", "")
 
+    def test_strict_rejects_close_match(self):
+        assert not answers_match("travelling", "traveling", strict=True)
+
+
+class TestSimilarity:
+    def test_bounds(self):
+        assert similarity("abc", "abc") == 1.0
+        assert similarity("abc", "xyz") == 0.0
+
+    def test_close_strings(self):
+        assert 0.88 <= similarity("travelling", "traveling") < 1.0
+
 
 # ---------------------------------------------------------------------------
 # JSON extraction
@@ -95,6 +146,16 @@ class TestExtractJsonObject:
         assert result["a"]["b"] == 1
 
 
+class TestFindJsonObjectText:
+    def test_stops_at_matching_brace(self):
+        text = 'Sure! {"a": "}{", "b": {"c": 1}} and {"other": 2}'
+        assert find_json_object_text(text) == '{"a": "}{", "b": {"c": 1}}'
+
+    def test_unbalanced(self):
+        assert find_json_object_text('{"a": 1') is None
+        assert find_json_object_text("no braces") is None
+
+
 class TestExtractJsonArray:
     def test_simple(self):
         result = extract_json_array('Result: [1, 2, 3]')
@@ -116,6 +177,31 @@ class TestExtractJsonArray:
 # Validation helpers
 # ---------------------------------------------------------------------------
 
+class TestJsonObjectScanner:
+    def test_object_split_across_chunks(self):
+        scanner = JsonObjectScanner()
+        chunks = ['Here: {"text": "a {b', '} \\"q\\" }", "n": {"x": 1', "}} trailing {junk"]
+        results = [scanner.feed(c) for c in chunks]
+        assert results[:2] == [None, None]
+        assert json.loads(results[2]) == {"text": 'a {b} "q" }', "n": {"x": 1}}
+
+    def test_not_started(self):
+        scanner = JsonObjectScanner()
+        assert scanner.feed("no json here") is None
+        assert not scanner.started and scanner.seen == 12
+
+
+class TestJsonArrayScanner:
+    def test_items_returned_as_they_complete(self):
+        scanner = JsonArrayScanner()
+        chunks = ['Sure: [{"a": "x]', '"}, 3, {"b": [1, ', "2]}", "] trailing [junk"]
+        results = [scanner.feed(c) for c in chunks]
+        assert [json.loads(t) for t in results[0]] == []
+        assert [json.loads(t) for t in results[1]] == [{"a": "x]"}]
+        assert [json.loads(t) for t in results[2]] == [{"b": [1, 2]}]
+        assert results[3] == [] and scanner.done
+
+
 class TestValidatePart1Data:
     def test_valid(self):
         data = {
@@ -165,6 +251,11 @@ class TestValidatePart2Data:
         data = {"text": text, "answers": ["a"] * 5}
         assert validate_part2_data(data) is None
 
+    def test_duplicate_gap_marker(self):
+        text = " ".join(f"({i})_____" for i in range(1, 9)) + " (3)_____"
+        data = {"text": text, "answers": ["a"] * 8}
+        assert validate_part2_data(data) is None
+
 
 class TestValidatePart3Data:
     def test_valid(self):
@@ -244,3 +335,14 @@ class TestFormatExplanationList:
         assert "Wrong because" in html
         assert "part2-expl-wrong" in html
         assert "right" in html
+
+    def test_wrong_item_without_explanation_has_no_reason(self):
+        html = explanation_item(2, False, "B) word", "")
+        assert html == (
+            '<li class="part2-expl-item part2-expl-wrong"><strong>Gap 3:</strong> '
+            '<span class="part2-expl-correct">Correct: <em>B) word</em></span>.</li>'
+        )
+
+    def test_block_skips_empty_items(self):
+        assert explanations_block([]) == ""
+        assert explanations_block(iter(["<li>x</li>"])).endswith('<ol class="answer-explanations"><li>x</li></ol></div>')